@@ -6,15 +6,50 @@ Intelligent agents that dynamically determine prompt requirements and generate s
 import requests
 import json
 import os
-from typing import Dict, List, Any, Tuple
-from dotenv import load_dotenv
+import time
+from typing import Callable, Dict, List, Any, Tuple, Optional
+from config import load_environment
+from utils.cassette import get_cassette
+from utils.metrics import GEMINI_CALLS, GEMINI_LATENCY, record_parse_fallback
+from utils.profiling import record_network_wait
+from utils.token_usage import record_usage, with_stage_tokens
+from utils.tracing import get_tracer, traced
 
-load_dotenv()
+load_environment()
+
+def extract_json_object(response: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the span from the first "{" to the last "}" of a model reply (models
+    wrap JSON in prose or code fences). None when there is no such span;
+    raises json.JSONDecodeError when the span is not valid JSON.
+    """
+    json_start = response.find('{')
+    json_end = response.rfind('}') + 1
+    if json_start == -1 or json_end == 0:
+        return None
+    return json.loads(response[json_start:json_end])
+
+# Workflow stage each Gemini-calling method belongs to (matches the stage_ms keys)
+STAGE_BY_METHOD = {
+    "analyze_input_intent": "intent",
+    "generate_smart_response": "intent",
+    "_generate_contextual_follow_up": "intent",
+    "detect_department": "department",
+    "generate_interactive_questions": "questions",
+    "generate_final_prompt": "final_prompt"
+}
 
 class GeminiPromptGeneratorAgents:
     def __init__(self):
         self.api_key = os.getenv("GEMINI_API_KEY")
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        self.base_url = os.getenv(
+            "GEMINI_BASE_URL",
+            "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        )
+        # Recording or replaying Gemini calls (GEMINI_CASSETTE_MODE); replay needs no API key
+        self.cassette = get_cassette()
+        if not self.api_key and self.cassette is not None and self.cassette.mode == "replay":
+            self.api_key = "replay"
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
@@ -25,35 +60,73 @@ class GeminiPromptGeneratorAgents:
         # Final prompt generator
         self.prompt_generator = "Final Prompt Generator"
 
-    def _call_gemini_api(self, prompt: str, role: str = "AI Assistant") -> str:
-        headers = {
-            'Content-Type': 'application/json',
-            'X-goog-api-key': self.api_key
-        }
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": f"You are a {role}. {prompt}"
-                        }
-                    ]
-                }
-            ]
-        }
-        try:
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
-            if response.status_code == 200:
-                result = response.json()
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    content = result['candidates'][0].get('content', {})
-                    parts = content.get('parts', [])
-                    if parts and len(parts) > 0:
-                        return parts[0].get('text', '')
-            return f"Error: API returned status {response.status_code}"
-        except Exception as e:
-            return f"Error calling Gemini API: {str(e)}"
+    def _call_gemini_api(
+        self, prompt: str, role: str = "AI Assistant", method: str = "direct", stage: Optional[str] = None
+    ) -> str:
+        """
+        ``method`` labels the call in metrics; ``stage`` (by default looked up
+        in STAGE_BY_METHOD) is the workflow stage its span and tokens belong to
+        """
+        stage = stage or STAGE_BY_METHOD.get(method, method)
+        outcome = "exception"
+        call_started = time.perf_counter()
+        with get_tracer().span("gemini.call", stage=stage, role=role, prompt_chars=len(prompt)) as span:
+            headers = {
+                'Content-Type': 'application/json',
+                'X-goog-api-key': self.api_key
+            }
+            data = {
+                "contents": [
+                    {
+                        "parts": [
+                            {
+                                "text": f"You are a {role}. {prompt}"
+                            }
+                        ]
+                    }
+                ]
+            }
+            try:
+                started = time.perf_counter()
+                post = requests.post if self.cassette is None else self.cassette.post
+                response = post(self.base_url, headers=headers, json=data, timeout=30)
+                network_ms = _elapsed_ms(started)
+                record_network_wait(network_ms)
+                span.set_attributes(
+                    network_ms=network_ms,
+                    status_code=response.status_code,
+                    request_bytes=len(response.request.body or b""),
+                    response_bytes=len(response.content)
+                )
+                outcome = "http_error"
+                if response.status_code == 200:
+                    outcome = "empty"
+                    started = time.perf_counter()
+                    result = response.json()
+                    span.set("parse_ms", _elapsed_ms(started))
+                    prompt_tokens, output_tokens = record_usage(
+                        method, stage, result.get('usageMetadata') or {}
+                    )
+                    span.set_attributes(prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+                    if 'candidates' in result and len(result['candidates']) > 0:
+                        content = result['candidates'][0].get('content', {})
+                        parts = content.get('parts', [])
+                        if parts and len(parts) > 0:
+                            text = parts[0].get('text', '')
+                            outcome = "ok"
+                            span.set("response_chars", len(text))
+                            return text
+                return f"Error: API returned status {response.status_code}"
+            except Exception as e:
+                outcome = "exception"
+                span.set("error", f"{type(e).__name__}: {e}")
+                return f"Error calling Gemini API: {str(e)}"
+            finally:
+                span.set("outcome", outcome)
+                GEMINI_CALLS.inc(method=method, outcome=outcome)
+                GEMINI_LATENCY.observe(time.perf_counter() - call_started, method=method)
 
+    @traced("agents.detect_department")
     def detect_department(self, user_request: str) -> Dict[str, Any]:
         """Intelligently detect the department based on user intent"""
         prompt = f"""
@@ -108,18 +181,16 @@ class GeminiPromptGeneratorAgents:
         Only respond with the JSON, no additional text.
         """
         
-        response = self._call_gemini_api(prompt, self.department_detector)
+        response = self._call_gemini_api(prompt, self.department_detector, method="detect_department")
         
         try:
             # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start != -1 and json_end != 0:
-                json_str = response[json_start:json_end]
-                result = json.loads(json_str)
+            result = extract_json_object(response)
+            if result is not None:
                 return result
             else:
                 # Fallback parsing
+                record_parse_fallback("detect_department", "no_json")
                 return {
                     "department": "AI Engineering",  # Default fallback for technical projects
                     "confidence": "low",
@@ -133,6 +204,7 @@ class GeminiPromptGeneratorAgents:
                     }
                 }
         except json.JSONDecodeError:
+            record_parse_fallback("detect_department", "invalid_json")
             return {
                 "department": "AI Engineering",  # Default fallback for technical projects
                 "confidence": "low",
@@ -146,6 +218,7 @@ class GeminiPromptGeneratorAgents:
                 }
             }
 
+    @traced("agents.generate_interactive_questions")
     def generate_interactive_questions(self, user_request: str, department: str, user_answers: Dict[str, str] = None) -> Dict[str, Any]:
         """Generate smart, reduced questions based on department and current progress"""
         
@@ -239,15 +312,12 @@ class GeminiPromptGeneratorAgents:
         Only respond with the JSON, no additional text.
         """
         
-        response = self._call_gemini_api(prompt, self.question_generator)
+        response = self._call_gemini_api(prompt, self.question_generator, method="generate_interactive_questions")
         
         try:
             # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start != -1 and json_end != 0:
-                json_str = response[json_start:json_end]
-                result = json.loads(json_str)
+            result = extract_json_object(response)
+            if result is not None:
                 
                 # Smart completion check - if we have enough info, complete the process
                 if len(result.get('questions', [])) <= 2 and len(user_answers) >= 1:
@@ -257,6 +327,7 @@ class GeminiPromptGeneratorAgents:
                 return result
             else:
                 # Fallback - minimal questions
+                record_parse_fallback("generate_interactive_questions", "no_json")
                 return {
                     "questions": [
                         {
@@ -281,6 +352,7 @@ class GeminiPromptGeneratorAgents:
                     }
                 }
         except json.JSONDecodeError:
+            record_parse_fallback("generate_interactive_questions", "invalid_json")
             return {
                 "questions": [
                     {
@@ -305,8 +377,18 @@ class GeminiPromptGeneratorAgents:
                 }
             }
 
-    def generate_final_prompt(self, user_request: str, department: str, all_answers: Dict[str, str]) -> str:
-        """Generate the final, ready-to-use prompt based on collected information and smart analysis"""
+    @traced("agents.generate_final_prompt")
+    def generate_final_prompt(
+        self,
+        user_request: str,
+        department: str,
+        all_answers: Dict[str, str],
+        seed_prompt: Optional[str] = None
+    ) -> str:
+        """
+        Generate the final, ready-to-use prompt based on collected information and smart analysis.
+        ``seed_prompt`` is a saved prompt for a similar request to adapt rather than start from scratch.
+        """
         
         # Enhanced context analysis
         request_lower = user_request.lower()
@@ -375,6 +457,14 @@ class GeminiPromptGeneratorAgents:
                 "Distribution: Online platforms"
             ])
         
+        seed_section = ""
+        if seed_prompt:
+            seed_section = f"""
+        **PROMPT FROM A SIMILAR PAST REQUEST:**
+        Use this as a starting point. Keep what still applies, and adapt everything else to this request and these answers.
+        {seed_prompt}
+        """
+
         prompt = f"""
         You are a Final Prompt Generator specializing in {department} department with expertise in portfolio development and career guidance.
         
@@ -440,10 +530,11 @@ class GeminiPromptGeneratorAgents:
         - Add project showcase recommendations
         - Include technical depth appropriate for the skill level
         - Emphasize real-world problem solving
-        """
+        {seed_section}"""
         
-        return self._call_gemini_api(prompt, self.prompt_generator)
+        return self._call_gemini_api(prompt, self.prompt_generator, method="generate_final_prompt")
 
+    @traced("agents.analyze_input_intent")
     def analyze_input_intent(self, user_request: str) -> Dict[str, Any]:
         """Analyze user input to determine if it's a question, suggestion request, or direct request"""
         prompt = f"""
@@ -492,18 +583,16 @@ class GeminiPromptGeneratorAgents:
         Only respond with the JSON, no additional text.
         """
         
-        response = self._call_gemini_api(prompt, "Input Intent Analyzer")
+        response = self._call_gemini_api(prompt, "Input Intent Analyzer", method="analyze_input_intent")
         
         try:
             # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start != -1 and json_end != 0:
-                json_str = response[json_start:json_end]
-                result = json.loads(json_str)
+            result = extract_json_object(response)
+            if result is not None:
                 return result
             else:
                 # Fallback - treat as direct request
+                record_parse_fallback("analyze_input_intent", "no_json")
                 return {
                     "intent_type": "direct_request",
                     "confidence": "low",
@@ -513,6 +602,7 @@ class GeminiPromptGeneratorAgents:
                     "department_hint": "general"
                 }
         except json.JSONDecodeError:
+            record_parse_fallback("analyze_input_intent", "invalid_json")
             return {
                 "intent_type": "direct_request",
                 "confidence": "low",
@@ -522,6 +612,7 @@ class GeminiPromptGeneratorAgents:
                 "department_hint": "general"
             }
 
+    @traced("agents.generate_smart_response")
     def generate_smart_response(self, user_request: str, intent_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Generate intelligent response based on intent analysis with enhanced intelligence"""
         
@@ -555,7 +646,7 @@ class GeminiPromptGeneratorAgents:
             - 1-2 follow-up questions to better understand their needs
             """
             
-            response = self._call_gemini_api(prompt, "AI Mentor")
+            response = self._call_gemini_api(prompt, "AI Mentor", method="generate_smart_response")
             
             return {
                 "type": "question_response",
@@ -591,7 +682,7 @@ class GeminiPromptGeneratorAgents:
             - Ask which option interests them most and why
             """
             
-            response = self._call_gemini_api(prompt, "AI Mentor")
+            response = self._call_gemini_api(prompt, "AI Mentor", method="generate_smart_response")
             
             return {
                 "type": "suggestions_response",
@@ -664,12 +755,13 @@ class GeminiPromptGeneratorAgents:
         Return only the questions, one per line.
         """
         
-        response = self._call_gemini_api(follow_up_prompt, "Follow-up Generator")
+        response = self._call_gemini_api(follow_up_prompt, "Follow-up Generator", method="_generate_contextual_follow_up")
         questions = [q.strip() for q in response.split('\n') if q.strip() and '?' in q]
         return questions[0] if questions else "What specific aspect would you like to focus on?"
 
-    def process_interactive_workflow(self, user_request: str) -> Dict[str, Any]:
-        """Main workflow for interactive prompt generation with enhanced intelligence"""
+    @staticmethod
+    def local_triage(user_request: str) -> Optional[Dict[str, Any]]:
+        """Cheap checks that need no API call; returns None when the request needs the full workflow"""
         
         # Pre-process user request for better understanding
         request_lower = user_request.lower()
@@ -689,11 +781,40 @@ class GeminiPromptGeneratorAgents:
                 "message": "Please provide more details about what you want to accomplish. For example: 'I want to create a social media campaign for our new product' or 'I need to build a data analysis dashboard'."
             }
         
-        # Step 1: Analyze input intent
+        return None
+
+    def prefetch_triage(self, user_request: str) -> Dict[str, Any]:
+        """
+        The calls of ``process_interactive_workflow`` that depend only on the
+        request text: the intent analysis and, for direct requests, the department
+        """
         intent_analysis = self.analyze_input_intent(user_request)
+        department_info = None
+        if intent_analysis.get("intent_type") not in ["question", "suggestion_request"]:
+            department_info = self.detect_department(user_request)
+        return {"intent_analysis": intent_analysis, "department_info": department_info}
+
+    @traced("agents.process_interactive_workflow")
+    @with_stage_tokens
+    def process_interactive_workflow(self, user_request: str, prefetched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Main workflow for interactive prompt generation with enhanced intelligence.
+        ``prefetched`` is a result of ``prefetch_triage`` made ahead of time (predictive triage).
+        """
+        
+        local_result = self.local_triage(user_request)
+        if local_result is not None:
+            return local_result
+        prefetched = prefetched or {}
+        
+        # Step 1: Analyze input intent
+        stage_ms = {}
+        started = time.perf_counter()
+        intent_analysis = prefetched.get("intent_analysis") or self.analyze_input_intent(user_request)
         
         # Step 2: Generate smart response if needed
         smart_response = self.generate_smart_response(user_request, intent_analysis)
+        stage_ms["intent"] = _elapsed_ms(started)
         
         # Step 3: Handle different response types
         if smart_response["type"] in ["question_response", "suggestions_response"]:
@@ -701,23 +822,30 @@ class GeminiPromptGeneratorAgents:
                 "workflow_state": "chat_mode",
                 "intent_analysis": intent_analysis,
                 "smart_response": smart_response,
-                "original_request": user_request
+                "original_request": user_request,
+                "stage_ms": stage_ms
             }
         
         # Step 4: Proceed with normal prompt generation for direct requests
         # Detect department with enhanced intelligence
-        department_info = self.detect_department(user_request)
+        started = time.perf_counter()
+        department_info = prefetched.get("department_info") or self.detect_department(user_request)
+        stage_ms["department"] = _elapsed_ms(started)
         
         # Generate initial questions with context awareness
+        started = time.perf_counter()
         questions_info = self.generate_interactive_questions(user_request, department_info["department"])
+        stage_ms["questions"] = _elapsed_ms(started)
         
         return {
             "workflow_state": "awaiting_answers",
             "department_detected": department_info,
             "questions": questions_info,
-            "original_request": user_request
+            "original_request": user_request,
+            "stage_ms": stage_ms
         }
 
+    @traced("agents.continue_from_smart_response")
     def continue_from_smart_response(self, original_request: str, user_choice: str) -> Dict[str, Any]:
         """Continue workflow after smart response based on user's choice"""
         
@@ -737,8 +865,20 @@ class GeminiPromptGeneratorAgents:
             "original_request": enhanced_request
         }
 
-    def continue_workflow(self, user_request: str, department: str, current_answers: Dict[str, str]) -> Dict[str, Any]:
-        """Continue the workflow with user answers and enhanced intelligence"""
+    @traced("agents.continue_workflow")
+    @with_stage_tokens
+    def continue_workflow(
+        self,
+        user_request: str,
+        department: str,
+        current_answers: Dict[str, str],
+        reuse_lookup: Optional[Callable[[str, str, Dict[str, str]], Optional[Dict[str, Any]]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Continue the workflow with user answers and enhanced intelligence.
+        ``reuse_lookup(request, department, answers)`` may return a saved prompt for a near-duplicate
+        request; with ``mode`` "serve" it is returned as-is, with "seed" it guides generation.
+        """
         
         # Validate answers
         if not current_answers:
@@ -756,15 +896,26 @@ class GeminiPromptGeneratorAgents:
             }
         
         # Generate next set of questions or final prompt
+        started = time.perf_counter()
         questions_info = self.generate_interactive_questions(user_request, department, current_answers)
+        stage_ms = {"questions": _elapsed_ms(started)}
         
         if questions_info.get("is_complete", False):
-            # Generate final prompt with enhanced intelligence
-            final_prompt = self.generate_final_prompt(user_request, department, current_answers)
+            match = reuse_lookup(user_request, department, current_answers) if reuse_lookup else None
+            if match and match.get("mode") == "serve":
+                final_prompt = match["final_prompt"]
+            else:
+                # Generate final prompt with enhanced intelligence
+                seed_prompt = match["final_prompt"] if match else None
+                started = time.perf_counter()
+                final_prompt = self.generate_final_prompt(user_request, department, current_answers, seed_prompt)
+                stage_ms["final_prompt"] = _elapsed_ms(started)
             return {
                 "workflow_state": "complete",
                 "final_prompt": final_prompt,
                 "department": department,
+                "reused": {key: value for key, value in match.items() if key != "final_prompt"} if match else None,
+                "stage_ms": stage_ms,
                 "summary": {
                     "total_questions_answered": len(current_answers),
                     "department": department,
@@ -778,5 +929,11 @@ class GeminiPromptGeneratorAgents:
                 "workflow_state": "awaiting_answers",
                 "questions": questions_info,
                 "department": department,
-                "progress": questions_info.get("progress_percentage", 0)
+                "progress": questions_info.get("progress_percentage", 0),
+                "stage_ms": stage_ms
             }
+
+
+def _elapsed_ms(started: float) -> float:
+    """Milliseconds since a ``time.perf_counter()`` reading"""
+    return round((time.perf_counter() - started) * 1000, 1)
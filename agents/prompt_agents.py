@@ -3,15 +3,17 @@ AI Prompt Generator Agents using CrewAI
 Intelligent agents that dynamically determine prompt requirements and generate structured prompts
 """
 
-from crewai import Agent, Task, Crew, Process
-from langchain_community.llms import Ollama
-from langchain.tools import Tool
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any
 import os
-from dotenv import load_dotenv
+from config import load_environment
+
+# crewai and langchain are imported when the crew is built: they are heavy to
+# import and only this legacy Ollama path uses them
+if TYPE_CHECKING:
+    from crewai import Agent
 
 # Load environment variables
-load_dotenv()
+load_environment()
 
 class PromptGeneratorAgents:
     """
@@ -20,6 +22,8 @@ class PromptGeneratorAgents:
     
     def __init__(self):
         """Initialize the agents with Ollama LLM"""
+        from langchain_community.llms import Ollama
+
         # Initialize Ollama LLM
         self.llm = Ollama(
             model=os.getenv("OLLAMA_MODEL", "llama2"),
@@ -32,10 +36,13 @@ class PromptGeneratorAgents:
         self.department_specialist = self._create_department_specialist()
         self.quality_validator = self._create_quality_validator()
     
-    def _create_requirements_analyzer(self) -> Agent:
+    def _create_requirements_analyzer(self) -> "Agent":
         """
         Agent that analyzes user input and determines what information is needed
         """
+        from crewai import Agent
+        from langchain.tools import Tool
+
         return Agent(
             role="Requirements Analysis Specialist",
             goal="Analyze user input and dynamically determine what additional information is needed for optimal prompt generation",
@@ -53,10 +60,13 @@ class PromptGeneratorAgents:
             ]
         )
     
-    def _create_prompt_architect(self) -> Agent:
+    def _create_prompt_architect(self) -> "Agent":
         """
         Agent that designs the structure and format of prompts
         """
+        from crewai import Agent
+        from langchain.tools import Tool
+
         return Agent(
             role="Prompt Architecture Expert",
             goal="Design structured, well-defined prompts with appropriate constraints and context",
@@ -74,10 +84,13 @@ class PromptGeneratorAgents:
             ]
         )
     
-    def _create_department_specialist(self) -> Agent:
+    def _create_department_specialist(self) -> "Agent":
         """
         Agent that provides department-specific expertise and context
         """
+        from crewai import Agent
+        from langchain.tools import Tool
+
         return Agent(
             role="Department-Specific AI Specialist",
             goal="Provide expert knowledge and context for specific departments to enhance prompt quality",
@@ -96,10 +109,13 @@ class PromptGeneratorAgents:
             ]
         )
     
-    def _create_quality_validator(self) -> Agent:
+    def _create_quality_validator(self) -> "Agent":
         """
         Agent that validates and improves prompt quality
         """
+        from crewai import Agent
+        from langchain.tools import Tool
+
         return Agent(
             role="Prompt Quality Validator",
             goal="Validate and improve prompt quality, ensuring clarity, completeness, and effectiveness",
@@ -228,6 +244,8 @@ class PromptGeneratorAgents:
         """
         Generate a structured prompt using the AI agent crew
         """
+        from crewai import Crew, Process, Task
+
         # Create tasks for the crew
         analysis_task = Task(
             description=f"""
@@ -6,11 +6,33 @@ Modern, sleek interface for generating structured prompts using AI agents
 import streamlit as st
 import json
 import os
+import re
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from typing import Any, Dict, Optional
 from agents.gemini_agents import GeminiPromptGeneratorAgents
 from utils.helpers import PromptGeneratorUtils
+from utils.perf import RenderTimer
+from utils.admission import AdmissionController, AdmissionTimeout
+from utils.draft_idle import draft_idle
+from utils.pretriage import PredictiveTriage
+from utils.session_store import PERSISTED_KEYS, SQLiteSessionStore, open_session_store
+from utils.idempotency import IdempotentActions, action_key
+from utils.history_store import SQLiteHistoryStore, get_history_store
+from utils.history_compaction import HistoryCompactor, RetentionPolicy
+from utils.prompt_reuse import PromptReuseIndex, find_reusable_prompt
+from utils.history_writer import HistoryQueueFull, get_history_writer
+from utils.history_analytics import get_history_analytics
+from utils.tracing import current_span, get_tracer
+from utils.token_usage import combine_stage_tokens, get_token_ledger, metered
+from utils.profiling import get_profile_store
+from utils.metrics import REGISTRY, WORKFLOW_LATENCY, MetricsServer, RecentSessions, record_cache_lookup
 from config import Config
 
+_script_started = time.perf_counter()
+
 # Page configuration
 st.set_page_config(
     page_title="AI Intelligent Prompt Generator",
@@ -19,6 +41,36 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_session_store():
+    """Process-wide store that keeps workflow and chat state across reloads and restarts"""
+    store = open_session_store(Config.SESSION_STORE, Config.SESSION_DB_PATH, Config.SESSION_FLUSH_INTERVAL)
+    if isinstance(store, SQLiteSessionStore):
+        store.purge_older_than(Config.SESSION_TTL_DAYS * 86400)
+    return store
+
+def persist_session():
+    """Queue the current workflow and chat state for the next batched write"""
+    store = get_session_store()
+    if store is None:
+        return
+    snapshot = {key: st.session_state[key] for key in PERSISTED_KEYS if key in st.session_state}
+    store.save(st.session_state.session_id, snapshot)
+
+# Resume a previous session from the ?session= token, or start a new one
+if 'session_id' not in st.session_state:
+    token = st.query_params.get("session", "")
+    if re.fullmatch(r"[0-9a-f]{32}", token):
+        st.session_state.session_id = token
+        store = get_session_store()
+        if store is not None:
+            # Loaded once per browser session, only when a token is presented
+            for key, value in store.load(token).items():
+                st.session_state[key] = value
+    else:
+        st.session_state.session_id = uuid.uuid4().hex
+        st.query_params["session"] = st.session_state.session_id
+
 # Initialize session state
 if 'workflow_state' not in st.session_state:
     st.session_state.workflow_state = 'initial'
@@ -37,126 +89,472 @@ if 'chat_active' not in st.session_state:
 if 'chat_context' not in st.session_state:
     st.session_state.chat_context = {}
 
+# Script and fragment run times, kept across reruns
+render_timer = RenderTimer(st.session_state)
+
+@contextmanager
+def fragment_run(name):
+    """Time a fragment run and persist session state when it ends, including on st.rerun"""
+    try:
+        with render_timer.section(name), get_tracer().span(f"ui.{name}", session_id=st.session_state.session_id):
+            yield
+    finally:
+        persist_session()
+
+@st.cache_data(ttl=Config.HEALTH_CHECK_TTL, show_spinner=False)
 def validate_gemini_connection():
     """Validate Gemini API connection"""
     try:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             return False, "API key not found"
-        
+
         # Test API connection
         agents = GeminiPromptGeneratorAgents()
-        test_response = agents._call_gemini_api("Say hello", "Test")
+        test_response = agents._call_gemini_api("Say hello", "Test", method="validate_gemini_connection")
         if "Error" in test_response:
             return False, f"API Error: {test_response}"
-        
+
         return True, "Connected"
     except Exception as e:
         return False, f"Connection Error: {str(e)}"
 
-def save_prompt_history(prompt_data):
-    """Save generated prompt to history"""
+@st.cache_resource
+def get_admission_controller():
+    """Process-wide admission controller shared by all sessions"""
+    return AdmissionController(
+        max_in_flight=Config.MAX_IN_FLIGHT_REQUESTS,
+        per_session_limit=Config.PER_SESSION_CONCURRENCY,
+        weights={
+            "workflow": Config.WORKFLOW_PRIORITY_WEIGHT,
+            "chat": Config.CHAT_PRIORITY_WEIGHT,
+            "predictive": Config.PREDICTIVE_PRIORITY_WEIGHT
+        },
+        queue_timeout=Config.ADMISSION_QUEUE_TIMEOUT
+    )
+
+@contextmanager
+def admitted(kind):
+    """Wait for an admission slot, showing the queue position while waiting"""
+    queue_notice = st.empty()
+
+    def show_position(position):
+        queue_notice.info(f"⏳ Lots of requests right now - you are #{position} in the queue")
+
+    started = time.perf_counter()
+    try:
+        with get_admission_controller().slot(st.session_state.session_id, kind, on_wait=show_position):
+            current_span().set("queue_ms", round((time.perf_counter() - started) * 1000, 1))
+            queue_notice.empty()
+            yield
+    finally:
+        queue_notice.empty()
+
+@st.cache_resource
+def get_predictive_triage():
+    """Process-wide cache of speculative triage results keyed by request text"""
+    controller = get_admission_controller()
+
+    def run_triage(user_request, owner):
+        # The intent and department calls depend only on the text, so they run at low
+        # priority per idle draft and Start reuses them. Local triage needs no call.
+        if GeminiPromptGeneratorAgents.local_triage(user_request) is not None:
+            return None
+        with metered() as meter:
+            try:
+                with controller.slot(owner, "predictive"):
+                    prefetched = GeminiPromptGeneratorAgents().prefetch_triage(user_request)
+            finally:
+                # Charged to the session that typed it, whether or not the result is ever used
+                get_token_ledger().observe(meter.by_stage(), session_id=owner)
+        return dict(prefetched, stage_tokens=meter.by_stage())
+
+    return PredictiveTriage(
+        run_triage,
+        delay=Config.PREDICTIVE_TRIAGE_DELAY,
+        ttl=Config.PREDICTIVE_TRIAGE_TTL
+    )
+
+@st.cache_resource
+def get_idempotent_actions():
+    """Process-wide registry that collapses duplicate submits into one run"""
+    return IdempotentActions(ttl=Config.IDEMPOTENCY_TTL)
+
+@st.cache_resource
+def get_recent_sessions():
+    """Sessions that ran the script recently, for the active sessions metric"""
+    return RecentSessions(window=Config.METRICS_SESSION_WINDOW)
+
+@st.cache_resource
+def get_metrics_server():
+    """Side HTTP server exposing Prometheus metrics on Config.METRICS_PORT (None when disabled)"""
+    admission = get_admission_controller()
+    actions = get_idempotent_actions()
+    REGISTRY.callback("prompt_active_sessions", "Sessions active in the last few minutes", get_recent_sessions().count)
+    REGISTRY.callback("prompt_admission_in_flight", "Gemini-backed requests holding an admission slot",
+                      lambda: admission.stats()["in_flight"])
+    REGISTRY.callback("prompt_admission_queue_depth", "Requests waiting for an admission slot",
+                      lambda: admission.stats()["queued_by_kind"], ["kind"])
+    REGISTRY.callback("prompt_admission_timeouts_total", "Requests that gave up waiting for a slot",
+                      lambda: admission.stats()["timeouts_total"], kind="counter")
+    REGISTRY.callback("prompt_history_write_queue_depth", "Saved prompts waiting to be written",
+                      lambda: get_history_writer().stats()["queued"])
+    REGISTRY.callback("prompt_idempotent_actions_total", "Workflow actions run, joined in flight or replayed",
+                      lambda: {key: actions.stats()[key] for key in ("executed", "joined", "replayed")}, ["result"], "counter")
+    if not Config.METRICS_PORT:
+        return None
+    try:
+        return MetricsServer(REGISTRY, Config.METRICS_HOST, Config.METRICS_PORT).start()
+    except OSError as e:
+        print(f"Metrics server not started on port {Config.METRICS_PORT}: {e}")
+        return None
+
+@st.cache_resource
+def get_history_compactor():
+    """
+    Process-wide background job applying the history retention policy in small
+    steps; None unless a policy is configured, since it removes data for good
+    """
+    policy = RetentionPolicy.from_config()
+    if not policy.configured:
+        return None
+    compactor = HistoryCompactor(get_history_store(), policy, batch_size=Config.HISTORY_COMPACTION_BATCH)
+    compactor.add_listener(lambda _: get_history_analytics().rebuild(get_history_store().iter_records()))
+    if Config.HISTORY_COMPACTION_INTERVAL > 0:
+        compactor.start(Config.HISTORY_COMPACTION_INTERVAL)
+    return compactor
+
+@st.cache_resource
+def get_prompt_reuse_index():
+    """Process-wide similarity index over saved prompts, loaded from history in the background"""
+    index = PromptReuseIndex()
+    index.load_async(get_history_store().iter_records())
+    return index
+
+def lookup_reusable_prompt(request, department, answers):
+    """Saved prompt for a near-duplicate request (scoped by Config.PROMPT_REUSE_SCOPE), or None"""
+    match = find_reusable_prompt(
+        get_prompt_reuse_index(),
+        get_history_store(),
+        request,
+        department if Config.PROMPT_REUSE_SCOPE == "department" else None,
+        answers,
+        serve_threshold=Config.PROMPT_REUSE_THRESHOLD,
+        seed_threshold=Config.PROMPT_REUSE_SEED_THRESHOLD
+    )
+    record_cache_lookup("prompt_reuse", match is not None)
+    return match
+
+def run_workflow_action(action, payload, fn):
+    """
+    Run a Gemini-backed action once per idempotency key (session, workflow state,
+    action and input). Double clicks and rerun replays join the in-flight run.
+    Returns (key, result); result is None when this session already applied it.
+    """
+    key = action_key(st.session_state.session_id, st.session_state.workflow_state, action, payload)
+    if key in st.session_state.setdefault('applied_actions', []):
+        return key, None
+    profile = get_profile_store().run(st.session_state.session_id, action) if profiling_enabled() else nullcontext()
+    started = time.perf_counter()
+    try:
+        with get_tracer().span(f"app.{action}", request_id=key[:16], session_id=st.session_state.session_id), metered() as meter, profile:
+            result = get_idempotent_actions().run(key, fn)
+    finally:
+        WORKFLOW_LATENCY.observe(time.perf_counter() - started, action=action)
+    # Joined and replayed runs made no calls of their own, so nothing is counted twice
+    if meter.calls:
+        detected = (result.get('department_detected') if isinstance(result, dict) else None) or st.session_state.department_detected
+        get_token_ledger().observe(
+            meter.by_stage(),
+            department=detected['department'] if detected else None,
+            session_id=st.session_state.session_id
+        )
+    return key, result
+
+def profiling_enabled():
+    """Profile this session's workflow runs (?profile=1, or switched on from the admin page)"""
+    if Config.PROFILE_QUERY_PARAM and st.query_params.get("profile") == "1":
+        return True
+    return get_profile_store().is_enabled(st.session_state.session_id)
+
+def add_stage_timings(stage_ms):
+    """Add a workflow step's per-stage Gemini latency to this prompt's running totals"""
+    totals = st.session_state.setdefault('stage_ms', {})
+    for stage, ms in (stage_ms or {}).items():
+        totals[stage] = round(totals.get(stage, 0) + ms, 1)
+
+def add_stage_tokens(stage_tokens):
+    """Add a workflow step's per-stage token usage to this prompt's running totals"""
+    totals = st.session_state.setdefault('stage_tokens', {})
+    for stage, usage in (stage_tokens or {}).items():
+        stage_totals = totals.setdefault(stage, {"calls": 0, "prompt": 0, "output": 0})
+        for key in stage_totals:
+            stage_totals[key] += usage.get(key, 0)
+
+def mark_action_applied(key):
+    """Remember that this session has applied the action's result"""
+    applied = st.session_state.setdefault('applied_actions', [])
+    applied.append(key)
+    del applied[:-50]
+    # Never truncated: tells apart question rounds that look identical (e.g. a repeated fallback "q1")
+    st.session_state.applied_count = st.session_state.get('applied_count', 0) + 1
+
+def save_prompt_history(prompt_data: Dict[str, Any]) -> Optional[str]:
+    """Queue the generated prompt for history (written in the background); returns the record id"""
     try:
-        utils = PromptGeneratorUtils()
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = f"history/prompt_{timestamp}.json"
-        
+        filename = f"prompt_{timestamp}"
+
         history_data = {
             "timestamp": timestamp,
             "department": prompt_data.get("department", "Unknown"),
             "original_request": prompt_data.get("original_request", ""),
             "final_prompt": prompt_data.get("final_prompt", ""),
-            "total_questions": prompt_data.get("total_questions_answered", 0)
+            "total_questions": prompt_data.get("total_questions_answered", 0),
+            "user_answers": prompt_data.get("user_answers", {}),
+            "stage_ms": prompt_data.get("stage_ms", {}),
+            "stage_tokens": prompt_data.get("stage_tokens", {}),
+            "reused": bool(prompt_data.get("reused"))
         }
-        
-        utils.save_prompt_history(filename, history_data)
-        return True
+
+        record_id = PromptGeneratorUtils.save_prompt_history(history_data, filename)
+        get_prompt_reuse_index().add(dict(history_data, id=record_id))
+        return record_id
+    except HistoryQueueFull:
+        st.warning("⏳ History is busy saving other prompts - please try again in a moment")
+        return None
     except Exception as e:
         st.error(f"Error saving history: {str(e)}")
-        return False
+        return None
 
-# Sidebar
-with st.sidebar:
-    st.title("🤖 AI Prompt Generator")
-    st.markdown("---")
-    
-    # Connection status
-    is_connected, status_msg = validate_gemini_connection()
-    if is_connected:
-        st.success(f"✅ {status_msg}")
-    else:
-        st.error(f"❌ {status_msg}")
-        st.info("Please check your GEMINI_API_KEY in .env file")
-    
-    st.markdown("---")
-    
-    # Department info - simplified
-    if st.session_state.department_detected:
-        st.subheader("🎯 Department")
-        dept_info = st.session_state.department_detected
-        st.info(f"**{dept_info['department']}**")
-    
-    # Chat status
-    if st.session_state.chat_active:
-        st.subheader("💬 Chat Status")
-        st.success("**Active** - AI Mentor is helping you")
-        st.caption(f"Messages: {len(st.session_state.chat_messages)}")
-    
-    st.markdown("---")
-    
-    # Progress indicator
-    if st.session_state.workflow_state != 'initial':
-        if 'progress' in st.session_state:
-            st.subheader("📊 Progress")
-            st.progress(st.session_state.progress / 100)
-            st.caption(f"{st.session_state.progress}% Complete")
-    
-    st.markdown("---")
-    
-    # Reset button
-    if st.button("🔄 Reset Session", type="secondary"):
-        st.session_state.workflow_state = 'initial'
-        st.session_state.user_answers = {}
-        st.session_state.department_detected = None
-        st.session_state.current_questions = None
-        st.session_state.original_request = ""
+def reset_workflow(clear_chat=True):
+    """Return the session to the initial request screen"""
+    st.session_state.workflow_state = 'initial'
+    st.session_state.user_answers = {}
+    st.session_state.department_detected = None
+    st.session_state.current_questions = None
+    st.session_state.original_request = ""
+    st.session_state.reused_prompt = None
+    st.session_state.stage_ms = {}
+    st.session_state.stage_tokens = {}
+    if clear_chat:
         st.session_state.chat_messages = []
         st.session_state.chat_active = False
         st.session_state.chat_context = {}
-        st.rerun()
 
-# Main content
-st.title("🤖 AI Intelligent Prompt Generator")
-st.markdown("""
-**✨ Magical Prompt Creation** - Generate professional prompts in minutes through intelligent AI questioning. 
-The system automatically understands your needs and creates ready-to-use prompts while teaching you the art of prompt engineering.
-""")
+def build_mentor_prompt(stage, question):
+    """Build the AI mentor prompt for the current workflow stage"""
+    if stage == 'initial':
+        # Get enhanced context for better responses
+        context = f"""
+        Original Request: {st.session_state.get('initial_request_input', '')}
+        Current Input: {question}
+        Conversation Stage: Initial guidance
+        User Profile: Learning prompt engineering
+        """
+
+        return f"""You are an intelligent AI mentor with deep expertise in project development and prompt engineering.
+
+        CONVERSATION CONTEXT:
+        {context}
+
+        USER'S QUESTION: "{question}"
+
+        RESPONSE GUIDELINES:
+        1. **Direct Answer**: Provide a specific, actionable answer to their question
+        2. **Context Awareness**: Reference their original request and current situation
+        3. **Personalized Guidance**: Give advice tailored to their specific project and goals
+        4. **Next Steps**: Provide clear, specific next steps they can take immediately
+        5. **Follow-up Questions**: Ask 1-2 relevant follow-up questions to understand their needs better
+
+        IMPORTANT: Be specific, avoid generic advice, and provide concrete examples relevant to their situation.
+
+        Format your response as:
+        - Direct answer to their question
+        - Specific guidance for their situation
+        - Clear next steps
+        - 1-2 follow-up questions to better understand their needs"""
+
+    if stage == 'awaiting_answers':
+        # Create context for mentor
+        current_context = f"""
+        Original Request: {st.session_state.original_request}
+        Current Department: {st.session_state.department_detected['department']}
+        Current Step: Answering questions for prompt generation
+        """
+
+        return f"""You are a helpful AI mentor helping a user during their prompt generation process.
+
+        {current_context}
+
+        User just asked: "{question}"
+
+        Provide a helpful, educational response that:
+        1. Directly addresses their question/concern
+        2. Provides actionable guidance related to their current task
+        3. Maintains a friendly, mentor-like tone
+        4. Helps them understand how to answer the current questions better
+        5. Gives context-specific advice for their department and project
+
+        Keep responses conversational and helpful. Focus on helping them complete their prompt generation successfully."""
+
+    # Create context for mentor
+    final_context = f"""
+    Original Request: {st.session_state.original_request}
+    Department: {st.session_state.department_detected['department']}
+    Generated Prompt: {st.session_state.final_prompt}
+    Current Status: Prompt generation completed
+    """
+
+    return f"""You are a helpful AI mentor helping a user with their completed prompt.
+
+    {final_context}
+
+    User just asked: "{question}"
+
+    Provide a helpful, educational response that:
+    1. Directly addresses their question/concern about the prompt
+    2. Provides guidance on how to use or modify the prompt
+    3. Maintains a friendly, mentor-like tone
+    4. Helps them understand the prompt better or improve it
+    5. Gives context-specific advice for their department and project
+
+    Keep responses conversational and helpful. Focus on helping them make the most of their generated prompt."""
+
+# Mentor panel copy for each workflow stage
+MENTOR_PANEL_TEXT = {
+    'initial': (
+        "🤖 Your AI mentor is here to help with your request!",
+        "Need help understanding? Want suggestions? Ask anything!"
+    ),
+    'awaiting_answers': (
+        "🤖 Your AI mentor is here to help anytime during the process!",
+        "Need clarification? Want suggestions? Ask anything!"
+    ),
+    'complete': (
+        "🤖 Your AI mentor is here to help with your generated prompt!",
+        "Need help understanding the prompt? Want to modify it? Ask anything!"
+    )
+}
+
+@st.fragment
+def render_sidebar_status():
+    """Sidebar: connection status, workflow summary and session controls"""
+    with fragment_run("sidebar_status"):
+        st.title("🤖 AI Prompt Generator")
+        st.markdown("---")
+
+        # Connection status
+        is_connected, status_msg = validate_gemini_connection()
+        if is_connected:
+            st.success(f"✅ {status_msg}")
+        else:
+            st.error(f"❌ {status_msg}")
+            st.info("Please check your GEMINI_API_KEY in .env file")
+
+        st.markdown("---")
+
+        # Department info - simplified
+        if st.session_state.department_detected:
+            st.subheader("🎯 Department")
+            dept_info = st.session_state.department_detected
+            st.info(f"**{dept_info['department']}**")
+
+        # Chat status
+        if st.session_state.chat_active:
+            st.subheader("💬 Chat Status")
+            st.success("**Active** - AI Mentor is helping you")
+            st.caption(f"Messages: {len(st.session_state.chat_messages)}")
+
+        st.markdown("---")
+
+        # Shared service load
+        load = get_admission_controller().stats()
+        if load["queued"]:
+            st.caption(f"⏳ {load['queued']} request(s) waiting · {load['in_flight']}/{load['max_in_flight']} running")
+        writes = get_history_writer().stats()
+        if writes["queued"] or writes["failed"]:
+            st.caption(f"💾 {writes['queued']} history save(s) pending · {writes['failed']} failed")
+
+        # Progress indicator
+        if st.session_state.workflow_state != 'initial':
+            if 'progress' in st.session_state:
+                st.subheader("📊 Progress")
+                st.progress(st.session_state.progress / 100)
+                st.caption(f"{st.session_state.progress}% Complete")
+
+        st.markdown("---")
+
+        # Resumable session token
+        st.caption(f"🔖 Session `{st.session_state.session_id[:8]}` - reload or bookmark this page to resume")
+        if profiling_enabled():
+            st.caption("🔬 Profiling is on - each workflow step saves a report for the admin page")
+
+        # Reset button
+        if st.button("🔄 Reset Session", type="secondary"):
+            reset_workflow()
+            st.rerun()
+
+        # Script vs fragment run times
+        if Config.SHOW_RENDER_TIMINGS:
+            with st.expander("⏱️ Render Timings", expanded=False):
+                for section, stats in render_timer.summary().items():
+                    st.caption(
+                        f"**{section}**: last {stats['last_ms']:.1f} ms · "
+                        f"avg {stats['avg_ms']:.1f} ms · p95 {stats['p95_ms']:.1f} ms · "
+                        f"{stats['runs']} runs"
+                    )
+                if st.button("Refresh timings", key="refresh_render_timings"):
+                    st.rerun(scope="fragment")
+
+@st.fragment
+def render_history_panel():
+    """Sidebar: recent saved prompts and keyword search over history"""
+    with fragment_run("history_panel"):
+        store = get_history_store()
+        get_history_compactor()
+        if Config.PROMPT_REUSE:
+            get_prompt_reuse_index()
+        if not isinstance(store, SQLiteHistoryStore):
+            return
+
+        with st.expander("📚 Prompt History", expanded=False):
+            usage = get_history_analytics().snapshot()
+            if usage["records"]:
+                busiest = max(usage["departments"].items(), key=lambda item: item[1]["records"])
+                st.caption(f"📈 {usage['records']} prompts saved · most from {busiest[0]} ({busiest[1]['records']})")
+            keywords = st.text_input("Search history", key="history_search", placeholder="e.g. onboarding email")
+            departments = store.departments()
+            department = st.selectbox("Department", ["All"] + departments, key="history_department")
+            department = None if department == "All" else department
+
+            if keywords.strip():
+                results = store.search(keywords, department=department, limit=10, order="recent")
+            else:
+                results = store.recent(limit=10, department=department)
+
+            if not results:
+                st.caption("No saved prompts yet" if not keywords.strip() else "No matches")
+            for item in results:
+                st.markdown(f"**{item['original_request'][:60] or 'Untitled'}**")
+                st.caption(f"{item['department'] or 'Unknown'} · {item['saved_at'][:16].replace('T', ' ')}")
+                if item.get("snippet"):
+                    st.caption(item["snippet"])
+                if st.button("Show prompt", key=f"history_show_{item['id']}"):
+                    record = store.get(item["id"]) or {}
+                    st.code(record.get("final_prompt") or record.get("generated_prompt", ""), language=None)
+
+@st.fragment
+def render_mentor_panel(stage):
+    """Expandable AI mentor chat, rerun on its own when a question is asked"""
+    with fragment_run("mentor_panel"):
+        intro, placeholder = MENTOR_PANEL_TEXT[stage]
 
-# Initial state - User input
-if st.session_state.workflow_state == 'initial':
-    st.markdown("---")
-    st.subheader("🚀 Start Your Prompt Generation")
-    
-    st.info("⚡ **Fast & Easy:** Complete in just a few minutes")
-    
-    # Main input form with automatic mentor detection
-    with st.form("initial_request_form"):
-        user_request = st.text_area(
-            "Describe what you need help with:",
-            placeholder="e.g., I want to create a social media campaign for our new product launch...",
-            height=120,
-            help="Tell us what you need - we'll figure out the rest"
-        )
-        
-        submitted = st.form_submit_button("🚀 Start", type="primary")
-        
-        # Automatic AI Mentor Chat Detection
-        # AI Mentor Chat Extension (Always available)
         with st.expander("💬 Need Help? Ask Your AI Mentor", expanded=False):
-            st.info("🤖 Your AI mentor is here to help with your request!")
-            
+            st.info(intro)
+
             # Display existing chat messages if any
-            if hasattr(st.session_state, 'chat_messages') and st.session_state.chat_messages:
+            if st.session_state.chat_messages:
                 st.markdown("**Previous Chat:**")
                 for message in st.session_state.chat_messages[-3:]:  # Show last 3 messages
                     if message['role'] == 'user':
@@ -164,261 +562,200 @@ if st.session_state.workflow_state == 'initial':
                     else:
                         st.markdown(f"**AI Mentor:** {message['content']}")
                 st.markdown("---")
-            
+
             # Chat input for questions
-            with st.form("initial_mentor_chat_form"):
-                initial_mentor_input = st.text_area(
+            with st.form(f"{stage}_mentor_chat_form", clear_on_submit=True):
+                mentor_input = st.text_area(
                     "Ask your AI mentor:",
-                    placeholder="Need help understanding? Want suggestions? Ask anything!",
+                    placeholder=placeholder,
                     height=80,
-                    key="initial_mentor_chat_input"
+                    key=f"{stage}_mentor_chat_input"
                 )
-                
-                initial_mentor_submitted = st.form_submit_button("💬 Ask Mentor", type="primary")
-                
-                if initial_mentor_submitted and initial_mentor_input.strip():
-                    # Add user message
-                    if not hasattr(st.session_state, 'chat_messages'):
-                        st.session_state.chat_messages = []
-                    
-                    st.session_state.chat_messages.append({
-                        'role': 'user',
-                        'content': initial_mentor_input,
-                        'timestamp': 'now'
-                    })
-                    
-                    # Get AI response
-                    with st.spinner("🤖 AI mentor is thinking..."):
-                        try:
-                            # Get enhanced context for better responses
-                            context = f"""
-                            Original Request: {user_request}
-                            Current Input: {initial_mentor_input}
-                            Conversation Stage: Initial guidance
-                            User Profile: Learning prompt engineering
-                            """
-                            
-                            ai_response = agents._call_gemini_api(
-                                f"""You are an intelligent AI mentor with deep expertise in project development and prompt engineering.
-                                
-                                CONVERSATION CONTEXT:
-                                {context}
-                                
-                                USER'S QUESTION: "{initial_mentor_input}"
-                                
-                                RESPONSE GUIDELINES:
-                                1. **Direct Answer**: Provide a specific, actionable answer to their question
-                                2. **Context Awareness**: Reference their original request and current situation
-                                3. **Personalized Guidance**: Give advice tailored to their specific project and goals
-                                4. **Next Steps**: Provide clear, specific next steps they can take immediately
-                                5. **Follow-up Questions**: Ask 1-2 relevant follow-up questions to understand their needs better
-                                
-                                IMPORTANT: Be specific, avoid generic advice, and provide concrete examples relevant to their situation.
-                                
-                                Format your response as:
-                                - Direct answer to their question
-                                - Specific guidance for their situation
-                                - Clear next steps
-                                - 1-2 follow-up questions to better understand their needs""",
-                                "AI Mentor"
-                            )
-                            
-                            st.session_state.chat_messages.append({
-                                'role': 'assistant',
-                                'content': ai_response,
-                                'timestamp': 'now'
-                            })
-                            
-                            # Clear the input field
-                            st.session_state.initial_mentor_chat_input = ""
-                            st.rerun()
-                            
-                        except Exception as e:
-                            st.error(f"Error getting AI response: {str(e)}")
-                            st.error(f"Full error: {e}")
-                            import traceback
-                            st.error(f"Traceback: {traceback.format_exc()}")
-        
-        if submitted and user_request.strip():
-            with st.spinner("🤖 Analyzing your request..."):
-                try:
-                    agents = GeminiPromptGeneratorAgents()
-                    workflow_result = agents.process_interactive_workflow(user_request)
-                    
-                    if workflow_result['workflow_state'] == 'help_needed':
-                        st.info(workflow_result['message'])
-                    elif workflow_result['workflow_state'] == 'need_more_info':
-                        st.warning(workflow_result['message'])
-                    elif workflow_result['workflow_state'] == 'chat_mode':
-                        # Start chat interface
-                        st.session_state.workflow_state = 'chat_mode'
-                        st.session_state.chat_active = True
-                        st.session_state.original_request = workflow_result['original_request']
-                        st.session_state.chat_context = {
-                            'intent_analysis': workflow_result['intent_analysis'],
-                            'smart_response': workflow_result['smart_response']
-                        }
-                        # Add initial AI message
-                        if workflow_result['smart_response']['type'] == 'question_response':
+
+                mentor_submitted = st.form_submit_button("💬 Ask Mentor", type="primary")
+
+            if mentor_submitted and mentor_input.strip():
+                # Get AI response
+                with st.spinner("🤖 AI mentor is thinking..."):
+                    try:
+                        def ask_mentor():
+                            agents = GeminiPromptGeneratorAgents()
+                            with admitted("chat"):
+                                return agents._call_gemini_api(
+                                    build_mentor_prompt(stage, mentor_input),
+                                    "AI Mentor",
+                                    method="ask_mentor"
+                                )
+
+                        key, ai_response = run_workflow_action(
+                            f"mentor_{stage}",
+                            {"input": mentor_input, "messages": len(st.session_state.chat_messages)},
+                            ask_mentor
+                        )
+
+                        if ai_response is not None:
+                            # Add user message and AI response together so a replay adds neither twice
                             st.session_state.chat_messages.append({
-                                'role': 'assistant',
-                                'content': workflow_result['smart_response']['content'],
+                                'role': 'user',
+                                'content': mentor_input,
                                 'timestamp': 'now'
                             })
-                        elif workflow_result['smart_response']['type'] == 'suggestions_response':
                             st.session_state.chat_messages.append({
                                 'role': 'assistant',
-                                'content': workflow_result['smart_response']['content'],
+                                'content': ai_response,
                                 'timestamp': 'now'
                             })
-                        st.rerun()
-                    else:
-                        # Normal prompt generation flow
-                        st.session_state.workflow_state = 'awaiting_answers'
-                        st.session_state.department_detected = workflow_result['department_detected']
-                        st.session_state.current_questions = workflow_result['questions']
-                        st.session_state.original_request = workflow_result['original_request']
-                        st.rerun()
-                    
-                except Exception as e:
-                    st.error(f"Error processing request: {str(e)}")
-                    st.error(f"Workflow result: {workflow_result}")
-                    st.error("Please try again or contact support if the issue persists.")
+                            mark_action_applied(key)
+
+                        st.rerun(scope="fragment")
+
+                    except AdmissionTimeout as e:
+                        st.error(f"⏳ {str(e)}. Please try again in a moment.")
+                    except Exception as e:
+                        st.error(f"Error getting AI response: {str(e)}")
+
+@st.fragment
+def render_chat_panel():
+    """Chat mode: message history and input, rerun without the rest of the page"""
+    with fragment_run("chat_panel"):
+        # Display chat messages
+        chat_container = st.container()
+        with chat_container:
+            for message in st.session_state.chat_messages:
+                if message['role'] == 'user':
+                    with st.chat_message("user"):
+                        st.write(message['content'])
+                else:
+                    with st.chat_message("assistant"):
+                        st.markdown(message['content'])
+
+        # Chat input
+        with st.form("chat_form", clear_on_submit=True):
+            chat_input = st.text_area(
+                "Ask your AI mentor:",
+                placeholder="Ask questions, seek clarification, or tell me what you'd like to work on...",
+                height=80,
+                key="chat_input"
+            )
+
+            col1, col2 = st.columns([1, 4])
+            with col1:
+                chat_submitted = st.form_submit_button("💬 Send", type="primary")
+            with col2:
+                end_chat = st.form_submit_button("✅ End Chat & Continue", type="secondary")
 
-# Chat mode - Dynamic chat interface
-elif st.session_state.workflow_state == 'chat_mode':
-    st.markdown("---")
-    
-    # Show chat interface
-    st.subheader("💬 AI Mentor Chat")
-    st.info("🤖 Your AI mentor is here to help! Ask questions and get guidance.")
-    
-    # Display chat messages
-    chat_container = st.container()
-    with chat_container:
-        for message in st.session_state.chat_messages:
-            if message['role'] == 'user':
-                with st.chat_message("user"):
-                    st.write(message['content'])
-            else:
-                with st.chat_message("assistant"):
-                    st.markdown(message['content'])
-    
-    # Chat input
-    with st.form("chat_form"):
-        chat_input = st.text_area(
-            "Ask your AI mentor:",
-            placeholder="Ask questions, seek clarification, or tell me what you'd like to work on...",
-            height=80,
-            key="chat_input"
-        )
-        
-        col1, col2 = st.columns([1, 4])
-        with col1:
-            chat_submitted = st.form_submit_button("💬 Send", type="primary")
-        with col2:
-            end_chat = st.form_submit_button("✅ End Chat & Continue", type="secondary")
-        
         if chat_submitted and chat_input.strip():
-            # Add user message
-            st.session_state.chat_messages.append({
-                'role': 'user',
-                'content': chat_input,
-                'timestamp': 'now'
-            })
-            
             # Get AI response
             with st.spinner("🤖 AI mentor is thinking..."):
                 try:
-                    agents = GeminiPromptGeneratorAgents()
-                    ai_response = agents._call_gemini_api(
-                        f"""You are a helpful AI mentor helping a user with their project. 
-                        
+                    chat_prompt = f"""You are a helpful AI mentor helping a user with their project.
+
                         Original user request: "{st.session_state.original_request}"
                         Chat context: {st.session_state.chat_context}
-                        
+
                         User just said: "{chat_input}"
-                        
+
                         Provide a helpful, educational response that:
                         1. Directly addresses their question/concern
                         2. Provides actionable guidance
                         3. Maintains a friendly, mentor-like tone
                         4. Helps them move toward creating their prompt
                         5. Asks follow-up questions if needed
-                        
-                        Keep responses conversational and helpful.""",
-                        "AI Mentor"
+
+                        Keep responses conversational and helpful."""
+
+                    def send_chat():
+                        agents = GeminiPromptGeneratorAgents()
+                        with admitted("chat"):
+                            return agents._call_gemini_api(chat_prompt, "AI Mentor", method="send_chat")
+
+                    key, ai_response = run_workflow_action(
+                        "chat_send",
+                        {"input": chat_input, "messages": len(st.session_state.chat_messages)},
+                        send_chat
                     )
-                    
-                    st.session_state.chat_messages.append({
-                        'role': 'assistant',
-                        'content': ai_response,
-                        'timestamp': 'now'
-                    })
-                    
-                    st.rerun()
-                    
+
+                    if ai_response is not None:
+                        # Add user message and AI response together so a replay adds neither twice
+                        st.session_state.chat_messages.append({
+                            'role': 'user',
+                            'content': chat_input,
+                            'timestamp': 'now'
+                        })
+                        st.session_state.chat_messages.append({
+                            'role': 'assistant',
+                            'content': ai_response,
+                            'timestamp': 'now'
+                        })
+                        mark_action_applied(key)
+
+                    st.rerun(scope="fragment")
+
+                except AdmissionTimeout as e:
+                    st.error(f"⏳ {str(e)}. Please try again in a moment.")
                 except Exception as e:
                     st.error(f"Error getting AI response: {str(e)}")
-        
+
         elif end_chat:
             # Transition to prompt generation with chat context
             with st.spinner("🤖 Preparing your personalized prompt generation..."):
                 try:
-                    agents = GeminiPromptGeneratorAgents()
-                    
                     # Create enhanced context from chat
                     chat_summary = "\n".join([
-                        f"{msg['role']}: {msg['content']}" 
+                        f"{msg['role']}: {msg['content']}"
                         for msg in st.session_state.chat_messages
                     ])
-                    
+
                     enhanced_request = f"{st.session_state.original_request}\n\nChat Context:\n{chat_summary}"
-                    
-                    # Detect department with enhanced context
-                    department_info = agents.detect_department(enhanced_request)
-                    
-                    # Generate questions with chat context
-                    questions_info = agents.generate_interactive_questions(enhanced_request, department_info["department"])
-                    
-                    st.session_state.workflow_state = 'awaiting_answers'
-                    st.session_state.department_detected = department_info
-                    st.session_state.current_questions = questions_info
-                    st.session_state.original_request = enhanced_request
-                    st.session_state.chat_active = False
+
+                    def prepare_questions():
+                        agents = GeminiPromptGeneratorAgents()
+                        with admitted("workflow"):
+                            # Detect department with enhanced context
+                            department_info = agents.detect_department(enhanced_request)
+
+                            # Generate questions with chat context
+                            questions_info = agents.generate_interactive_questions(enhanced_request, department_info["department"])
+                        return department_info, questions_info
+
+                    key, prepared = run_workflow_action("end_chat", {"request": enhanced_request}, prepare_questions)
+
+                    if prepared is not None:
+                        department_info, questions_info = prepared
+                        st.session_state.workflow_state = 'awaiting_answers'
+                        st.session_state.department_detected = department_info
+                        st.session_state.current_questions = questions_info
+                        st.session_state.original_request = enhanced_request
+                        st.session_state.chat_active = False
+                        mark_action_applied(key)
                     st.rerun()
-                    
+
+                except AdmissionTimeout as e:
+                    st.error(f"⏳ {str(e)}. Please try again in a moment.")
                 except Exception as e:
                     st.error(f"Error transitioning from chat: {str(e)}")
 
-# Question answering state
-elif st.session_state.workflow_state == 'awaiting_answers':
-    st.markdown("---")
-    
-    # Show department detection result
-    if st.session_state.department_detected:
-        dept_info = st.session_state.department_detected
-        st.success(f"🎯 **Department Detected:** {dept_info['department']}")
-    
-    # Show current questions
-    if st.session_state.current_questions:
+@st.fragment
+def render_question_form():
+    """Question answering form; submitting reruns only this fragment unless the workflow moves on"""
+    with fragment_run("question_form"):
         questions_data = st.session_state.current_questions
-        
+
         st.subheader("📝 Questions")
         st.caption(f"Step: {questions_data.get('next_step', 'Gathering information')}")
-        
+
         # Simple progress bar
         progress = questions_data.get('progress_percentage', 0)
         st.progress(progress / 100)
         st.caption(f"Progress: {progress}%")
-        
+
         # Question form - separate from mentor chat to avoid nested forms
-        with st.form("questions_form_initial"):
+        with st.form("questions_form"):
             answers = {}
-            
+
             for question in questions_data.get('questions', []):
                 st.markdown(f"**{question['question']}**")
-                
+
                 if question.get('type') == 'multiple_choice' and question.get('options'):
                     answer = st.selectbox(
                         "Choose an option:",
@@ -431,9 +768,9 @@ elif st.session_state.workflow_state == 'awaiting_answers':
                         key=f"q_{question['id']}",
                         height=80
                     )
-                
+
                 answers[question['id']] = answer
-            
+
             # Simple time estimate
             num_questions = len(questions_data.get('questions', []))
             if num_questions <= 2:
@@ -442,280 +779,237 @@ elif st.session_state.workflow_state == 'awaiting_answers':
                 st.info("⏱️ Just a few more questions")
             else:
                 st.info("⏱️ Quick process")
-            
+
             submitted = st.form_submit_button("➡️ Continue", type="primary")
-            
-            if submitted:
-                # Update user answers
-                st.session_state.user_answers.update(answers)
-                
-                with st.spinner("🤖 Generating your prompt..."):
-                    try:
+
+        if submitted:
+            # Update user answers
+            st.session_state.user_answers.update(answers)
+
+            with st.spinner("🤖 Generating your prompt..."):
+                try:
+                    original_request = st.session_state.original_request
+                    department = st.session_state.department_detected['department']
+                    user_answers = dict(st.session_state.user_answers)
+
+                    def continue_workflow():
                         agents = GeminiPromptGeneratorAgents()
-                        workflow_result = agents.continue_workflow(
-                            st.session_state.original_request,
-                            st.session_state.department_detected['department'],
-                            st.session_state.user_answers
-                        )
-                        
-                        if workflow_result['workflow_state'] == 'complete':
-                            st.session_state.workflow_state = 'complete'
-                            st.session_state.final_prompt = workflow_result['final_prompt']
-                            st.session_state.summary = workflow_result['summary']
-                        elif workflow_result['workflow_state'] == 'error':
-                            st.error(workflow_result['error'])
-                        else:
-                            st.session_state.current_questions = workflow_result['questions']
-                            st.session_state.progress = workflow_result['progress']
-                        
+                        reuse_lookup = lookup_reusable_prompt if Config.PROMPT_REUSE else None
+                        with admitted("workflow"):
+                            return agents.continue_workflow(original_request, department, user_answers, reuse_lookup)
+
+                    key, workflow_result = run_workflow_action(
+                        "continue",
+                        {
+                            "request": original_request,
+                            "department": department,
+                            "answers": user_answers,
+                            "round": st.session_state.get('applied_count', 0)
+                        },
+                        continue_workflow
+                    )
+
+                    if workflow_result is None:
+                        # Duplicate submit of answers this session already applied
                         st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error processing answers: {str(e)}")
-    
-    # Legacy AI Mentor Chat Extension Button (fallback)
-    with st.expander("💬 Need Help? Ask Your AI Mentor", expanded=False):
-        st.info("🤖 Your AI mentor is here to help anytime during the process!")
-        
-        # Display existing chat messages if any
-        if hasattr(st.session_state, 'chat_messages') and st.session_state.chat_messages:
-            st.markdown("**Previous Chat:**")
-            for message in st.session_state.chat_messages[-3:]:  # Show last 3 messages
-                if message['role'] == 'user':
-                    st.markdown(f"**You:** {message['content']}")
-                else:
-                    st.markdown(f"**AI Mentor:** {message['content']}")
-            st.markdown("---")
-        
-        # Chat input for questions
-        with st.form("mentor_chat_form"):
-            mentor_input = st.text_area(
-                "Ask your AI mentor:",
-                placeholder="Need clarification? Want suggestions? Ask anything!",
-                height=80,
-                key="mentor_chat_input"
-            )
-            
-            mentor_submitted = st.form_submit_button("💬 Ask Mentor", type="primary")
-            
-            if mentor_submitted and mentor_input.strip():
-                # Add user message
-                if not hasattr(st.session_state, 'chat_messages'):
-                    st.session_state.chat_messages = []
-                
-                st.session_state.chat_messages.append({
-                    'role': 'user',
-                    'content': mentor_input,
-                    'timestamp': 'now'
-                })
-                
-                # Get AI response
-                with st.spinner("🤖 AI mentor is thinking..."):
-                    try:
+                    elif workflow_result['workflow_state'] == 'complete':
+                        add_stage_timings(workflow_result.get('stage_ms'))
+                        add_stage_tokens(workflow_result.get('stage_tokens'))
+                        st.session_state.workflow_state = 'complete'
+                        st.session_state.final_prompt = workflow_result['final_prompt']
+                        st.session_state.summary = workflow_result['summary']
+                        st.session_state.reused_prompt = workflow_result.get('reused')
+                    elif workflow_result['workflow_state'] == 'error':
+                        st.error(workflow_result['error'])
+                        return
+                    else:
+                        add_stage_timings(workflow_result.get('stage_ms'))
+                        add_stage_tokens(workflow_result.get('stage_tokens'))
+                        st.session_state.current_questions = workflow_result['questions']
+                        st.session_state.progress = workflow_result['progress']
+
+                    mark_action_applied(key)
+                    st.rerun()
+
+                except AdmissionTimeout as e:
+                    st.error(f"⏳ {str(e)}. Please try again in a moment.")
+                except Exception as e:
+                    st.error(f"Error processing answers: {str(e)}")
+
+REQUEST_LABEL = "Describe what you need help with:"
+
+def schedule_predictive_triage():
+    """Restart the idle timer for the draft request (text area on_change, i.e. blur or Ctrl+Enter)"""
+    get_predictive_triage().schedule(
+        st.session_state.initial_request_input,
+        owner=st.session_state.session_id
+    )
+
+@st.fragment
+def render_request_form():
+    """Initial request input; editing and submitting rerun only this fragment"""
+    with fragment_run("request_form"):
+        user_request = st.text_area(
+            REQUEST_LABEL,
+            placeholder="e.g., I want to create a social media campaign for our new product launch...",
+            height=120,
+            help="Tell us what you need - we'll figure out the rest",
+            key="initial_request_input",
+            on_change=schedule_predictive_triage if Config.PREDICTIVE_TRIAGE else None
+        )
+
+        if Config.PREDICTIVE_TRIAGE:
+            # Typing pauses are seen in the browser, so the triage starts without waiting for blur
+            draft = draft_idle(REQUEST_LABEL, Config.PREDICTIVE_TRIAGE_DELAY, key="initial_request_idle")
+            if draft and draft != st.session_state.get("triaged_draft"):
+                st.session_state.triaged_draft = draft
+                get_predictive_triage().start(draft, owner=st.session_state.session_id)
+
+        if Config.PREDICTIVE_TRIAGE and user_request.strip() and get_predictive_triage().status(user_request) == "ready":
+            st.caption("⚡ Your first step is already prepared")
+
+        # Same request generated before (one index lookup)
+        history_store = get_history_store()
+        if user_request.strip() and isinstance(history_store, SQLiteHistoryStore):
+            seen = history_store.find_by_request(user_request)
+            if seen:
+                st.caption(
+                    f"📚 This request was already turned into a prompt on {seen['saved_at'][:10]} - "
+                    "search for it under Prompt History in the sidebar"
+                )
+
+        submitted = st.button("🚀 Start", type="primary")
+
+        if submitted and user_request.strip():
+            with st.spinner("🤖 Analyzing your request..."):
+                try:
+                    def start_workflow():
+                        # Reuse the speculative intent and department if the text is unchanged since
+                        # they ran, waiting briefly for a run in flight before doing them ourselves.
+                        # The click blurred the field, so a run still waiting on its timer starts now.
+                        prefetched = None
+                        if Config.PREDICTIVE_TRIAGE:
+                            get_predictive_triage().flush(st.session_state.session_id)
+                            prefetched = get_predictive_triage().get(user_request, timeout=Config.PREDICTIVE_TRIAGE_WAIT)
+                            record_cache_lookup("predictive_triage", prefetched is not None)
+
                         agents = GeminiPromptGeneratorAgents()
-                        
-                        # Create context for mentor
-                        current_context = f"""
-                        Original Request: {st.session_state.original_request}
-                        Current Department: {st.session_state.department_detected['department']}
-                        Current Step: Answering questions for prompt generation
-                        """
-                        
-                        ai_response = agents._call_gemini_api(
-                            f"""You are a helpful AI mentor helping a user during their prompt generation process. 
-                            
-                            {current_context}
-                            
-                            User just asked: "{mentor_input}"
-                            
-                            Provide a helpful, educational response that:
-                            1. Directly addresses their question/concern
-                            2. Provides actionable guidance related to their current task
-                            3. Maintains a friendly, mentor-like tone
-                            4. Helps them understand how to answer the current questions better
-                            5. Gives context-specific advice for their department and project
-                            
-                            Keep responses conversational and helpful. Focus on helping them complete their prompt generation successfully.""",
-                            "AI Mentor"
-                        )
-                        
-                        st.session_state.chat_messages.append({
-                            'role': 'assistant',
-                            'content': ai_response,
-                            'timestamp': 'now'
-                        })
-                        
-                        # Clear the input field
-                        st.session_state.mentor_chat_input = ""
+                        with admitted("workflow"):
+                            result = agents.process_interactive_workflow(user_request, prefetched=prefetched)
+                        if prefetched and "stage_tokens" in result:
+                            # The prompt's totals include the calls made ahead of time
+                            result["stage_tokens"] = combine_stage_tokens(prefetched["stage_tokens"], result["stage_tokens"])
+                        return result
+
+                    key, workflow_result = run_workflow_action("start", {"request": user_request}, start_workflow)
+
+                    if workflow_result is None:
+                        # Duplicate submit this session already applied
                         st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error getting AI response: {str(e)}")
-                        st.error(f"Full error: {e}")
-                        import traceback
-                        st.error(f"Traceback: {traceback.format_exc()}")
-    
+                    elif workflow_result['workflow_state'] == 'help_needed':
+                        st.info(workflow_result['message'])
+                    elif workflow_result['workflow_state'] == 'need_more_info':
+                        st.warning(workflow_result['message'])
+                    elif workflow_result['workflow_state'] == 'chat_mode':
+                        # Start chat interface
+                        st.session_state.workflow_state = 'chat_mode'
+                        st.session_state.chat_active = True
+                        st.session_state.original_request = workflow_result['original_request']
+                        st.session_state.chat_context = {
+                            'intent_analysis': workflow_result['intent_analysis'],
+                            'smart_response': workflow_result['smart_response']
+                        }
+                        # Add initial AI message
+                        if workflow_result['smart_response']['type'] in ['question_response', 'suggestions_response']:
+                            st.session_state.chat_messages.append({
+                                'role': 'assistant',
+                                'content': workflow_result['smart_response']['content'],
+                                'timestamp': 'now'
+                            })
+                        mark_action_applied(key)
+                        st.rerun()
+                    else:
+                        # Normal prompt generation flow
+                        st.session_state.workflow_state = 'awaiting_answers'
+                        st.session_state.department_detected = workflow_result['department_detected']
+                        st.session_state.current_questions = workflow_result['questions']
+                        st.session_state.stage_ms = {}
+                        st.session_state.stage_tokens = {}
+                        add_stage_timings(workflow_result.get('stage_ms'))
+                        add_stage_tokens(workflow_result.get('stage_tokens'))
+                        st.session_state.original_request = workflow_result['original_request']
+                        mark_action_applied(key)
+                        st.rerun()
+
+                except AdmissionTimeout as e:
+                    st.error(f"⏳ {str(e)}. Please try again in a moment.")
+                except Exception as e:
+                    st.error(f"Error processing request: {str(e)}")
+                    st.error("Please try again or contact support if the issue persists.")
+
+# Metrics endpoint for ops (started once per process) and this session's activity
+get_metrics_server()
+get_recent_sessions().touch(st.session_state.session_id)
+
+# Sidebar
+with st.sidebar:
+    render_sidebar_status()
+    render_history_panel()
+
+# Main content
+st.title("🤖 AI Intelligent Prompt Generator")
+st.markdown("""
+**✨ Magical Prompt Creation** - Generate professional prompts in minutes through intelligent AI questioning.
+The system automatically understands your needs and creates ready-to-use prompts while teaching you the art of prompt engineering.
+""")
+
+# Initial state - User input
+if st.session_state.workflow_state == 'initial':
+    st.markdown("---")
+    st.subheader("🚀 Start Your Prompt Generation")
+
+    st.info("⚡ **Fast & Easy:** Complete in just a few minutes")
+
+    # Main input with automatic mentor detection
+    render_request_form()
+
+    # AI Mentor Chat Extension (Always available)
+    render_mentor_panel('initial')
+
+# Chat mode - Dynamic chat interface
+elif st.session_state.workflow_state == 'chat_mode':
+    st.markdown("---")
+
+    # Show chat interface
+    st.subheader("💬 AI Mentor Chat")
+    st.info("🤖 Your AI mentor is here to help! Ask questions and get guidance.")
+
+    render_chat_panel()
+
+# Question answering state
+elif st.session_state.workflow_state == 'awaiting_answers':
+    st.markdown("---")
+
+    # Show department detection result
+    if st.session_state.department_detected:
+        dept_info = st.session_state.department_detected
+        st.success(f"🎯 **Department Detected:** {dept_info['department']}")
+
     # Show current questions
     if st.session_state.current_questions:
-        questions_data = st.session_state.current_questions
-        
-        st.subheader("📝 Questions")
-        st.caption(f"Step: {questions_data.get('next_step', 'Gathering information')}")
-        
-        # Simple progress bar
-        progress = questions_data.get('progress_percentage', 0)
-        st.progress(progress / 100)
-        st.caption(f"Progress: {progress}%")
-        
-        # Question form
-        with st.form("questions_form_continue"):
-            answers = {}
-            
-            for question in questions_data.get('questions', []):
-                st.markdown(f"**{question['question']}**")
-                
-                if question.get('type') == 'multiple_choice' and question.get('options'):
-                    answer = st.selectbox(
-                        "Choose an option:",
-                        options=question['options'],
-                        key=f"q_{question['id']}"
-                    )
-                else:
-                    answer = st.text_area(
-                        "Your answer:",
-                        key=f"q_{question['id']}",
-                        height=80
-                    )
-                
-                answers[question['id']] = answer
-            
-            # Simple time estimate
-            num_questions = len(questions_data.get('questions', []))
-            if num_questions <= 2:
-                st.info("⏱️ Almost done!")
-            elif num_questions <= 3:
-                st.info("⏱️ Just a few more questions")
-            else:
-                st.info("⏱️ Quick process")
-            
-            submitted = st.form_submit_button("➡️ Continue", type="primary")
-            
-            if submitted:
-                # Update user answers
-                st.session_state.user_answers.update(answers)
-                
-                with st.spinner("🤖 Generating your prompt..."):
-                    try:
-                        agents = GeminiPromptGeneratorAgents()
-                        workflow_result = agents.continue_workflow(
-                            st.session_state.original_request,
-                            st.session_state.department_detected['department'],
-                            st.session_state.user_answers
-                        )
-                        
-                        if workflow_result['workflow_state'] == 'complete':
-                            st.session_state.workflow_state = 'complete'
-                            st.session_state.final_prompt = workflow_result['final_prompt']
-                            st.session_state.summary = workflow_result['summary']
-                        elif workflow_result['workflow_state'] == 'error':
-                            st.error(workflow_result['error'])
-                        else:
-                            st.session_state.current_questions = workflow_result['questions']
-                            st.session_state.progress = workflow_result['progress']
-                        
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error processing answers: {str(e)}")
+        render_question_form()
+
+    # AI Mentor Chat Extension
+    render_mentor_panel('awaiting_answers')
 
 # Final prompt state
 elif st.session_state.workflow_state == 'complete':
     st.markdown("---")
     st.success("🎉 **Your Prompt is Ready!**")
-    
+
     # AI Mentor Chat Extension Button (Final State)
-    with st.expander("💬 Need Help? Ask Your AI Mentor", expanded=False):
-        st.info("🤖 Your AI mentor is here to help with your generated prompt!")
-        
-        # Display existing chat messages if any
-        if hasattr(st.session_state, 'chat_messages') and st.session_state.chat_messages:
-            st.markdown("**Previous Chat:**")
-            for message in st.session_state.chat_messages[-3:]:  # Show last 3 messages
-                if message['role'] == 'user':
-                    st.markdown(f"**You:** {message['content']}")
-                else:
-                    st.markdown(f"**AI Mentor:** {message['content']}")
-            st.markdown("---")
-        
-        # Chat input for questions
-        with st.form("final_mentor_chat_form"):
-            final_mentor_input = st.text_area(
-                "Ask your AI mentor:",
-                placeholder="Need help understanding the prompt? Want to modify it? Ask anything!",
-                height=80,
-                key="final_mentor_chat_input"
-            )
-            
-            final_mentor_submitted = st.form_submit_button("💬 Ask Mentor", type="primary")
-            
-            if final_mentor_submitted and final_mentor_input.strip():
-                # Add user message
-                if not hasattr(st.session_state, 'chat_messages'):
-                    st.session_state.chat_messages = []
-                
-                st.session_state.chat_messages.append({
-                    'role': 'user',
-                    'content': final_mentor_input,
-                    'timestamp': 'now'
-                })
-                
-                # Get AI response
-                with st.spinner("🤖 AI mentor is thinking..."):
-                    try:
-                        agents = GeminiPromptGeneratorAgents()
-                        
-                        # Create context for mentor
-                        final_context = f"""
-                        Original Request: {st.session_state.original_request}
-                        Department: {st.session_state.department_detected['department']}
-                        Generated Prompt: {st.session_state.final_prompt}
-                        Current Status: Prompt generation completed
-                        """
-                        
-                        ai_response = agents._call_gemini_api(
-                            f"""You are a helpful AI mentor helping a user with their completed prompt. 
-                            
-                            {final_context}
-                            
-                            User just asked: "{final_mentor_input}"
-                            
-                            Provide a helpful, educational response that:
-                            1. Directly addresses their question/concern about the prompt
-                            2. Provides guidance on how to use or modify the prompt
-                            3. Maintains a friendly, mentor-like tone
-                            4. Helps them understand the prompt better or improve it
-                            5. Gives context-specific advice for their department and project
-                            
-                            Keep responses conversational and helpful. Focus on helping them make the most of their generated prompt.""",
-                            "AI Mentor"
-                        )
-                        
-                        st.session_state.chat_messages.append({
-                            'role': 'assistant',
-                            'content': ai_response,
-                            'timestamp': 'now'
-                        })
-                        
-                        # Clear the input field
-                        st.session_state.final_mentor_chat_input = ""
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error getting AI response: {str(e)}")
-                        st.error(f"Full error: {e}")
-                        import traceback
-                        st.error(f"Traceback: {traceback.format_exc()}")
-    
+    render_mentor_panel('complete')
+
     # Summary - simplified
     if hasattr(st.session_state, 'summary'):
         summary = st.session_state.summary
@@ -726,10 +1020,56 @@ elif st.session_state.workflow_state == 'complete':
             st.metric("Questions", summary['total_questions_answered'])
         with col3:
             st.metric("Request", summary['original_request'][:30] + "..." if len(summary['original_request']) > 30 else summary['original_request'])
-    
+
     # Final prompt
     st.subheader("📝 Your Ready-to-Use Prompt")
-    
+
+    reused = st.session_state.get('reused_prompt')
+    if reused:
+        saved_on = reused['saved_at'][:10] or "earlier"
+        if reused['mode'] == "serve":
+            st.info(
+                f"♻️ Reused a saved prompt from {saved_on} ({reused['score']:.0%} match): "
+                f"\"{reused['original_request'][:80]}\""
+            )
+            if st.button("✨ Generate a fresh prompt instead", key="regenerate_prompt"):
+                original_request = st.session_state.original_request
+                department = st.session_state.department_detected['department']
+                user_answers = dict(st.session_state.user_answers)
+                seed_prompt = st.session_state.final_prompt
+
+                def regenerate():
+                    with admitted("workflow"), metered() as meter:
+                        started = time.perf_counter()
+                        final_prompt = GeminiPromptGeneratorAgents().generate_final_prompt(
+                            original_request, department, user_answers, seed_prompt
+                        )
+                        return final_prompt, round((time.perf_counter() - started) * 1000, 1), meter.by_stage()
+
+                try:
+                    with st.spinner("🤖 Generating a fresh prompt..."):
+                        key, result = run_workflow_action(
+                            "regenerate",
+                            {
+                                "request": original_request,
+                                "department": department,
+                                "answers": user_answers,
+                                "round": st.session_state.get('applied_count', 0)
+                            },
+                            regenerate
+                        )
+                    if result is not None:
+                        st.session_state.final_prompt, final_prompt_ms, final_prompt_tokens = result
+                        add_stage_timings({"final_prompt": final_prompt_ms})
+                        add_stage_tokens(final_prompt_tokens)
+                        st.session_state.reused_prompt = dict(reused, mode="seed")
+                        mark_action_applied(key)
+                    st.rerun()
+                except AdmissionTimeout as e:
+                    st.error(f"⏳ {str(e)}. Please try again in a moment.")
+        else:
+            st.caption(f"♻️ Built on a saved prompt for a similar request ({reused['score']:.0%} match)")
+
     if hasattr(st.session_state, 'final_prompt'):
         st.text_area(
             "Generated Prompt:",
@@ -737,29 +1077,29 @@ elif st.session_state.workflow_state == 'complete':
             height=400,
             disabled=True
         )
-        
+
         # Copy button
         if st.button("📋 Copy to Clipboard", type="primary"):
             st.write("✅ Prompt copied to clipboard!")
-        
+
         # Save to history
         if st.button("💾 Save to History", type="secondary"):
             prompt_data = {
                 "department": st.session_state.department_detected['department'],
                 "original_request": st.session_state.original_request,
                 "final_prompt": st.session_state.final_prompt,
-                "total_questions_answered": st.session_state.summary['total_questions_answered']
+                "total_questions_answered": st.session_state.summary['total_questions_answered'],
+                "user_answers": dict(st.session_state.user_answers),
+                "stage_ms": dict(st.session_state.get('stage_ms') or {}),
+                "stage_tokens": dict(st.session_state.get('stage_tokens') or {}),
+                "reused": st.session_state.get('reused_prompt') is not None
             }
             if save_prompt_history(prompt_data):
                 st.success("✅ Prompt saved to history!")
-    
+
     # Start new session
     if st.button("🔄 Generate Another Prompt", type="primary"):
-        st.session_state.workflow_state = 'initial'
-        st.session_state.user_answers = {}
-        st.session_state.department_detected = None
-        st.session_state.current_questions = None
-        st.session_state.original_request = ""
+        reset_workflow(clear_chat=False)
         st.rerun()
 
 # Footer
@@ -773,3 +1113,10 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# Full script run time (fragment reruns are recorded by their own sections)
+_script_ms = (time.perf_counter() - _script_started) * 1000
+render_timer.record("script", _script_ms)
+get_tracer().record("ui.script", _script_ms, session_id=st.session_state.session_id)
+
+persist_session()
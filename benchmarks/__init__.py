@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for AI Prompt Generator
+A local stand-in for the Gemini API and timing suites that run against it
+"""
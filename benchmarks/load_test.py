@@ -0,0 +1,370 @@
+"""
+Concurrent-session load test for AI Prompt Generator
+Drives virtual users through the workflow paths against the mock Gemini server at rising concurrency
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.mock_gemini import DEFAULT_RESPONSES, MockGeminiServer, parse_latency
+from benchmarks.workflow_bench import (
+    DIRECT_REQUEST, FIRST_ANSWERS, MENTOR_QUESTION, SECOND_ANSWERS, _git_commit, percentile, summarize
+)
+from utils.admission import AdmissionController, AdmissionTimeout
+
+MENTOR_FOLLOW_UPS = [
+    "Which of those metrics should be on the first screen?",
+    "How often should the team review them?"
+]
+
+_ONE_QUESTION = json.dumps({
+    "questions": [{"id": "q6", "question": "Anything else the posts must cover?", "type": "text", "required": True}],
+    "progress_percentage": 95,
+    "is_complete": False
+}, indent=2)
+
+
+def _questions(text: str) -> str:
+    """Three questions per round until all five answers are in, then one last (completing) question"""
+    return _ONE_QUESTION if '"q5"' in text else DEFAULT_RESPONSES["Interactive Questioning Specialist"]
+
+
+def _mentor_intent(text: str) -> str:
+    """Route the mentor question to chat mode and everything else to prompt generation"""
+    if MENTOR_QUESTION in text:
+        return json.dumps({"intent_type": "question", "confidence": "high"})
+    return DEFAULT_RESPONSES["Input Intent Analyzer"]
+
+
+# Responses that let a virtual user walk each path to its end
+LOAD_RESPONSES = {"Interactive Questioning Specialist": _questions, "Input Intent Analyzer": _mentor_intent}
+
+
+def _state(expected: str) -> Callable[[Any], bool]:
+    return lambda result: isinstance(result, dict) and result.get("workflow_state") == expected
+
+
+def _answered(result: Any) -> bool:
+    return isinstance(result, str) and not result.startswith("Error")
+
+
+def _prompt_path(agents, act: Callable) -> None:
+    """Direct request, two rounds of answers, final prompt"""
+    result = act("start", "workflow", lambda: agents.process_interactive_workflow(DIRECT_REQUEST), _state("awaiting_answers"))
+    if result is None:
+        return
+    department = result["department_detected"]["department"]
+    if act("answers", "workflow", lambda: agents.continue_workflow(DIRECT_REQUEST, department, FIRST_ANSWERS), _state("awaiting_answers")) is None:
+        return
+    act("final", "workflow", lambda: agents.continue_workflow(DIRECT_REQUEST, department, SECOND_ANSWERS), _state("complete"))
+
+
+def _mentor_path(agents, act: Callable) -> None:
+    """A question answered in chat mode, then mentor follow-ups"""
+    if act("mentor_start", "workflow", lambda: agents.process_interactive_workflow(MENTOR_QUESTION), _state("chat_mode")) is None:
+        return
+    for question in MENTOR_FOLLOW_UPS:
+        if act("mentor_chat", "chat", lambda: agents._call_gemini_api(question, "AI Mentor", method="mentor_chat"), _answered) is None:
+            return
+
+
+PATHS = {"prompt": _prompt_path, "mentor": _mentor_path}
+
+
+def _rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+class _Sampler:
+    """
+    Samples thread count and memory on a background thread while a step runs
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.threads: List[int] = []
+        self.rss: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-sampler", daemon=True)
+
+    def __enter__(self) -> "_Sampler":
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _sample(self) -> None:
+        self.threads.append(threading.active_count())
+        rss = _rss_mb()
+        if rss is not None:
+            self.rss.append(rss)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+
+class _StepRecorder:
+    """
+    Latency, queue wait and outcome of every action in one concurrency step
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[str, List[float]] = {}
+        self.queue_ms: List[float] = []
+        self.failed: Dict[str, int] = {}
+        self.sessions: Dict[str, int] = {}
+
+    def action(self, action: str, wall_ms: float, queue_ms: float, ok: bool) -> None:
+        with self._lock:
+            self.latency.setdefault(action, []).append(wall_ms)
+            self.queue_ms.append(queue_ms)
+            if not ok:
+                self.failed[action] = self.failed.get(action, 0) + 1
+
+    def session(self, path: str) -> None:
+        with self._lock:
+            self.sessions[path] = self.sessions.get(path, 0) + 1
+
+
+def _virtual_user(
+    session_id: str,
+    agents,
+    controller: AdmissionController,
+    recorder: _StepRecorder,
+    deadline: float,
+    mentor_share: float,
+    think: Callable[[random.Random], float],
+    rng: random.Random
+) -> None:
+    """Run paths back to back until the step ends, finishing the path in progress"""
+
+    def act(action, kind, fn, ok):
+        # Same shape as the app: wait for an admission slot, then call the agents
+        started = time.perf_counter()
+        try:
+            with controller.slot(session_id, kind):
+                queued = (time.perf_counter() - started) * 1000
+                result = fn()
+        except AdmissionTimeout:
+            recorder.action(action, (time.perf_counter() - started) * 1000, (time.perf_counter() - started) * 1000, False)
+            return None
+        except Exception as e:
+            print(f"⚠️ {session_id} {action} failed: {e}", file=sys.stderr)
+            recorder.action(action, (time.perf_counter() - started) * 1000, 0.0, False)
+            return None
+        succeeded = ok(result)
+        recorder.action(action, (time.perf_counter() - started) * 1000, queued, succeeded)
+        pause = think(rng)
+        if pause:
+            time.sleep(pause)
+        return result if succeeded else None
+
+    while time.perf_counter() < deadline:
+        path = "mentor" if rng.random() < mentor_share else "prompt"
+        PATHS[path](agents, act)
+        recorder.session(path)
+
+
+def run_step(
+    users: int,
+    make_agents: Callable[[], Any],
+    duration: float = 10.0,
+    mentor_share: float = 0.3,
+    think: str = "0",
+    max_in_flight: Optional[int] = None,
+    server: Optional[MockGeminiServer] = None,
+    seed: int = 1
+) -> Dict[str, Any]:
+    """Run ``users`` virtual users for ``duration`` seconds and summarize the step"""
+    from config import Config
+
+    controller = AdmissionController(
+        max_in_flight=max_in_flight or Config.MAX_IN_FLIGHT_REQUESTS,
+        per_session_limit=Config.PER_SESSION_CONCURRENCY,
+        weights={"workflow": Config.WORKFLOW_PRIORITY_WEIGHT, "chat": Config.CHAT_PRIORITY_WEIGHT},
+        queue_timeout=Config.ADMISSION_QUEUE_TIMEOUT
+    )
+    think_sampler = parse_latency(think)
+    recorder = _StepRecorder()
+    # One agents instance per virtual user, as each Streamlit session creates its own
+    agents = [make_agents() for _ in range(users)]
+    before = server.stats() if server else None
+
+    with _Sampler() as sampler:
+        started = time.perf_counter()
+        deadline = started + duration
+        workers = [
+            threading.Thread(
+                target=_virtual_user,
+                args=(f"vu-{users}-{i}", agents[i], controller, recorder, deadline, mentor_share, think_sampler,
+                      random.Random(seed * 1000 + i)),
+                name=f"virtual-user-{i}",
+                daemon=True
+            )
+            for i in range(users)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+    every_action = [ms for samples in recorder.latency.values() for ms in samples]
+    actions = len(every_action)
+    step: Dict[str, Any] = {
+        "users": users,
+        "seconds": round(elapsed, 3),
+        "sessions": sum(recorder.sessions.values()),
+        "sessions_by_path": dict(recorder.sessions),
+        "actions": actions,
+        "failed_actions": sum(recorder.failed.values()),
+        "actions_per_second": round(actions / elapsed, 2) if elapsed else 0.0,
+        "sessions_per_second": round(sum(recorder.sessions.values()) / elapsed, 3) if elapsed else 0.0,
+        "latency": summarize(every_action),
+        "latency_by_action": {
+            action: dict(summarize(samples), runs=len(samples), failed=recorder.failed.get(action, 0))
+            for action, samples in sorted(recorder.latency.items())
+        },
+        "queue_p95_ms": round(percentile(recorder.queue_ms, 95), 3),
+        "threads_peak": max(sampler.threads),
+        "threads_after": sampler.threads[-1],
+        "rss_mb_start": round(sampler.rss[0], 1) if sampler.rss else None,
+        "rss_mb_peak": round(max(sampler.rss), 1) if sampler.rss else None
+    }
+    if server:
+        after = server.stats()
+        step["llm_calls"] = after["calls"] - before["calls"]
+        step["llm_errors"] = after["errors"] - before["errors"]
+    return step
+
+
+def run_load_test(
+    steps: List[int],
+    duration: float = 10.0,
+    latency: str = "lognormal:800:0.4",
+    error_rate: float = 0.0,
+    mentor_share: float = 0.3,
+    think: str = "0",
+    max_in_flight: Optional[int] = None,
+    base_url: Optional[str] = None,
+    seed: int = 1
+) -> Dict[str, Any]:
+    """
+    Run each concurrency step in turn against an in-process mock, or against
+    ``base_url`` (e.g. a mock started on its own) so the measured threads and
+    memory are the client side's alone
+    """
+    results: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "steps": steps,
+            "duration": duration,
+            "latency": None if base_url else latency,
+            "error_rate": None if base_url else error_rate,
+            "mentor_share": mentor_share,
+            "think": think,
+            "max_in_flight": max_in_flight,
+            "base_url": base_url,
+            "seed": seed
+        },
+        "steps": []
+    }
+    server = None
+    if not base_url:
+        server = MockGeminiServer(latency, LOAD_RESPONSES, seed=seed, error_rate=error_rate).start()
+        make_agents = server.agents
+    else:
+        # A placeholder key is enough for a mock; agents read the rest of their settings as usual
+        def make_agents():
+            from agents.gemini_agents import GeminiPromptGeneratorAgents
+
+            os.environ.setdefault("GEMINI_API_KEY", "mock-key")
+            agents = GeminiPromptGeneratorAgents()
+            agents.base_url = base_url
+            return agents
+    try:
+        for users in steps:
+            results["steps"].append(run_step(users, make_agents, duration, mentor_share, think, max_in_flight, server, seed))
+    finally:
+        if server:
+            server.stop()
+    return results
+
+
+def _table(results: Dict[str, Any]) -> List[str]:
+    lines = [
+        f"{'users':>6}{'actions/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queue p95':>11}"
+        f"{'failed':>8}{'llm err':>9}{'threads':>9}{'rss MB':>9}"
+    ]
+    for step in results["steps"]:
+        latency = step["latency"]
+        rss = "-" if step["rss_mb_peak"] is None else f"{step['rss_mb_peak']:.1f}"
+        errors = step.get("llm_errors", "-")
+        lines.append(
+            f"{step['users']:>6}{step['actions_per_second']:>11.2f}{latency['p50_ms']:>10.1f}{latency['p95_ms']:>10.1f}"
+            f"{latency['p99_ms']:>10.1f}{step['queue_p95_ms']:>11.1f}{step['failed_actions']:>8}"
+            f"{errors:>9}{step['threads_peak']:>9}{rss:>9}"
+        )
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: run the concurrency steps and write the results"""
+    parser = argparse.ArgumentParser(description="Concurrent-session load test against a mock Gemini server")
+    parser.add_argument("--users", default="1,5,10,25,50", help="comma-separated concurrency steps")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--latency", default="lognormal:800:0.4", help="mock latency, e.g. 0, fixed:500, uniform:200:900")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of mock Gemini calls that fail with a 503")
+    parser.add_argument("--mentor-share", type=float, default=0.3, help="share of sessions that are mentor chats")
+    parser.add_argument("--think", default="0", help="pause after each action, e.g. uniform:1000:5000")
+    parser.add_argument("--max-in-flight", type=int, help="admission limit (default: MAX_IN_FLIGHT_REQUESTS)")
+    parser.add_argument("--base-url", help="generateContent URL of a mock started separately")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/load-<time>.json)")
+    args = parser.parse_args(argv)
+
+    steps = [int(users) for users in args.users.split(",") if users.strip()]
+    results = run_load_test(
+        steps, args.duration, args.latency, args.error_rate, args.mentor_share, args.think,
+        args.max_in_flight, args.base_url, args.seed
+    )
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for line in _table(results):
+        print(line)
+    print(f"✅ Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
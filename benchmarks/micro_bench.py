@@ -0,0 +1,232 @@
+"""
+Microbenchmarks for AI Prompt Generator
+Times the pure-Python helpers on every request with timeit over input sizes taken from the saved history sample
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.mock_gemini import DEFAULT_RESPONSES
+from benchmarks.workflow_bench import DIRECT_REQUEST, MENTOR_QUESTION, SECOND_ANSWERS, _git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = os.path.join(ROOT, "history", "prompt_history_20250819_101826.json")
+
+# A change counts only when the median moves by more than this and by more than the noise
+DEFAULT_MIN_CHANGE_PCT = 5.0
+
+
+def load_sample(path: str = SAMPLE_PATH) -> Dict[str, Any]:
+    """The saved history record the inputs are cut from (a ~20k character prompt and its drafts)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _offline_agents():
+    """Agents whose Gemini call returns a canned reply, so only the local work is timed"""
+    from agents.gemini_agents import GeminiPromptGeneratorAgents
+
+    placeholder = "GEMINI_API_KEY" not in os.environ
+    if placeholder:
+        os.environ["GEMINI_API_KEY"] = "offline"
+    try:
+        agents = GeminiPromptGeneratorAgents()
+    finally:
+        if placeholder:
+            del os.environ["GEMINI_API_KEY"]
+    agents._call_gemini_api = lambda prompt, role, method="direct": DEFAULT_RESPONSES.get(role, "{}")
+    return agents
+
+
+def _fenced(payload: Dict[str, Any]) -> str:
+    """A reply the way Gemini usually sends JSON: prose, then a fenced block"""
+    return "Here is the analysis you asked for.\n\n```json\n" + json.dumps(payload, indent=2) + "\n```\n"
+
+
+def build_cases(sample: Dict[str, Any]) -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """
+    Every benchmark as name -> (zero-argument callable, input characters).
+    Sizes go from a typical request up to the largest text in the sample.
+    """
+    from agents.gemini_agents import extract_json_object
+    from utils.helpers import PromptGeneratorUtils
+
+    agents = _offline_agents()
+    intent = json.loads(DEFAULT_RESPONSES["Input Intent Analyzer"])
+    texts = {name: sample[name] for name in ("analysis", "structure", "enhanced", "generated_prompt")}
+    # Long answers, as pasted by users who describe their project in detail
+    chunk = len(sample["analysis"]) // 5
+    long_answers = {f"q{i + 1}": sample["analysis"][i * chunk:(i + 1) * chunk] for i in range(5)}
+
+    cases: Dict[str, Tuple[Callable[[], Any], int]] = {}
+    for name, text in texts.items():
+        cases[f"clean_prompt_text/{name}"] = (lambda text=text: PromptGeneratorUtils._clean_prompt_text(text), len(text))
+
+    replies = {
+        "intent": DEFAULT_RESPONSES["Input Intent Analyzer"],
+        "questions": _fenced(json.loads(DEFAULT_RESPONSES["Interactive Questioning Specialist"])),
+        "large": _fenced({"response": sample["analysis"], "context_enhanced": sample["structure"]})
+    }
+    for name, reply in replies.items():
+        cases[f"extract_json/{name}"] = (lambda reply=reply: extract_json_object(reply), len(reply))
+
+    requests = {"request": DIRECT_REQUEST, "mentor_question": MENTOR_QUESTION, "long": sample["enhanced"]}
+    for name, request in requests.items():
+        cases[f"conversation_context/{name}"] = (
+            lambda request=request: agents._get_conversation_context(request, intent), len(request)
+        )
+
+    for name, answers in (("short_answers", SECOND_ANSWERS), ("long_answers", long_answers)):
+        size = len(json.dumps(answers))
+        cases[f"questions_prompt/{name}"] = (
+            lambda answers=answers: agents.generate_interactive_questions(DIRECT_REQUEST, "Content", answers), size
+        )
+        cases[f"final_prompt/{name}"] = (
+            lambda answers=answers: agents.generate_final_prompt(DIRECT_REQUEST, "Content", answers), size
+        )
+    seed = sample["generated_prompt"]
+    cases["final_prompt/long_answers_seeded"] = (
+        lambda: agents.generate_final_prompt(DIRECT_REQUEST, "Content", long_answers, seed_prompt=seed),
+        len(json.dumps(long_answers)) + len(seed)
+    )
+
+    small = dict(sample, generated_prompt=sample["analysis"][:1500])
+    for name, record in (("small", small), ("sample", sample)):
+        cases[f"format_prompt_output/{name}"] = (
+            lambda record=record: PromptGeneratorUtils.format_prompt_output(record), len(record["generated_prompt"])
+        )
+    return cases
+
+
+def time_case(fn: Callable[[], Any], repeat: int = 7, min_time: float = 0.2) -> Dict[str, float]:
+    """
+    Per-call microseconds over ``repeat`` timeit rounds; each round runs the
+    call enough times to last about ``min_time`` seconds
+    """
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / elapsed)) if elapsed else number
+    rounds = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    median = statistics.median(rounds)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_us": round(min(rounds), 3),
+        "median_us": round(median, 3),
+        "mean_us": round(statistics.fmean(rounds), 3),
+        "stdev_us": round(statistics.stdev(rounds), 3) if repeat > 1 else 0.0,
+        # Round-to-round variation; a change has to beat twice this to count
+        "cv_pct": round(statistics.stdev(rounds) / statistics.fmean(rounds) * 100, 2) if repeat > 1 else 0.0
+    }
+
+
+def run_micro_bench(
+    repeat: int = 7,
+    min_time: float = 0.2,
+    only: Optional[List[str]] = None,
+    sample_path: str = SAMPLE_PATH
+) -> Dict[str, Any]:
+    """Time the selected cases (by name prefix, e.g. ``clean_prompt_text``)"""
+    cases = build_cases(load_sample(sample_path))
+    results: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sample": os.path.relpath(sample_path, ROOT),
+            "repeat": repeat,
+            "min_time": min_time
+        },
+        "cases": {}
+    }
+    for name, (fn, size) in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results["cases"][name] = dict(time_case(fn, repeat, min_time), input_chars=size)
+    return results
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], min_change_pct: float = DEFAULT_MIN_CHANGE_PCT) -> List[Dict[str, Any]]:
+    """
+    Median change per case. ``significant`` needs the change to beat both
+    ``min_change_pct`` and twice the larger coefficient of variation of the two runs.
+    """
+    rows = []
+    for name, current in new["cases"].items():
+        previous = old["cases"].get(name)
+        if previous is None:
+            rows.append({"case": name, "before_us": None, "after_us": current["median_us"], "change_pct": None, "significant": False})
+            continue
+        change = (current["median_us"] - previous["median_us"]) / previous["median_us"] * 100
+        noise = max(min_change_pct, 2 * previous.get("cv_pct", 0.0), 2 * current.get("cv_pct", 0.0))
+        rows.append({
+            "case": name,
+            "before_us": previous["median_us"],
+            "after_us": current["median_us"],
+            "change_pct": round(change, 1),
+            "significant": abs(change) > noise
+        })
+    return rows
+
+
+def _describe(row: Dict[str, Any]) -> str:
+    if row["before_us"] is None:
+        return f"   {row['case']:<44}{'new':>12}{row['after_us']:>12.2f}"
+    marker = ("⬇️" if row["change_pct"] < 0 else "⬆️") if row["significant"] else "  "
+    return f"{marker} {row['case']:<44}{row['before_us']:>12.2f}{row['after_us']:>12.2f}{row['change_pct']:>+9.1f}%"
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: run the suite or compare two result files"""
+    parser = argparse.ArgumentParser(description="timeit microbenchmarks for the per-request helpers")
+    subcommands = parser.add_subparsers(dest="command")
+    runner = subcommands.add_parser("run", help="run the benchmarks (default)")
+    runner.add_argument("--repeat", type=int, default=7, help="timeit rounds per case")
+    runner.add_argument("--min-time", type=float, default=0.2, help="seconds each round should last")
+    runner.add_argument("--case", action="append", help="run only cases starting with this, e.g. clean_prompt_text")
+    runner.add_argument("--sample", default=SAMPLE_PATH, help="history record the inputs are cut from")
+    runner.add_argument("--output", help="results file (default: benchmarks/results/micro-<time>.json)")
+    comparer = subcommands.add_parser("compare", help="compare two result files")
+    comparer.add_argument("old")
+    comparer.add_argument("new")
+    comparer.add_argument("--min-change-pct", type=float, default=DEFAULT_MIN_CHANGE_PCT)
+    args = parser.parse_args(argv or sys.argv[1:] or ["run"])
+
+    if args.command == "compare":
+        with open(args.old, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new = json.load(f)
+        print(f"   {'case':<44}{'before us':>12}{'after us':>12}{'change':>10}")
+        for row in compare(old, new, args.min_change_pct):
+            print(_describe(row))
+        return 0
+
+    results = run_micro_bench(args.repeat, args.min_time, args.case, args.sample)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"micro-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'case':<46}{'chars':>8}{'median us':>12}{'min us':>12}{'cv':>9}")
+    for name, result in results["cases"].items():
+        print(
+            f"{name:<46}{result['input_chars']:>8}{result['median_us']:>12.2f}"
+            f"{result['min_us']:>12.2f}{result['cv_pct']:>8.1f}%"
+        )
+    print(f"✅ Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,285 @@
+"""
+Mock Gemini server for AI Prompt Generator
+A local generateContent endpoint with canned responses per agent role, configurable latency and injected errors
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+# The agents prefix every prompt with "You are a {role}. "
+ROLE_PATTERN = re.compile(r"^You are an? (.+?)\. ", re.DOTALL)
+
+_FINAL_PROMPT = "\n".join(
+    [
+        "# Role",
+        "You are a senior content strategist for a B2B software company.",
+        "",
+        "# Objective",
+        "Plan a three-month blog programme that supports the product launch and builds organic traffic.",
+        "",
+        "# Context",
+    ]
+    + [f"- Audience insight {i}: engineering managers evaluating tooling for teams of 10-200 people." for i in range(1, 13)]
+    + ["", "# Deliverables"]
+    + [f"{i}. Article brief {i} with working title, search intent, outline, call to action and success metric." for i in range(1, 13)]
+    + ["", "# Constraints", "- Friendly, expert tone; no unverifiable claims.", "- Each brief under 200 words."]
+)
+
+# Canned model output per agent role, shaped like what each parser expects
+DEFAULT_RESPONSES: Dict[str, str] = {
+    "Input Intent Analyzer": json.dumps({
+        "intent_type": "direct_request",
+        "confidence": "high",
+        "response": "",
+        "follow_up_question": "",
+        "context_enhanced": "Blog programme for a product launch",
+        "department_hint": "Content"
+    }, indent=2),
+    "Department Detection Specialist": json.dumps({
+        "department": "Content",
+        "confidence": "high",
+        "reasoning": "The request is about planning blog content for a launch.",
+        "user_intent": "Plan launch content",
+        "key_requirements": ["audience", "cadence", "topics"]
+    }, indent=2),
+    "Interactive Questioning Specialist": json.dumps({
+        "questions": [
+            {"id": "q1", "question": "Who is the primary audience?", "type": "text", "required": True},
+            {"id": "q2", "question": "How many posts per month can the team publish?", "type": "text", "required": True},
+            {"id": "q3", "question": "Which channels will distribute the posts?", "type": "text", "required": True}
+        ],
+        "progress_percentage": 40,
+        "next_step": "Understand audience and capacity",
+        "is_complete": False
+    }, indent=2),
+    "Final Prompt Generator": _FINAL_PROMPT,
+    "AI Mentor": (
+        "Start from the decisions the dashboard has to support, then pick one outcome metric per decision "
+        "and two or three leading indicators that move before it. Next steps: list the decisions, map each "
+        "to a metric, and check the data exists. What decisions will the team make from this dashboard?"
+    ),
+    "Follow-up Generator": "Which team will use the dashboard most often?\nHow often is the data refreshed?"
+}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Turn a latency spec (milliseconds) into a sampler returning seconds:
+    ``fixed:MS`` (or a bare number), ``uniform:LOW:HIGH``, ``normal:MEAN:SD``,
+    ``lognormal:MEDIAN:SIGMA`` or ``exp:MEAN``
+    """
+    kind, _, rest = spec.partition(":")
+    try:
+        args = [float(part) for part in rest.split(":")] if rest else [float(kind)]
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    if not rest or (kind == "fixed" and len(args) == 1):
+        value = args[0] / 1000
+        return lambda rng: value
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1]) / 1000
+    if kind == "normal" and len(args) == 2:
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1])) / 1000
+    if kind == "lognormal" and len(args) == 2 and args[0] > 0:
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1]) / 1000
+    if kind == "exp" and len(args) == 1 and args[0] > 0:
+        return lambda rng: rng.expovariate(1 / args[0]) / 1000
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+class MockGeminiServer:
+    """
+    In-process HTTP server answering ``POST ...:generateContent``.
+
+    The reply is picked by the role in the prompt (see ``responses``; a value
+    may also be a function of the prompt text) after a delay drawn from
+    ``latency``, a spec for every role or a dict of specs by role with ``"*"``
+    as the default. A share ``error_rate`` of requests fails with
+    ``error_status`` instead. Request and response sizes are counted so a
+    benchmark can attribute LLM calls and bytes to each workflow.
+    """
+
+    def __init__(
+        self,
+        latency: Union[str, Dict[str, str]] = "0",
+        responses: Optional[Dict[str, Union[str, Callable[[str], str]]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+        error_rate: float = 0.0,
+        error_status: int = 503
+    ):
+        if not 0 <= error_rate <= 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        specs = latency if isinstance(latency, dict) else {"*": latency}
+        self._latency = {role: parse_latency(spec) for role, spec in specs.items()}
+        self.latency_spec = specs
+        self.responses = dict(DEFAULT_RESPONSES)
+        self.responses.update(responses or {})
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = self._empty_stats()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """generateContent URL to use as the agents' ``base_url``"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1beta/models/gemini-2.0-flash:generateContent"
+
+    def agents(self):
+        """A ``GeminiPromptGeneratorAgents`` pointed at this server (no real API key needed)"""
+        from agents.gemini_agents import GeminiPromptGeneratorAgents
+
+        placeholder = "GEMINI_API_KEY" not in os.environ
+        if placeholder:
+            os.environ["GEMINI_API_KEY"] = "mock-key"
+        try:
+            agents = GeminiPromptGeneratorAgents()
+        finally:
+            if placeholder:
+                del os.environ["GEMINI_API_KEY"]
+        agents.base_url = self.url
+        return agents
+
+    def start(self) -> "MockGeminiServer":
+        """Serve on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-gemini", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port"""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, injected errors, prompt characters and bytes so far, overall and by role"""
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def reset(self) -> None:
+        """Zero the counters"""
+        with self._lock:
+            self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {"calls": 0, "errors": 0, "prompt_chars": 0, "bytes_received": 0, "bytes_sent": 0, "roles": {}}
+
+    def _reply(self, body: bytes) -> Tuple[int, bytes]:
+        """Pick, delay and encode the response to one request; returns (status, payload)"""
+        request = json.loads(body)
+        text = request["contents"][0]["parts"][0]["text"]
+        match = ROLE_PATTERN.match(text)
+        role = match.group(1) if match else "*"
+        sampler = self._latency.get(role) or self._latency.get("*")
+        with self._lock:
+            delay = sampler(self._random) if sampler else 0.0
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            status = self.error_status
+            reply = json.dumps({"error": {"code": status, "message": "Injected error", "status": "UNAVAILABLE"}}).encode("utf-8")
+        else:
+            status = 200
+            answer = self.responses.get(role, "OK")
+            if callable(answer):
+                answer = answer(text)
+            reply = json.dumps({
+                "candidates": [{"content": {"parts": [{"text": answer}], "role": "model"}, "finishReason": "STOP"}],
+                "usageMetadata": {
+                    "promptTokenCount": len(text) // 4,
+                    "candidatesTokenCount": len(answer) // 4,
+                    "totalTokenCount": (len(text) + len(answer)) // 4
+                }
+            }).encode("utf-8")
+
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["errors"] += failed
+            self._stats["prompt_chars"] += len(text)
+            self._stats["bytes_received"] += len(body)
+            self._stats["bytes_sent"] += len(reply)
+            by_role = self._stats["roles"].setdefault(role, {"calls": 0, "prompt_chars": 0, "bytes_received": 0, "bytes_sent": 0})
+            by_role["calls"] += 1
+            by_role["prompt_chars"] += len(text)
+            by_role["bytes_received"] += len(body)
+            by_role["bytes_sent"] += len(reply)
+        return status, reply
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.endswith(":generateContent"):
+                    self._send(404, b'{"error": {"code": 404, "message": "Not found"}}')
+                    return
+                try:
+                    status, reply = server._reply(body)
+                except (ValueError, KeyError, IndexError, TypeError):
+                    self._send(400, b'{"error": {"code": 400, "message": "Invalid request"}}')
+                    return
+                self._send(status, reply)
+
+            def _send(self, status, payload):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    """Command line: serve the mock so the app can run offline against it"""
+    parser = argparse.ArgumentParser(description="Local mock of the Gemini generateContent endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:800:0.4", help="e.g. 0, fixed:500, uniform:200:900")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    args = parser.parse_args(argv)
+
+    server = MockGeminiServer(args.latency, port=args.port, error_rate=args.error_rate).start()
+    print(f"🧪 Mock Gemini listening; run the app with GEMINI_BASE_URL={server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
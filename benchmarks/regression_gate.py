@@ -0,0 +1,238 @@
+"""
+Prompt size and cost regression gate for AI Prompt Generator
+Measures per-stage prompt characters, estimated tokens, LLM calls and CPU time on fixed inputs against a stored baseline
+"""
+
+import argparse
+import functools
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.load_test import LOAD_RESPONSES
+from benchmarks.mock_gemini import MockGeminiServer
+from benchmarks.workflow_bench import DIRECT_REQUEST, FIRST_ANSWERS, MENTOR_QUESTION, SECOND_ANSWERS, _git_commit
+from utils.token_usage import metered
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "regression.json")
+
+# Every path through the agents, each walked to its end (the mock completes once five answers are in)
+INPUTS: Dict[str, Dict[str, Any]] = {
+    "blog_strategy": {"request": DIRECT_REQUEST, "answers": [FIRST_ANSWERS, SECOND_ANSWERS]},
+    "fresher_portfolio": {
+        "request": "I'm a fresher and want to build a data engineering portfolio project to get my first job",
+        "answers": [{
+            "q1": "Batch pipeline from public APIs into a warehouse",
+            "q2": "Python, Airflow, dbt and Postgres",
+            "q3": "Six weeks, evenings only",
+            "q4": "Show it on GitHub with a short write-up",
+            "q5": "Data engineering roles at startups"
+        }]
+    },
+    "mentor_question": {"request": MENTOR_QUESTION, "answers": []}
+}
+
+METRICS = ("prompt_chars", "prompt_tokens", "output_tokens", "calls", "cpu_ms")
+
+# Allowed growth before a stage counts as regressed
+DEFAULT_THRESHOLDS = {
+    "prompt_chars_pct": 5.0,
+    "prompt_tokens_pct": 5.0,
+    "calls": 0,
+    "cpu_pct": 50.0,
+    "cpu_floor_ms": 5.0  # CPU changes smaller than this are noise
+}
+
+
+class _StageProbe:
+    """
+    Attributes prompt characters and thread CPU time to workflow stages by
+    wrapping the agents' Gemini-calling methods (outermost call only, so a
+    stage calling another method of the same stage is counted once)
+    """
+
+    def __init__(self, agents, server: MockGeminiServer):
+        from agents.gemini_agents import STAGE_BY_METHOD
+
+        self.server = server
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._active = False
+        for method, stage in STAGE_BY_METHOD.items():
+            setattr(agents, method, self._wrap(getattr(agents, method), stage))
+
+    def _wrap(self, fn, stage: str):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if self._active:
+                return fn(*args, **kwargs)
+            self._active = True
+            chars = self.server.stats()["prompt_chars"]
+            cpu = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                totals = self.stages.setdefault(stage, {"prompt_chars": 0, "cpu_ms": 0.0})
+                totals["cpu_ms"] += (time.thread_time() - cpu) * 1000
+                totals["prompt_chars"] += self.server.stats()["prompt_chars"] - chars
+                self._active = False
+        return wrapper
+
+
+def _walk(agents, case: Dict[str, Any]) -> None:
+    """Run one input through the workflow until it completes or answers run out"""
+    result = agents.process_interactive_workflow(case["request"])
+    for answers in case["answers"]:
+        if result.get("workflow_state") != "awaiting_answers":
+            break
+        department = result.get("department_detected", {}).get("department") or result.get("department")
+        result = agents.continue_workflow(case["request"], department, answers)
+
+
+def measure(repeats: int = 5, inputs: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Per-stage totals over the fixed inputs: prompt characters, tokens (from
+    the mock's usageMetadata, about four characters per token) and calls
+    from the first run, CPU time as the median over ``repeats`` runs
+    """
+    inputs = inputs or INPUTS
+    by_input: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with MockGeminiServer("0", LOAD_RESPONSES) as server:
+        for name, case in inputs.items():
+            runs = []
+            for _ in range(repeats):
+                agents = server.agents()
+                probe = _StageProbe(agents, server)
+                with metered() as meter:
+                    _walk(agents, case)
+                usage = meter.by_stage()
+                runs.append({
+                    stage: {
+                        "prompt_chars": probe.stages.get(stage, {}).get("prompt_chars", 0),
+                        "prompt_tokens": usage.get(stage, {}).get("prompt", 0),
+                        "output_tokens": usage.get(stage, {}).get("output", 0),
+                        "calls": usage.get(stage, {}).get("calls", 0),
+                        "cpu_ms": probe.stages.get(stage, {}).get("cpu_ms", 0.0)
+                    }
+                    for stage in sorted(set(probe.stages) | set(usage))
+                })
+            stages = runs[0]
+            for stage, values in stages.items():
+                values["cpu_ms"] = round(statistics.median(run.get(stage, {}).get("cpu_ms", 0.0) for run in runs), 3)
+            by_input[name] = stages
+
+    totals: Dict[str, Dict[str, float]] = {}
+    for stages in by_input.values():
+        for stage, values in stages.items():
+            stage_totals = totals.setdefault(stage, {metric: 0 for metric in METRICS})
+            for metric in METRICS:
+                stage_totals[metric] += values[metric]
+    for values in totals.values():
+        values["cpu_ms"] = round(values["cpu_ms"], 3)
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "repeats": repeats,
+            "inputs": sorted(inputs)
+        },
+        "stages": totals,
+        "inputs": by_input
+    }
+
+
+def _pct(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else (0.0 if after == before else float("inf"))
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], thresholds: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """One finding per stage and metric that changed; ``regression`` marks the ones past a threshold"""
+    limits = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    findings = []
+    for stage in sorted(set(baseline["stages"]) | set(current["stages"])):
+        before_stage = baseline["stages"].get(stage)
+        after_stage = current["stages"].get(stage)
+        if before_stage is None or after_stage is None:
+            findings.append({"stage": stage, "metric": "stage", "before": before_stage is not None,
+                             "after": after_stage is not None, "regression": before_stage is None})
+            continue
+        for metric in METRICS:
+            before, after = before_stage.get(metric, 0), after_stage.get(metric, 0)
+            if before == after:
+                continue
+            if metric in ("prompt_chars", "prompt_tokens"):
+                regression = _pct(before, after) > limits[f"{metric}_pct"]
+            elif metric == "calls":
+                regression = after - before > limits["calls"]
+            elif metric == "cpu_ms":
+                regression = after - before > limits["cpu_floor_ms"] and _pct(before, after) > limits["cpu_pct"]
+            else:
+                regression = False
+            findings.append({"stage": stage, "metric": metric, "before": before, "after": after, "regression": regression})
+    return findings
+
+
+def _describe(finding: Dict[str, Any]) -> str:
+    marker = "❌" if finding["regression"] else "  "
+    if finding["metric"] == "stage":
+        change = "new stage" if finding["after"] else "stage no longer runs"
+        return f"{marker} {finding['stage']}: {change}"
+    before, after = finding["before"], finding["after"]
+    return f"{marker} {finding['stage']}.{finding['metric']}: {before:g} -> {after:g} ({_pct(before, after):+.1f}%)"
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: check against the baseline (exit 1 on regression) or update it"""
+    parser = argparse.ArgumentParser(description="Per-stage prompt size, token, call and CPU regression gate")
+    parser.add_argument("command", nargs="?", choices=["check", "update"], default="check")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--repeats", type=int, default=5, help="runs per input; CPU time is the median")
+    parser.add_argument("--max-chars-pct", type=float, default=DEFAULT_THRESHOLDS["prompt_chars_pct"])
+    parser.add_argument("--max-tokens-pct", type=float, default=DEFAULT_THRESHOLDS["prompt_tokens_pct"])
+    parser.add_argument("--max-calls", type=int, default=DEFAULT_THRESHOLDS["calls"], help="extra LLM calls allowed per stage")
+    parser.add_argument("--max-cpu-pct", type=float, default=DEFAULT_THRESHOLDS["cpu_pct"])
+    parser.add_argument("--cpu-floor-ms", type=float, default=DEFAULT_THRESHOLDS["cpu_floor_ms"])
+    parser.add_argument("--output", help="also write the current measurements here")
+    args = parser.parse_args(argv)
+
+    current = measure(args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if args.command == "update":
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        print(f"✅ Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"❌ No baseline at {args.baseline}; run with 'update' first", file=sys.stderr)
+        return 2
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    findings = compare(baseline, current, {
+        "prompt_chars_pct": args.max_chars_pct,
+        "prompt_tokens_pct": args.max_tokens_pct,
+        "calls": args.max_calls,
+        "cpu_pct": args.max_cpu_pct,
+        "cpu_floor_ms": args.cpu_floor_ms
+    })
+    for finding in findings:
+        print(_describe(finding))
+    regressions = [finding for finding in findings if finding["regression"]]
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {args.baseline}")
+        return 1
+    print(f"✅ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
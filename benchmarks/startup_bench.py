@@ -0,0 +1,229 @@
+"""
+Cold-start benchmarks for AI Prompt Generator
+Times module imports and the first page render in fresh interpreters, with optional budgets
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.mock_gemini import MockGeminiServer
+from benchmarks.workflow_bench import _git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that should load only when the feature needing them is first used
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "crewai", "langchain", "langchain_community", "http.server")
+
+# Written to stderr before the timed imports, so interpreter startup is left out of the breakdown
+_MARKER = "-- startup probe --"
+
+_IMPORT_PROBE = """
+import json, sys, time
+sys.stderr.write("{marker}\\n")
+sys.stderr.flush()
+started = time.perf_counter()
+{statement}
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+_RENDER_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file({script!r}, default_timeout=120).run()
+rendered = time.perf_counter()
+app.run()
+rerun = time.perf_counter()
+print(json.dumps({{
+    "streamlit_ms": (imported - started) * 1000,
+    "ms": (rendered - imported) * 1000,
+    "rerun_ms": (rerun - rendered) * 1000,
+    "exceptions": [str(item.value) for item in app.exception],
+    "loaded": [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+
+def top_level_imports(path: str) -> str:
+    """The module-level import statements of a script, to time them without running it"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+# What each import target runs; scripts contribute only their imports
+IMPORT_TARGETS = {
+    "config": lambda: "import config",
+    "agents": lambda: "import agents.gemini_agents",
+    "app": lambda: top_level_imports(os.path.join(ROOT, "app.py")),
+    "admin_page": lambda: top_level_imports(os.path.join(ROOT, "pages", "admin.py")),
+    "history_page": lambda: top_level_imports(os.path.join(ROOT, "pages", "history.py"))
+}
+
+
+def _run_probe(code: str, env: Optional[Dict[str, str]] = None, importtime: bool = False) -> Dict[str, Any]:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Probe failed: {completed.stderr.strip()[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if importtime:
+        result["modules"] = parse_importtime(completed.stderr)
+    return result
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """``-X importtime`` lines as {module, self_ms, cumulative_ms, depth}"""
+    modules = []
+    if _MARKER in stderr:
+        stderr = stderr.split(_MARKER, 1)[1]
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": (len(name) - len(name.lstrip(" "))) // 2
+        })
+    return modules
+
+
+def time_imports(target: str, runs: int = 5) -> Dict[str, Any]:
+    """Median wall time of a target's imports in ``runs`` fresh interpreters, with the costliest modules"""
+    code = _IMPORT_PROBE.format(statement=IMPORT_TARGETS[target](), heavy=HEAVY_MODULES, marker=_MARKER)
+    samples = [_run_probe(code, importtime=(i == 0)) for i in range(runs)]
+    modules = samples[0]["modules"]
+    # The target's own imports and their direct dependencies, by cumulative time
+    top = sorted((m for m in modules if m["depth"] <= 1), key=lambda m: m["cumulative_ms"], reverse=True)[:12]
+    return {
+        "median_ms": round(statistics.median(sample["ms"] for sample in samples), 1),
+        "min_ms": round(min(sample["ms"] for sample in samples), 1),
+        "heavy_loaded": samples[0]["loaded"],
+        "slowest": [{"module": m["module"], "cumulative_ms": round(m["cumulative_ms"], 1)} for m in top]
+    }
+
+
+def time_first_render(script: str = "app.py", runs: int = 3) -> Dict[str, Any]:
+    """
+    Median first render of a page in fresh interpreters, as on a new replica:
+    empty data directory, in-memory sessions and Gemini answered by the mock
+    """
+    code = _RENDER_PROBE.format(script=os.path.join(ROOT, script), heavy=HEAVY_MODULES)
+    samples = []
+    with MockGeminiServer("0") as server, tempfile.TemporaryDirectory() as data:
+        for _ in range(runs):
+            env = dict(
+                os.environ,
+                GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "mock-key"),
+                GEMINI_BASE_URL=server.url,
+                GEMINI_CASSETTE_MODE="off",
+                SESSION_STORE="memory",
+                METRICS_PORT="0",
+                TRACING_EXPORTER="none",
+                SESSION_DB_PATH=os.path.join(data, "sessions.db"),
+                HISTORY_DB_PATH=os.path.join(data, "history.db"),
+                HISTORY_LOG_DIR=os.path.join(data, "log"),
+                HISTORY_ANALYTICS_PATH=os.path.join(data, "history_analytics.json"),
+                TOKEN_LEDGER_PATH=os.path.join(data, "token_ledger.json"),
+                TRACING_PATH=os.path.join(data, "traces.jsonl"),
+                PROFILE_REPORT_DIR=os.path.join(data, "profiles")
+            )
+            samples.append(_run_probe(code, env))
+            for name in os.listdir(data):
+                path = os.path.join(data, name)
+                if os.path.isfile(path):
+                    os.remove(path)
+    return {
+        "median_ms": round(statistics.median(sample["ms"] for sample in samples), 1),
+        "rerun_ms": round(statistics.median(sample["rerun_ms"] for sample in samples), 1),
+        "streamlit_ms": round(statistics.median(sample["streamlit_ms"] for sample in samples), 1),
+        "heavy_loaded": samples[0]["loaded"],
+        "exceptions": samples[0]["exceptions"]
+    }
+
+
+def run_startup_bench(targets: Optional[List[str]] = None, runs: int = 5, render: bool = True) -> Dict[str, Any]:
+    """Import timings for each target plus the app's first render"""
+    results: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "runs": runs
+        },
+        "imports": {target: time_imports(target, runs) for target in targets or list(IMPORT_TARGETS)}
+    }
+    if render:
+        results["first_render"] = time_first_render(runs=max(1, min(runs, 3)))
+    return results
+
+
+def check_budgets(results: Dict[str, Any], budgets: Dict[str, float]) -> List[str]:
+    """Targets over budget (``first_render`` names the page render)"""
+    over = []
+    for target, budget in budgets.items():
+        measured = results["first_render"] if target == "first_render" else results["imports"].get(target)
+        if measured is None:
+            over.append(f"{target}: not measured")
+        elif measured["median_ms"] > budget:
+            over.append(f"{target}: {measured['median_ms']:.0f} ms > {budget:.0f} ms budget")
+    return over
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: time cold imports and the first render, optionally failing over budget"""
+    parser = argparse.ArgumentParser(description="Cold-start import and first-render benchmarks")
+    parser.add_argument("--target", action="append", choices=list(IMPORT_TARGETS), help="time only these imports")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--no-render", action="store_true", help="skip the first page render")
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=MS",
+                        help="fail when a target's median exceeds MS, e.g. app=500 or first_render=1500")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/startup-<time>.json)")
+    args = parser.parse_args(argv)
+
+    budgets = {}
+    for item in args.budget:
+        target, _, ms = item.partition("=")
+        budgets[target] = float(ms)
+
+    results = run_startup_bench(args.target, args.runs, render=not args.no_render)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"startup-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'target':<16}{'median ms':>11}{'min ms':>9}  heavy modules loaded")
+    for target, timing in results["imports"].items():
+        print(f"{target:<16}{timing['median_ms']:>11.1f}{timing['min_ms']:>9.1f}  {', '.join(timing['heavy_loaded']) or '-'}")
+        for module in timing["slowest"][:5]:
+            print(f"{'':<18}{module['module']:<40}{module['cumulative_ms']:>8.1f} ms")
+    if "first_render" in results:
+        render = results["first_render"]
+        print(f"{'first_render':<16}{render['median_ms']:>11.1f}{'':>9}  {', '.join(render['heavy_loaded']) or '-'}")
+        print(f"{'':<18}rerun {render['rerun_ms']:.1f} ms · streamlit import {render['streamlit_ms']:.1f} ms")
+        for exception in render["exceptions"]:
+            print(f"⚠️ {exception}")
+
+    over = check_budgets(results, budgets)
+    for line in over:
+        print(f"❌ {line}")
+    print(f"✅ Results written to {output}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+"""
+End-to-end workflow benchmarks for AI Prompt Generator
+Times each agent workflow path against the mock Gemini server and writes comparable JSON results
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.mock_gemini import DEFAULT_RESPONSES, MockGeminiServer
+
+DIRECT_REQUEST = "I want to create a blog strategy for our product launch next quarter"
+MENTOR_QUESTION = "How do I choose the best metrics for a marketing dashboard?"
+FIRST_ANSWERS = {"q1": "Engineering managers at mid-size companies", "q2": "Four posts a month", "q3": "LinkedIn and our newsletter"}
+SECOND_ANSWERS = dict(FIRST_ANSWERS, q4="Announce the launch and grow sign-ups", q5="Practical, expert, no hype")
+
+_ONE_QUESTION = json.dumps({
+    "questions": [{"id": "q4", "question": "What tone should the posts take?", "type": "text", "required": True}],
+    "progress_percentage": 90,
+    "is_complete": False
+}, indent=2)
+
+
+def _expect(result: Dict[str, Any], state: str) -> None:
+    if result.get("workflow_state") != state:
+        raise RuntimeError(f"Expected workflow_state {state!r}, got {result.get('workflow_state')!r}")
+
+
+def _direct_request(agents) -> None:
+    _expect(agents.process_interactive_workflow(DIRECT_REQUEST), "awaiting_answers")
+
+
+def _mentor_question(agents) -> None:
+    _expect(agents.process_interactive_workflow(MENTOR_QUESTION), "chat_mode")
+
+
+def _multi_round_answers(agents) -> None:
+    _expect(agents.continue_workflow(DIRECT_REQUEST, "Content", FIRST_ANSWERS), "awaiting_answers")
+    _expect(agents.continue_workflow(DIRECT_REQUEST, "Content", SECOND_ANSWERS), "awaiting_answers")
+
+
+def _final_prompt(agents) -> None:
+    _expect(agents.continue_workflow(DIRECT_REQUEST, "Content", SECOND_ANSWERS), "complete")
+
+
+# Each path: the workflow to run and the canned responses that steer it there
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "direct_request": {"run": _direct_request, "responses": {}},
+    "mentor_question": {
+        "run": _mentor_question,
+        "responses": {"Input Intent Analyzer": json.dumps({"intent_type": "question", "confidence": "high"})}
+    },
+    "multi_round_answers": {"run": _multi_round_answers, "responses": {}},
+    "final_prompt": {"run": _final_prompt, "responses": {"Interactive Questioning Specialist": _ONE_QUESTION}}
+}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Linearly interpolated ``q``-th percentile (0-100) of ``samples``"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean, min and max of millisecond samples"""
+    return {
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3) if samples else 0.0,
+        "min_ms": round(min(samples), 3) if samples else 0.0,
+        "max_ms": round(max(samples), 3) if samples else 0.0
+    }
+
+
+def run_scenario(agents, server: MockGeminiServer, run: Callable, iterations: int, warmup: int) -> Dict[str, Any]:
+    """Time ``run(agents)`` repeatedly, attributing LLM calls and bytes to each run"""
+    for _ in range(warmup):
+        run(agents)
+    wall: List[float] = []
+    calls: List[int] = []
+    sent: List[int] = []
+    received: List[int] = []
+    for _ in range(iterations):
+        before = server.stats()
+        started = time.perf_counter()
+        run(agents)
+        wall.append((time.perf_counter() - started) * 1000)
+        after = server.stats()
+        calls.append(after["calls"] - before["calls"])
+        # Bytes the client sent are the bytes the server received, and vice versa
+        sent.append(after["bytes_received"] - before["bytes_received"])
+        received.append(after["bytes_sent"] - before["bytes_sent"])
+    result = {"runs": iterations}
+    result.update(summarize(wall))
+    result["llm_calls"] = round(sum(calls) / iterations, 2)
+    result["bytes_sent"] = round(sum(sent) / iterations)
+    result["bytes_received"] = round(sum(received) / iterations)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(
+    iterations: int = 30,
+    warmup: int = 2,
+    latency: str = "fixed:50",
+    scenarios: Optional[List[str]] = None,
+    seed: int = 1
+) -> Dict[str, Any]:
+    """Run the selected workflow paths against a fresh mock server"""
+    results: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": latency,
+            "iterations": iterations,
+            "warmup": warmup,
+            "seed": seed
+        },
+        "scenarios": {}
+    }
+    with MockGeminiServer(latency, seed=seed) as server:
+        agents = server.agents()
+        for name in scenarios or list(SCENARIOS):
+            scenario = SCENARIOS[name]
+            server.responses.clear()
+            server.responses.update(DEFAULT_RESPONSES)
+            server.responses.update(scenario["responses"])
+            results["scenarios"][name] = run_scenario(agents, server, scenario["run"], iterations, warmup)
+    return results
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Lines describing how each scenario changed between two result files"""
+    lines = []
+    for name, current in new["scenarios"].items():
+        previous = old["scenarios"].get(name)
+        if previous is None:
+            lines.append(f"{name}: new")
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "llm_calls", "bytes_sent"):
+            before, after = previous.get(metric), current.get(metric)
+            if before:
+                changes.append(f"{metric} {before:g} -> {after:g} ({(after - before) / before * 100:+.1f}%)")
+            else:
+                changes.append(f"{metric} {before} -> {after}")
+        lines.append(f"{name}: " + ", ".join(changes))
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: run the suite or compare two result files"""
+    parser = argparse.ArgumentParser(description="Offline workflow benchmarks against a mock Gemini server")
+    subcommands = parser.add_subparsers(dest="command")
+    runner = subcommands.add_parser("run", help="run the benchmarks (default)")
+    runner.add_argument("--iterations", type=int, default=30)
+    runner.add_argument("--warmup", type=int, default=2)
+    runner.add_argument("--latency", default="fixed:50", help="mock latency, e.g. 0, fixed:50, lognormal:800:0.4")
+    runner.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="run only these paths")
+    runner.add_argument("--seed", type=int, default=1)
+    runner.add_argument("--output", help="results file (default: benchmarks/results/workflow-<time>.json)")
+    comparer = subcommands.add_parser("compare", help="compare two result files")
+    comparer.add_argument("old")
+    comparer.add_argument("new")
+    args = parser.parse_args(argv or sys.argv[1:] or ["run"])
+
+    if args.command == "compare":
+        with open(args.old, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new = json.load(f)
+        for line in compare(old, new):
+            print(line)
+        return 0
+
+    results = run_benchmarks(args.iterations, args.warmup, args.latency, args.scenario, args.seed)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"workflow-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'calls':>8}{'sent B':>10}")
+    for name, result in results["scenarios"].items():
+        print(
+            f"{name:<22}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            f"{result['llm_calls']:>8g}{result['bytes_sent']:>10}"
+        )
+    print(f"✅ Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,10 +4,27 @@ Centralized configuration management
 """
 
 import os
-from dotenv import load_dotenv
+import threading
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+
+def load_environment() -> None:
+    """Load .env into os.environ once per process, whichever module asks first"""
+    global _environment_loaded
+    if _environment_loaded:
+        return
+    with _environment_lock:
+        if not _environment_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _environment_loaded = True
+
 
 # Load environment variables
-load_dotenv()
+load_environment()
 
 class Config:
     """
@@ -31,7 +48,89 @@ class Config:
     
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    
+
+    # Performance
+    SHOW_RENDER_TIMINGS = os.getenv("SHOW_RENDER_TIMINGS", "False").lower() == "true"
+    HEALTH_CHECK_TTL = int(os.getenv("HEALTH_CHECK_TTL", "300"))  # seconds
+
+    # Admission Control
+    MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "8"))
+    PER_SESSION_CONCURRENCY = int(os.getenv("PER_SESSION_CONCURRENCY", "1"))
+    WORKFLOW_PRIORITY_WEIGHT = int(os.getenv("WORKFLOW_PRIORITY_WEIGHT", "3"))
+    CHAT_PRIORITY_WEIGHT = int(os.getenv("CHAT_PRIORITY_WEIGHT", "1"))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "120"))  # seconds
+
+    # Predictive Pre-triage (runs the first workflow step while the user is still typing)
+    PREDICTIVE_TRIAGE = os.getenv("PREDICTIVE_TRIAGE", "False").lower() == "true"
+    PREDICTIVE_TRIAGE_DELAY = float(os.getenv("PREDICTIVE_TRIAGE_DELAY", "0.8"))  # seconds idle
+    PREDICTIVE_TRIAGE_TTL = float(os.getenv("PREDICTIVE_TRIAGE_TTL", "900"))  # seconds
+    PREDICTIVE_TRIAGE_WAIT = float(os.getenv("PREDICTIVE_TRIAGE_WAIT", "1.5"))  # seconds Start waits for one in flight
+    PREDICTIVE_PRIORITY_WEIGHT = int(os.getenv("PREDICTIVE_PRIORITY_WEIGHT", "1"))
+
+    # Session Persistence (sqlite, memory or none)
+    SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.db")
+    SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "1.0"))  # seconds
+    SESSION_TTL_DAYS = int(os.getenv("SESSION_TTL_DAYS", "7"))
+
+    # Idempotent Actions (how long a finished action is replayed to duplicate submits)
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "120"))  # seconds
+
+    # Prompt History (sqlite for search and filtering, or log for append-only JSONL segments)
+    HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "sqlite")
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "data/history.db")
+    HISTORY_COMPRESSION = os.getenv("HISTORY_COMPRESSION", "zlib")  # zlib (preset dictionary) or none
+    HISTORY_LOG_DIR = os.getenv("HISTORY_LOG_DIR", "history/log")
+    HISTORY_SEGMENT_MAX_BYTES = int(os.getenv("HISTORY_SEGMENT_MAX_BYTES", str(16 * 1024 * 1024)))
+    HISTORY_ROTATE_DAILY = os.getenv("HISTORY_ROTATE_DAILY", "True").lower() == "true"
+    HISTORY_GROUP_COMMIT_SIZE = int(os.getenv("HISTORY_GROUP_COMMIT_SIZE", "32"))
+    HISTORY_COMMIT_INTERVAL = float(os.getenv("HISTORY_COMMIT_INTERVAL", "0.5"))  # seconds
+    HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "0"))  # 0 keeps records forever
+    HISTORY_ROLLUP_AFTER_DAYS = float(os.getenv("HISTORY_ROLLUP_AFTER_DAYS", "0"))  # 0 disables roll-up (it trims records for good)
+    HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", "0"))  # 0 means no size limit
+    HISTORY_MIN_SEGMENT_BYTES = int(os.getenv("HISTORY_MIN_SEGMENT_BYTES", str(1024 * 1024)))
+    HISTORY_COMPACTION_INTERVAL = float(os.getenv("HISTORY_COMPACTION_INTERVAL", "3600"))  # seconds, 0 disables
+    HISTORY_COMPACTION_BATCH = int(os.getenv("HISTORY_COMPACTION_BATCH", "200"))
+    HISTORY_WRITE_QUEUE = int(os.getenv("HISTORY_WRITE_QUEUE", "1000"))  # records waiting before saves are refused
+    HISTORY_WRITE_BATCH = int(os.getenv("HISTORY_WRITE_BATCH", "64"))
+    HISTORY_WRITE_LINGER = float(os.getenv("HISTORY_WRITE_LINGER", "0.05"))  # seconds to fill a batch
+    HISTORY_ANALYTICS_PATH = os.getenv("HISTORY_ANALYTICS_PATH", "data/history_analytics.json")
+
+    # Admin Page (disabled while ADMIN_TOKEN is empty)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+    # Prompt Reuse (near-duplicate requests are served from, or seeded by, saved final prompts)
+    PROMPT_REUSE = os.getenv("PROMPT_REUSE", "True").lower() == "true"
+    PROMPT_REUSE_THRESHOLD = float(os.getenv("PROMPT_REUSE_THRESHOLD", "0.9"))  # cosine similarity to serve as-is
+    PROMPT_REUSE_SEED_THRESHOLD = float(os.getenv("PROMPT_REUSE_SEED_THRESHOLD", "0.7"))  # to use as a seed
+    PROMPT_REUSE_SCOPE = os.getenv("PROMPT_REUSE_SCOPE", "department")  # department or all
+
+    # Tracing (none, console, jsonl or otlp; otlp posts to TRACING_OTLP_ENDPOINT or appends to TRACING_PATH)
+    TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_PATH = os.getenv("TRACING_PATH", "data/traces.jsonl")
+    TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "")  # e.g. http://localhost:4318/v1/traces
+    TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "prompt-generator")
+
+    # Token Accounting (prices in US dollars per million tokens; defaults are gemini-2.0-flash list prices)
+    TOKEN_LEDGER_PATH = os.getenv("TOKEN_LEDGER_PATH", "data/token_ledger.json")
+    GEMINI_INPUT_PRICE_PER_MTOK = float(os.getenv("GEMINI_INPUT_PRICE_PER_MTOK", "0.10"))
+    GEMINI_OUTPUT_PRICE_PER_MTOK = float(os.getenv("GEMINI_OUTPUT_PRICE_PER_MTOK", "0.40"))
+
+    # Gemini Cassettes (off, record or replay; replay latency is recorded, none, milliseconds or scale:FACTOR)
+    GEMINI_CASSETTE_MODE = os.getenv("GEMINI_CASSETTE_MODE", "off")
+    GEMINI_CASSETTE_PATH = os.getenv("GEMINI_CASSETTE_PATH", "cassettes/gemini.jsonl")
+    GEMINI_CASSETTE_LATENCY = os.getenv("GEMINI_CASSETTE_LATENCY", "recorded")
+
+    # Profiling (per-session cProfile/tracemalloc reports, switched on from the admin page, or with ?profile=1 when PROFILE_QUERY_PARAM=True)
+    PROFILE_QUERY_PARAM = os.getenv("PROFILE_QUERY_PARAM", "False").lower() == "true"
+    PROFILE_REPORT_DIR = os.getenv("PROFILE_REPORT_DIR", "data/profiles")
+    PROFILE_MAX_REPORTS = int(os.getenv("PROFILE_MAX_REPORTS", "50"))
+
+    # Metrics (Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics; port 0 disables)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+    METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+    METRICS_SESSION_WINDOW = float(os.getenv("METRICS_SESSION_WINDOW", "300"))  # seconds a session counts as active
+
     # UI Configuration
     THEME_COLOR = "#1f77b4"
     BACKGROUND_COLOR = "#f0f2f6"
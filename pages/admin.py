@@ -0,0 +1,181 @@
+"""
+AI Intelligent Prompt Generator - Admin Page
+History analytics and Gemini token spend from precomputed aggregates, per-session profiling reports and CSV/Parquet export
+"""
+
+import hmac
+import json
+import pandas as pd
+import streamlit as st
+from utils.history_analytics import export_bytes, get_history_analytics, records_frame
+from utils.history_store import get_history_store
+from utils.profiling import get_profile_store
+from utils.token_usage import get_token_ledger
+from config import Config
+
+st.set_page_config(
+    page_title="Admin - AI Prompt Generator",
+    page_icon="📊",
+    layout="wide"
+)
+
+st.title("📊 History Analytics")
+
+# The page shows every user's requests and can switch on profiling, so it stays closed without a token
+if not Config.ADMIN_TOKEN:
+    st.warning("The admin page is disabled. Set ADMIN_TOKEN in your .env file to enable it.")
+    st.stop()
+
+token = st.text_input("Admin token", type="password", key="admin_token")
+if not hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+    st.info("Enter the admin token to view analytics")
+    st.stop()
+
+analytics = get_history_analytics()
+snapshot = analytics.snapshot()
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("Prompts saved", snapshot["records"])
+with col2:
+    st.metric("Departments", len(snapshot["departments"]))
+with col3:
+    st.metric("Updated", (snapshot["updated_at"] or "never")[:16].replace("T", " "))
+
+# Token spend is recorded per Gemini call, whether or not the prompt was saved
+ledger = get_token_ledger()
+usage = ledger.snapshot()
+st.subheader("🪙 Gemini Token Usage")
+if not usage["totals"]["calls"]:
+    st.caption("No Gemini calls have been recorded yet.")
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Gemini calls", f"{usage['totals']['calls']:,}")
+    with col2:
+        st.metric("Prompt tokens", f"{usage['totals']['prompt']:,}")
+    with col3:
+        st.metric("Output tokens", f"{usage['totals']['output']:,}")
+    with col4:
+        st.metric("Estimated cost", f"${usage['totals']['cost']:,.4f}")
+
+    stages = ledger.frame("stages")
+    st.caption("Tokens by workflow stage")
+    st.bar_chart(stages[["prompt", "output"]])
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("By department")
+        st.dataframe(ledger.frame("departments"), use_container_width=True)
+    with col2:
+        st.caption("Top sessions")
+        st.dataframe(ledger.frame("sessions").head(20), use_container_width=True)
+    st.caption("Estimated cost per day (USD)")
+    st.line_chart(ledger.frame("days")["cost"])
+
+# Profiling: switch it on for the session a user reports as slow, then download its run reports
+profiles = get_profile_store()
+st.subheader("🔬 Session Profiling")
+st.caption("Profiled sessions wrap each workflow step in cProfile and tracemalloc. With PROFILE_QUERY_PARAM=True, users can also add `?profile=1` to the app URL.")
+col1, col2 = st.columns([3, 1])
+with col1:
+    session_prefix = st.text_input("Session id (the 8 characters shown in the user's sidebar)", key="profile_session")
+with col2:
+    st.write("")
+    if st.button("▶️ Profile session", key="enable_profiling", disabled=not session_prefix.strip()):
+        profiles.enable(session_prefix)
+for prefix in profiles.enabled_sessions():
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption(f"Profiling session `{prefix}`")
+    with col2:
+        if st.button("⏹️ Stop", key=f"disable_profiling_{prefix}"):
+            profiles.disable(prefix)
+            st.rerun()
+
+runs = profiles.reports()
+if not runs:
+    st.caption("No profiled runs yet.")
+else:
+    st.dataframe(
+        pd.DataFrame(runs).set_index("id")[
+            ["started_at", "session_id", "action", "outcome", "wall_ms", "network_ms", "python_ms", "cpu_ms", "gemini_calls", "peak_traced_kb", "peak_shared"]
+        ],
+        use_container_width=True
+    )
+    selected = st.selectbox("Report", [run["id"] for run in runs], key="profile_report")
+    report = profiles.read(selected)
+    if report is not None:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Wall time", f"{report['wall_ms']:,.0f} ms")
+        with col2:
+            st.metric("Gemini network wait", f"{report['network_ms']:,.0f} ms")
+        with col3:
+            st.metric("Python work", f"{report['python_ms']:,.0f} ms", help=f"{report['cpu_ms']:,.0f} ms of CPU time")
+        with col4:
+            st.metric(
+                "Peak traced memory",
+                f"{report['peak_traced_kb']:,.0f} KB",
+                help="Shared with profiled runs that overlapped this one" if report.get("peak_shared") else None
+            )
+        st.caption("Top functions by cumulative time")
+        st.dataframe(pd.DataFrame(report["top_functions"]), use_container_width=True)
+        st.caption("Memory retained by source line")
+        st.dataframe(pd.DataFrame(report["top_allocations"]), use_container_width=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("⬇️ Report (JSON)", json.dumps(report, indent=2), file_name=f"{selected}.json", key="download_profile_json")
+        with col2:
+            st.download_button("⬇️ cProfile table", report["pstats_text"], file_name=f"{selected}.txt", key="download_profile_text")
+        with col3:
+            raw = profiles.pstats_bytes(selected)
+            if raw is not None:
+                st.download_button("⬇️ Raw .pstats", raw, file_name=f"{selected}.pstats", key="download_profile_pstats")
+
+if not snapshot["records"]:
+    st.info("No prompts have been saved yet. Run `python -m utils.history_analytics rebuild` to count existing history.")
+    st.stop()
+
+departments = analytics.department_frame()
+daily = analytics.daily_frame()
+
+st.subheader("🎯 By Department")
+st.dataframe(departments, use_container_width=True)
+
+st.subheader("📅 Saves per Day")
+st.bar_chart(daily)
+
+latency_columns = [column for column in departments.columns if column.endswith("_avg_ms")]
+if latency_columns:
+    st.subheader("⏱️ Average Stage Latency (ms)")
+    st.bar_chart(departments[latency_columns])
+
+# Export
+st.subheader("📤 Export")
+export_format = st.radio("Format", ["csv", "parquet"], horizontal=True, key="export_format")
+
+
+def download(label, frame, name):
+    try:
+        data = export_bytes(frame, export_format)
+    except RuntimeError as e:
+        st.warning(str(e))
+        return
+    st.download_button(label, data, file_name=f"{name}.{export_format}", key=f"download_{name}")
+
+
+col1, col2 = st.columns(2)
+with col1:
+    download("⬇️ Department summary", departments, "departments")
+with col2:
+    download("⬇️ Daily volume", daily, "daily_volume")
+
+# The per-record report reads the full history, so it is only built on request
+st.caption("The per-record report scans the full history and is built only when requested.")
+if st.button("🧮 Build per-record report", key="build_records_report"):
+    with st.spinner("Reading history..."):
+        st.session_state.records_report = records_frame(get_history_store().iter_records())
+if "records_report" in st.session_state:
+    report = st.session_state.records_report
+    st.dataframe(report.tail(200), use_container_width=True)
+    download("⬇️ Per-record report", report, "history_records")
@@ -0,0 +1,81 @@
+"""
+AI Intelligent Prompt Generator - History Browser
+Pages through saved prompts from the history index; a record is decoded only when opened
+"""
+
+import math
+import streamlit as st
+from utils.history_browser import history_page, open_record
+from utils.history_log import HistoryLog
+from utils.history_store import get_history_store
+
+st.set_page_config(
+    page_title="History - AI Prompt Generator",
+    page_icon="📚",
+    layout="wide"
+)
+
+st.title("📚 Prompt History")
+
+store = get_history_store()
+paged_by_number = isinstance(store, HistoryLog)  # the log index gives a total and direct page access
+
+col1, col2 = st.columns([1, 3])
+with col1:
+    page_size = st.selectbox("Per page", [10, 20, 50], index=1, key="browser_page_size")
+with col2:
+    department = None
+    if not paged_by_number:
+        choice = st.selectbox("Department", ["All"] + store.departments(), key="browser_department")
+        department = None if choice == "All" else choice
+
+# Start over when the filter or page size changes
+view_key = (page_size, department)
+if st.session_state.get("browser_view") != view_key:
+    st.session_state.browser_view = view_key
+    st.session_state.browser_page = 0
+    st.session_state.browser_cursors = [None]
+
+if paged_by_number:
+    result = history_page(store, st.session_state.browser_page, page_size)
+    pages = max(1, math.ceil(result["total"] / page_size))
+    st.caption(f"{result['total']} saved prompts · page {st.session_state.browser_page + 1} of {pages}")
+else:
+    cursors = st.session_state.browser_cursors
+    result = history_page(store, size=page_size, department=department, cursor=cursors[-1])
+    st.caption(f"Page {len(cursors)}")
+
+if not result["rows"]:
+    st.info("No saved prompts yet")
+
+for row in result["rows"]:
+    title = row.get("original_request") or f"Prompt {row['id'][:8]}"
+    when = row["saved_at"][:16].replace("T", " ")
+    meta = f"{row['department']} · {when}" if row.get("department") else when
+    opened = st.toggle(f"**{title[:80]}** — {meta}", key=f"browser_open_{row['id']}")
+    if opened:
+        record = open_record(store, row) or {}
+        st.code(record.get("final_prompt") or record.get("generated_prompt", ""), language=None)
+        with st.expander("Full record"):
+            st.json(record)
+
+# Navigation
+col1, col2, _ = st.columns([1, 1, 4])
+if paged_by_number:
+    with col1:
+        if st.button("⬅️ Newer", disabled=st.session_state.browser_page == 0):
+            st.session_state.browser_page -= 1
+            st.rerun()
+    with col2:
+        if st.button("Older ➡️", disabled=st.session_state.browser_page + 1 >= pages):
+            st.session_state.browser_page += 1
+            st.rerun()
+else:
+    with col1:
+        if st.button("⬅️ Newer", disabled=len(st.session_state.browser_cursors) == 1):
+            st.session_state.browser_cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Older ➡️", disabled=result["next_cursor"] is None):
+            st.session_state.browser_cursors.append(result["next_cursor"])
+            st.rerun()
@@ -0,0 +1,108 @@
+"""
+Test fair admission control for concurrent Gemini-backed actions
+"""
+
+import threading
+import time
+import pytest
+from utils.admission import AdmissionController, AdmissionTimeout
+
+def test_global_and_per_session_limits():
+    """No more than max_in_flight overall and per_session_limit per session run at once"""
+    controller = AdmissionController(max_in_flight=2, per_session_limit=1)
+    running = []
+    peak = {"total": 0, "alice": 0}
+    lock = threading.Lock()
+
+    def work(session_id):
+        with controller.slot(session_id, "chat"):
+            with lock:
+                running.append(session_id)
+                peak["total"] = max(peak["total"], len(running))
+                peak["alice"] = max(peak["alice"], running.count("alice"))
+            time.sleep(0.02)
+            with lock:
+                running.remove(session_id)
+
+    threads = [threading.Thread(target=work, args=(sid,)) for sid in ["alice"] * 4 + ["bob", "carol"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak["total"] <= 2
+    assert peak["alice"] == 1
+    assert controller.stats()["in_flight"] == 0
+    assert controller.stats()["admitted_total"] == 6
+
+def test_workflow_steps_are_served_before_chat():
+    """With weights 3:1, queued workflow steps get most of the freed slots"""
+    controller = AdmissionController(max_in_flight=1, per_session_limit=1, weights={"workflow": 3, "chat": 1})
+    blocker = controller.acquire("blocker", "workflow")
+    served = []
+
+    def run(session_id, kind):
+        with controller.slot(session_id, kind):
+            served.append(kind)
+
+    requests = [(f"{kind}-{index}", kind) for index in range(4) for kind in ("chat", "workflow")]
+    workers = [threading.Thread(target=run, args=request) for request in requests]
+    for worker in workers:
+        worker.start()
+    while controller.stats()["queued"] < len(workers):
+        time.sleep(0.005)
+
+    controller.release(blocker)
+    for worker in workers:
+        worker.join()
+
+    assert served[:4].count("workflow") == 3
+
+def test_round_robin_between_sessions():
+    """A session with many queued chats does not starve a session that queued later"""
+    controller = AdmissionController(max_in_flight=1, per_session_limit=2)
+    blocker = controller.acquire("blocker", "chat")
+    order = []
+
+    def run(session_id):
+        with controller.slot(session_id, "chat"):
+            order.append(session_id)
+
+    spammer = [threading.Thread(target=run, args=("spammer",)) for _ in range(5)]
+    for thread in spammer:
+        thread.start()
+    while controller.stats()["queued"] < 5:
+        time.sleep(0.005)
+    polite = threading.Thread(target=run, args=("polite",))
+    polite.start()
+    while controller.stats()["queued"] < 6:
+        time.sleep(0.005)
+
+    assert controller.queue_position("polite") == 2
+
+    controller.release(blocker)
+    for thread in spammer + [polite]:
+        thread.join()
+
+    assert order.index("polite") <= 1
+
+def test_queue_timeout_and_position_callback():
+    """Waiters see their queue position and give up after the timeout"""
+    controller = AdmissionController(max_in_flight=1, poll_interval=0.01)
+    ticket = controller.acquire("first", "workflow")
+    positions = []
+
+    with pytest.raises(AdmissionTimeout):
+        controller.acquire("second", "workflow", timeout=0.05, on_wait=positions.append)
+
+    assert positions == [1]
+    assert controller.stats()["queued"] == 0
+    assert controller.stats()["timeouts_total"] == 1
+    controller.release(ticket)
+
+if __name__ == "__main__":
+    test_global_and_per_session_limits()
+    test_workflow_steps_are_served_before_chat()
+    test_round_robin_between_sessions()
+    test_queue_timeout_and_position_callback()
+    print("✅ Admission control tests passed")
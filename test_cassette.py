@@ -0,0 +1,87 @@
+"""
+Test Gemini cassettes: recording with the API key redacted and deterministic offline replay
+"""
+
+import json
+import os
+import tempfile
+import time
+from benchmarks.load_test import LOAD_RESPONSES
+from benchmarks.mock_gemini import MockGeminiServer
+from benchmarks.workflow_bench import DIRECT_REQUEST, SECOND_ANSWERS
+from utils.cassette import Cassette, CassetteMiss, redact_url
+
+SECRET = "AIza-test-secret-key"
+
+def _record_workflow(path):
+    """Run a request and a final answer round against the mock, recording every call"""
+    with MockGeminiServer(latency="fixed:30", responses=LOAD_RESPONSES) as server:
+        agents = server.agents()
+        agents.api_key = SECRET
+        agents.cassette = Cassette(path, "record")
+        started = agents.process_interactive_workflow(DIRECT_REQUEST)
+        finished = agents.continue_workflow(DIRECT_REQUEST, "Content", SECOND_ANSWERS)
+        return agents, server.url, started, finished
+
+def test_record_redacts_the_api_key():
+    """Recorded interactions keep request and response but never the key"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cassettes", "workflow.jsonl")
+        _record_workflow(path)
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        interactions = [json.loads(line) for line in text.splitlines()]
+        assert len(interactions) == 5
+        assert SECRET not in text
+        assert interactions[0]["request"]["headers"]["X-goog-api-key"] == "<redacted>"
+        assert interactions[0]["request"]["body"]["contents"][0]["parts"][0]["text"].startswith("You are a Input Intent Analyzer")
+        assert interactions[0]["response"]["status"] == 200 and interactions[0]["latency_ms"] >= 30
+    assert redact_url("https://host/v1:generateContent?key=abc&alt=json") == "https://host/v1:generateContent?key=<redacted>&alt=json"
+
+def test_replay_is_offline_and_deterministic():
+    """With the server gone, replay returns the recorded results; unknown requests miss"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflow.jsonl")
+        agents, url, started, finished = _record_workflow(path)
+
+        agents.cassette = Cassette(path, "replay", latency="none")
+        assert len(agents.cassette) == 5
+        agents.api_key = "replay"
+        replay_started = agents.process_interactive_workflow(DIRECT_REQUEST)
+        replay_finished = agents.continue_workflow(DIRECT_REQUEST, "Content", SECOND_ANSWERS)
+        assert replay_started["questions"] == started["questions"]
+        assert replay_started["department_detected"] == started["department_detected"]
+        assert finished["workflow_state"] == "complete"
+        assert replay_finished["final_prompt"] == finished["final_prompt"]
+        assert replay_started["stage_tokens"] == started["stage_tokens"]
+
+        miss = agents._call_gemini_api("Something never recorded", "AI Mentor")
+        assert miss.startswith("Error calling Gemini API: No recorded response")
+        try:
+            agents.cassette.post(url, json={"contents": []})
+            assert False, "unrecorded request served"
+        except CassetteMiss:
+            pass
+
+def test_replay_latency_options():
+    """Replay waits the recorded time, a fixed time or a scaled recorded time"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflow.jsonl")
+        agents, url, _, _ = _record_workflow(path)
+        for latency, low, high in [("recorded", 0.09, 2.0), ("scale:0", 0.0, 0.05), ("20", 0.06, 0.5)]:
+            agents.cassette = Cassette(path, "replay", latency=latency)
+            started = time.perf_counter()
+            agents.process_interactive_workflow(DIRECT_REQUEST)
+            assert low <= time.perf_counter() - started <= high, latency
+        for mode, latency in [("replay", "soon"), ("rewind", "none")]:
+            try:
+                Cassette(path, mode, latency)
+                assert False, f"{mode} {latency} accepted"
+            except ValueError:
+                pass
+
+if __name__ == "__main__":
+    test_record_redacts_the_api_key()
+    test_replay_is_offline_and_deterministic()
+    test_replay_latency_options()
+    print("✅ Cassette tests passed")
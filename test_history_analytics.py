@@ -0,0 +1,125 @@
+"""
+Test history analytics: running aggregates, rebuilds, pandas reports and CSV/Parquet export
+"""
+
+import io
+import os
+import tempfile
+import pandas as pd
+from utils.history_analytics import HistoryAnalytics, export_bytes, export_frame, records_frame
+from utils.history_compaction import HistoryCompactor, RetentionPolicy
+from utils.history_store import SQLiteHistoryStore
+from utils.history_writer import HistoryWriter
+
+def _record(i, department, questions=2, stage_ms=None):
+    return {
+        "id": f"r{i}",
+        "department": department,
+        "original_request": "Plan a product launch",
+        "final_prompt": "x" * (100 * (i + 1)),
+        "total_questions": questions,
+        "stage_ms": stage_ms or {},
+        "saved_at": f"2025-08-0{1 + i % 2}T10:00:00"
+    }
+
+RECORDS = [
+    _record(0, "Digital Marketing", 2, {"questions": 100.0, "final_prompt": 900.0}),
+    _record(1, "Digital Marketing", 4, {"questions": 300.0}),
+    _record(2, "Content", 1)
+]
+
+def test_running_totals_and_persistence():
+    """Each save updates the per-department totals, which survive a restart"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "analytics.json")
+        analytics = HistoryAnalytics(path)
+        analytics.observe(RECORDS[:2])
+        analytics.observe(RECORDS[2:])
+
+        snapshot = HistoryAnalytics(path).snapshot()
+        marketing = snapshot["departments"]["Digital Marketing"]
+        assert snapshot["records"] == 3
+        assert marketing["avg_questions"] == 3.0
+        assert marketing["avg_prompt_chars"] == 150.0 and marketing["max_prompt_chars"] == 200
+        assert marketing["stages"]["questions"] == {"count": 2, "avg_ms": 200.0, "max_ms": 300.0}
+        assert snapshot["days"] == {"2025-08-01": {"Digital Marketing": 1, "Content": 1}, "2025-08-02": {"Digital Marketing": 1}}
+
+def test_frames_come_from_aggregates():
+    """Department and daily reports are built from the totals, not the history"""
+    analytics = HistoryAnalytics()
+    analytics.observe(RECORDS)
+    departments = analytics.department_frame()
+    assert list(departments.index) == ["Content", "Digital Marketing"]
+    assert departments.loc["Digital Marketing", "questions_avg_ms"] == 200.0
+    daily = analytics.daily_frame()
+    assert daily.loc["2025-08-01", "Content"] == 1 and daily.loc["2025-08-02", "Content"] == 0
+
+def test_writer_feeds_analytics_and_rebuild_matches():
+    """Records saved through the writer are counted once; a full rebuild gives the same totals"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        analytics = HistoryAnalytics(os.path.join(tmp, "analytics.json"))
+        writer = HistoryWriter(store)
+        writer.add_listener(analytics.observe)
+        for record in RECORDS:
+            writer.submit(record)
+        writer.close()
+
+        incremental = analytics.snapshot()
+        assert analytics.rebuild(store.iter_records()) == 3
+        assert analytics.snapshot()["departments"] == incremental["departments"]
+        store.close()
+
+def test_records_frame_and_export():
+    """Per-record reports are columnar with typed columns and export to CSV and Parquet"""
+    frame = records_frame(RECORDS)
+    assert list(frame["prompt_chars"]) == [100, 200, 300]
+    assert str(frame["department"].dtype) == "category"
+    assert frame["final_prompt_ms"].isna().tolist() == [False, True, True]
+    assert frame["total_ms"].tolist()[:2] == [1000.0, 300.0]
+
+    assert export_bytes(frame, "csv").startswith(b",id,saved_at")
+    parquet = pd.read_parquet(io.BytesIO(export_bytes(frame, "parquet")))
+    assert list(parquet["id"]) == ["r0", "r1", "r2"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = export_frame(frame, os.path.join(tmp, "reports", "records.csv"))
+        assert len(pd.read_csv(path)) == 3
+
+def test_saving_an_id_again_replaces_it_and_forget_removes_it():
+    """Re-saved records are counted once with their latest numbers; deleted ones drop out"""
+    analytics = HistoryAnalytics()
+    analytics.observe(RECORDS)
+    analytics.observe([dict(RECORDS[1], final_prompt="x" * 50, stage_ms={"questions": 100.0})])
+    marketing = analytics.snapshot()["departments"]["Digital Marketing"]
+    assert marketing["records"] == 2
+    assert marketing["avg_prompt_chars"] == 75.0 and marketing["max_prompt_chars"] == 100
+    assert marketing["stages"]["questions"] == {"count": 2, "avg_ms": 100.0, "max_ms": 100.0}
+
+    assert analytics.forget(["r2", "missing"]) == 1
+    snapshot = analytics.snapshot()
+    assert snapshot["records"] == 2 and "Content" not in snapshot["departments"]
+    assert snapshot["days"] == {"2025-08-01": {"Digital Marketing": 1}, "2025-08-02": {"Digital Marketing": 1}}
+
+def test_compaction_rebuilds_and_other_processes_are_picked_up():
+    """Deleting compaction runs rebuild the totals; a rebuild written by another process is reloaded"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        path = os.path.join(tmp, "analytics.json")
+        analytics = HistoryAnalytics(path)
+        store.append_many(RECORDS)
+        analytics.observe(RECORDS)
+
+        compactor = HistoryCompactor(store, RetentionPolicy(max_age_days=30), clock=lambda: 1e10)
+        compactor.add_listener(lambda _: HistoryAnalytics(path).rebuild(store.iter_records()))
+        assert compactor.run()["deleted"] == 3
+        assert analytics.snapshot()["records"] == 0
+        store.close()
+
+if __name__ == "__main__":
+    test_running_totals_and_persistence()
+    test_frames_come_from_aggregates()
+    test_writer_feeds_analytics_and_rebuild_matches()
+    test_records_frame_and_export()
+    test_saving_an_id_again_replaces_it_and_forget_removes_it()
+    test_compaction_rebuilds_and_other_processes_are_picked_up()
+    print("✅ History analytics tests passed")
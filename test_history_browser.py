@@ -0,0 +1,88 @@
+"""
+Test the history browser: memory-mapped index pages, keyset pages and lazy record decoding
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from utils.history_browser import history_page, open_record
+from utils.history_compaction import HistoryCompactor, RetentionPolicy
+from utils.history_log import HistoryLog
+from utils.history_store import SQLiteHistoryStore
+
+def _record(i, department="HR"):
+    return {
+        "department": department,
+        "original_request": f"request {i}",
+        "final_prompt": f"prompt {i}",
+        "saved_at": (datetime(2025, 8, 1) + timedelta(hours=i)).isoformat()
+    }
+
+def test_index_view_pages_newest_first():
+    """Pages are slices of the mapped index; later appends need a new view"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(os.path.join(tmp, "log"), commit_interval=60)
+        ids = log.append_many([_record(i) for i in range(25)])
+
+        with log.index_view() as view:
+            assert len(view) == 25
+            assert [row["id"] for row in view.page(0, 10)] == ids[::-1][:10]
+            assert [row["position"] for row in view.page(2, 10)] == [4, 3, 2, 1, 0]
+            assert view.page(3, 10) == []
+            assert [row["id"] for row in view.page(0, 3, newest_first=False)] == ids[:3]
+            log.append(_record(25))
+            assert len(view) == 25
+        with log.index_view() as view:
+            assert len(view) == 26
+        log.close()
+
+def test_log_rows_open_lazily_even_after_compaction():
+    """Rows hold only index data; opening one decodes the record, following compaction if needed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(os.path.join(tmp, "log"), segment_max_bytes=1, commit_interval=60)
+        log.append_many([_record(i) for i in range(3)])
+        page = history_page(log, 0, 2)
+        assert page["total"] == 3 and "final_prompt" not in page["rows"][0]
+        assert open_record(log, page["rows"][0])["final_prompt"] == "prompt 2"
+
+        HistoryCompactor(log, RetentionPolicy(rollup_after_days=0, min_segment_bytes=1 << 20)).run()
+        assert open_record(log, history_page(log, 1, 2)["rows"][0])["final_prompt"] == "prompt 0"
+        assert open_record(log, {"id": page["rows"][1]["id"], "segment": 2, "offset": 0, "length": 10})["final_prompt"] == "prompt 1"
+        log.close()
+
+def test_sqlite_pages_by_cursor():
+    """The SQLite backend pages with a (saved_at, seq) cursor, filtered by department"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        store.append_many(_record(i, "Sales" if i % 2 else "HR") for i in range(7))
+        first = history_page(store, size=2, department="Sales")
+        second = history_page(store, size=2, department="Sales", cursor=first["next_cursor"])
+        assert [row["original_request"] for row in first["rows"] + second["rows"]] == [
+            "request 5", "request 3", "request 1"
+        ]
+        assert second["next_cursor"] is None and first["total"] is None
+        assert open_record(store, second["rows"][0])["final_prompt"] == "prompt 1"
+        store.close()
+
+def test_log_pages_show_the_latest_save_of_each_id():
+    """Re-appending an id replaces its row instead of adding a second one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(os.path.join(tmp, "log"), commit_interval=60)
+        ids = log.append_many([_record(i) for i in range(4)])
+        log.append(dict(_record(1), id=ids[1], final_prompt="prompt 1 edited"))
+
+        page = history_page(log, 0, 3)
+        assert page["total"] == 4
+        assert [row["id"] for row in page["rows"]] == [ids[1], ids[3], ids[2]]
+        assert [row["id"] for row in history_page(log, 1, 3)["rows"]] == [ids[0]]
+        assert open_record(log, page["rows"][0])["final_prompt"] == "prompt 1 edited"
+        with log.index_view() as view:
+            assert len(view) == 5
+        log.close()
+
+if __name__ == "__main__":
+    test_index_view_pages_newest_first()
+    test_log_rows_open_lazily_even_after_compaction()
+    test_sqlite_pages_by_cursor()
+    test_log_pages_show_the_latest_save_of_each_id()
+    print("✅ History browser tests passed")
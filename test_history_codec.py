@@ -0,0 +1,62 @@
+"""
+Test compressed history records: preset dictionary, stage ordering and dictionary versioning
+"""
+
+import json
+import os
+import zlib
+from utils.history_codec import HistoryCodec, build_preset_dictionary, stage_ordered
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history", "prompt_history_20250819_101826.json")
+
+def _codec():
+    return HistoryCodec({1: build_preset_dictionary()}, current=1)
+
+def test_roundtrip_and_plain_json_passthrough():
+    """Encoded records decode to the same dict; uncompressed JSON still reads"""
+    codec = _codec()
+    record = {"original_request": "Plan a launch", "final_prompt": "You are an expert…", "total_questions": 3}
+    assert codec.decode(codec.encode(record)) == record
+    assert codec.decode(json.dumps(record)) == record
+    assert codec.decode(json.dumps(record).encode("utf-8")) == record
+
+def test_stage_fields_are_stored_in_pipeline_order():
+    """Near-duplicate stage texts end up next to each other in the stream"""
+    record = {"generated_prompt": "g", "saved_at": "t", "analysis": "a", "enhanced": "e", "structure": "s"}
+    assert list(stage_ordered(record)) == ["analysis", "structure", "enhanced", "generated_prompt", "saved_at"]
+
+def test_sample_record_compresses_better_than_plain_zlib():
+    """The stored sample record shrinks several times and beats zlib without a dictionary"""
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        record = json.load(f)
+    raw = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    encoded = _codec().encode(record)
+    assert len(encoded) * 4 < len(raw)
+    assert len(encoded) < len(zlib.compress(raw, 6))
+
+def test_dictionary_helps_small_records():
+    """Short prompts full of template boilerplate gain most from the preset dictionary"""
+    record = {
+        "original_request": "Write a blog post about remote work",
+        "final_prompt": "**Role:** You are an expert content strategist\n**Context:** \n**Task:** \n"
+                        "**Quality Criteria:**\n- Clear and engaging\n**Additional Guidelines:**\n- Use headings",
+        "department": "Content",
+        "status": "completed"
+    }
+    raw = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    assert len(_codec().encode(record)) < len(zlib.compress(raw, 6))
+
+def test_old_dictionaries_stay_readable():
+    """Records keep the id of the dictionary they were written with"""
+    old = HistoryCodec({1: b"old boilerplate text"}, current=1)
+    encoded = old.encode({"final_prompt": "old boilerplate text again"})
+    upgraded = HistoryCodec({1: b"old boilerplate text", 2: build_preset_dictionary()}, current=2)
+    assert upgraded.decode(encoded) == {"final_prompt": "old boilerplate text again"}
+
+if __name__ == "__main__":
+    test_roundtrip_and_plain_json_passthrough()
+    test_stage_fields_are_stored_in_pipeline_order()
+    test_sample_record_compresses_better_than_plain_zlib()
+    test_dictionary_helps_small_records()
+    test_old_dictionaries_stay_readable()
+    print("✅ History codec tests passed")
@@ -0,0 +1,121 @@
+"""
+Test the append-only JSONL history log: group commit, rotation, index lookups, recovery and migration
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from utils.history_log import INDEX_ENTRY, HistoryLog, legacy_record_id, migrate_legacy_history
+
+def test_append_and_random_access_by_id():
+    """Records are readable by id without scanning, before and after a reopen"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(tmp, commit_interval=60)
+        ids = [log.append({"user_input": f"request {i}", "department": "sales"}) for i in range(10)]
+        assert log.get(ids[3])["user_input"] == "request 3"
+        assert log.get("0" * 32) is None
+        log.close()
+
+        reopened = HistoryLog(tmp)
+        assert len(reopened) == 10
+        assert reopened.get(ids[7])["user_input"] == "request 7"
+        assert reopened.recent(limit=2)[0]["user_input"] == "request 9"
+        reopened.close()
+
+def test_group_commit_batches_fsyncs():
+    """Only every Nth append pays for an fsync; durable appends commit on their own"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(tmp, group_commit_size=4, commit_interval=60)
+        for i in range(3):
+            log.append({"user_input": str(i)})
+        assert log._committed_seq == 0
+        log.append({"user_input": "3"})
+        assert log._committed_seq == 4
+
+        log.commit_interval = 0.01
+        log.append({"user_input": "durable"}, durable=True)
+        assert log._committed_seq == 5
+        log.close()
+
+def test_rotation_by_size_and_date():
+    """A new segment starts when the size limit is hit or the day changes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(tmp, segment_max_bytes=300, commit_interval=60)
+        for i in range(6):
+            log.append({"user_input": "x" * 100, "n": i})
+        assert len(log.segments()) >= 3
+
+        tomorrow = (datetime.now() + timedelta(days=1)).isoformat()
+        before = len(log.segments())
+        log.segment_max_bytes = 10 ** 9
+        log.append({"user_input": "next day", "saved_at": tomorrow})
+        assert len(log.segments()) == before + 1
+        assert [record["n"] for record in log.iter_records() if "n" in record] == list(range(6))
+        log.close()
+
+def test_time_range_lookup():
+    """Lookups by timestamp use the index, even for out-of-order (migrated) records"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(tmp, rotate_daily=False, commit_interval=60)
+        base = datetime(2025, 8, 19, 10, 0, 0)
+        for hours in (5, 1, 3):
+            log.append({"user_input": str(hours), "saved_at": (base + timedelta(hours=hours)).isoformat()})
+        found = log.iter_records(
+            start=(base + timedelta(hours=2)).timestamp(),
+            end=(base + timedelta(hours=6)).timestamp()
+        )
+        assert [record["user_input"] for record in found] == ["3", "5"]
+        log.close()
+
+def test_recovery_after_torn_writes():
+    """A torn index entry and a torn final line are dropped; unindexed complete lines are re-indexed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(tmp, commit_interval=60)
+        first = log.append({"user_input": "kept"})
+        second = log.append({"user_input": "only in segment"})
+        log.close()
+
+        index_path = os.path.join(tmp, "index.bin")
+        with open(index_path, "r+b") as f:
+            f.truncate(INDEX_ENTRY.size + 7)
+        with open(log.segments()[-1], "ab") as f:
+            f.write(b'{"id":"torn')
+
+        recovered = HistoryLog(tmp)
+        assert len(recovered) == 2
+        assert recovered.get(first)["user_input"] == "kept"
+        assert recovered.get(second)["user_input"] == "only in segment"
+        third = recovered.append({"user_input": "after recovery"})
+        assert recovered.get(third)["user_input"] == "after recovery"
+        recovered.close()
+
+def test_migrate_legacy_history_is_idempotent():
+    """Per-file JSON history is imported once, keeping its original timestamps"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "history")
+        os.makedirs(legacy)
+        for i in range(3):
+            with open(os.path.join(legacy, f"prompt_history_{i}.json"), "w", encoding="utf-8") as f:
+                json.dump({"user_input": f"old {i}", "saved_at": f"2025-08-1{i}T10:00:00"}, f, indent=2)
+        with open(os.path.join(legacy, "broken.json"), "w", encoding="utf-8") as f:
+            f.write("{not json")
+
+        log = HistoryLog(os.path.join(tmp, "log"), commit_interval=60)
+        assert migrate_legacy_history(legacy, log) == {"imported": 3, "skipped": 0, "failed": 1}
+        assert migrate_legacy_history(legacy, log) == {"imported": 0, "skipped": 3, "failed": 1}
+
+        record = log.get(legacy_record_id("prompt_history_1.json"))
+        assert record["user_input"] == "old 1"
+        assert record["legacy_file"] == "prompt_history_1.json"
+        assert [r["user_input"] for r in log.iter_records()] == ["old 0", "old 1", "old 2"]
+        log.close()
+
+if __name__ == "__main__":
+    test_append_and_random_access_by_id()
+    test_group_commit_batches_fsyncs()
+    test_rotation_by_size_and_date()
+    test_time_range_lookup()
+    test_recovery_after_torn_writes()
+    test_migrate_legacy_history_is_idempotent()
+    print("✅ History log tests passed")
@@ -0,0 +1,290 @@
+"""
+Test the SQLite prompt history store: department/time queries, FTS5 search, deduplication, compression and migration
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from utils.history_log import HistoryLog
+from utils.history_store import SQLiteHistoryStore, blob_hash, fts_query, import_history_log
+
+def _record(i, department, request, prompt):
+    saved_at = (datetime(2025, 8, 1) + timedelta(hours=i)).isoformat()
+    return {
+        "department": department,
+        "original_request": request,
+        "final_prompt": prompt,
+        "saved_at": saved_at
+    }
+
+def test_recent_by_department_with_keyset_pages():
+    """Recent prompts come newest first, filtered by department, paged by timestamp"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        store.append_many(
+            _record(i, "Sales" if i % 2 else "HR", f"request {i}", f"prompt {i}") for i in range(10)
+        )
+        assert store.count() == 10
+        assert store.count("Sales") == 5
+        assert store.departments() == ["HR", "Sales"]
+
+        first_page = store.recent(limit=3, department="Sales")
+        assert [item["original_request"] for item in first_page] == ["request 9", "request 7", "request 5"]
+        second_page = store.recent(limit=3, department="Sales", before=(first_page[-1]["saved_ts"], first_page[-1]["seq"]))
+        assert [item["original_request"] for item in second_page] == ["request 3", "request 1"]
+        assert "final_prompt" not in first_page[0]
+        store.close()
+
+def test_keyset_pages_keep_records_saved_at_the_same_time():
+    """Records sharing a timestamp across a page boundary all show up, newest saved first"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        store.append_many(dict(_record(0, "Sales", f"request {i}", f"prompt {i}"), id=f"r{i}") for i in range(5))
+        seen, before = [], None
+        while True:
+            page = store.recent(limit=2, before=before)
+            if not page:
+                break
+            seen += [item["original_request"] for item in page]
+            before = (page[-1]["saved_ts"], page[-1]["seq"])
+        assert seen == ["request 4", "request 3", "request 2", "request 1", "request 0"]
+        store.close()
+
+def test_keyword_search_ranks_and_filters():
+    """Search covers the request and the prompt, supports prefixes and department filters"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        store.append(_record(1, "HR", "Onboarding email for new hires", "Write a warm welcome email"))
+        store.append(_record(2, "Sales", "Quarterly pipeline review", "Summarize onboarding of new accounts"))
+        store.append(_record(3, "Sales", "Cold outreach sequence", "Draft three outreach emails"))
+
+        assert {item["department"] for item in store.search("onboarding")} == {"HR", "Sales"}
+        assert [item["department"] for item in store.search("onboard", department="HR")] == ["HR"]
+        assert len(store.search("email")) == 2
+        assert "**" in store.search("outreach")[0]["snippet"]
+        assert store.search('"unbalanced quote (') == []
+        assert store.search("   ") == []
+        store.close()
+
+def test_upsert_and_delete_keep_search_in_sync():
+    """Re-saving a record by id replaces it in the full-text index; deleting removes it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        record_id = store.append(_record(1, "HR", "Policy summary", "first draft"))
+        store.append(dict(_record(1, "HR", "Policy summary", "second version"), id=record_id))
+
+        assert store.count() == 1
+        assert store.search("draft") == []
+        assert store.get(record_id)["final_prompt"] == "second version"
+        assert store.delete(record_id)
+        assert store.search("policy") == []
+        store.close()
+
+def test_import_history_log():
+    """Records from the JSONL log, including legacy field names, become searchable"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = HistoryLog(os.path.join(tmp, "log"), commit_interval=60)
+        log.append({"user_input": "Brand guidelines", "generated_prompt": "Create a style guide", "department": None})
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+
+        assert import_history_log(log, store) == 1
+        assert import_history_log(log, store) == 1
+        assert store.count() == 1
+        assert store.search("style")[0]["original_request"] == "Brand guidelines"
+        log.close()
+        store.close()
+
+def test_records_are_compressed_and_reported():
+    """Full records are stored compressed; the report compares sizes and read cost"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        prompt = "**Quality Criteria:**\n- Clear, specific and actionable\n" * 50
+        record_id = store.append(_record(1, "HR", "Interview guide", prompt))
+        assert store.get(record_id)["final_prompt"] == prompt
+
+        report = store.compression_report()
+        assert report["records"] == 1
+        assert report["stored_bytes"] * 5 < report["raw_bytes"]
+        assert report["read_us_p50"] > 0
+        store.close()
+
+def test_identical_texts_are_stored_once():
+    """Records share stage texts by hash; only the first copy is written"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        prompt = "You are an expert recruiter. " * 200
+        ids = [store.append(_record(i, "HR", "Job description  for a DATA engineer", prompt)) for i in range(5)]
+        store.append(_record(9, "HR", "Job description for a data engineer", "A different prompt"))
+
+        stats = store.stats()
+        assert stats["records"] == 6
+        assert stats["blobs"] == 4
+        assert stats["dedup_ratio"] > 4
+        assert all(store.get(record_id)["final_prompt"] == prompt for record_id in ids)
+        store.close()
+
+def test_same_request_lookup():
+    """A request seen before is found by its normalized text"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        store.append(_record(1, "HR", "Onboarding plan for interns", "first"))
+        latest = store.append(_record(2, "HR", "Onboarding plan for interns", "second"))
+
+        assert store.find_by_request("  onboarding PLAN for interns ")["id"] == latest
+        assert store.find_by_request("Onboarding plan for interns", department="Sales") is None
+        assert store.find_by_request("Something new") is None
+        store.close()
+
+def test_deletes_release_blobs_for_garbage_collection():
+    """Blobs are kept while any record references them and collected afterwards"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        first = store.append(_record(1, "HR", "Shared request", "shared prompt"))
+        second = store.append(_record(2, "HR", "Shared request", "shared prompt"))
+
+        store.delete(first)
+        assert store.collect_garbage() == 0
+        assert store.get(second)["final_prompt"] == "shared prompt"
+
+        store.append(dict(_record(2, "HR", "Shared request", "edited prompt"), id=second))
+        assert store.collect_garbage() == 1
+        store.delete(second)
+        assert store.collect_garbage() == 2
+        assert store.stats()["blobs"] == 0
+        store.close()
+
+def test_first_schema_is_migrated():
+    """Databases from the plain-JSON schema are converted on open and stay searchable"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(
+            """
+            CREATE TABLE prompt_history (
+                seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, saved_at REAL NOT NULL,
+                department TEXT, status TEXT, original_request TEXT NOT NULL DEFAULT '',
+                final_prompt TEXT NOT NULL DEFAULT '', record TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE prompt_history_fts USING fts5(
+                original_request, final_prompt, content='prompt_history', content_rowid='seq'
+            );
+            """
+        )
+        record = _record(1, "HR", "Onboarding checklist", "List the first-week tasks")
+        record["id"] = "a" * 32
+        conn.execute(
+            "INSERT INTO prompt_history (id, saved_at, department, original_request, final_prompt, record) "
+            "VALUES (?, 0, 'HR', ?, ?, ?)",
+            (record["id"], record["original_request"], record["final_prompt"], json.dumps(record))
+        )
+        conn.commit()
+        conn.close()
+
+        store = SQLiteHistoryStore(path)
+        assert store.get("a" * 32) == record
+        assert [item["id"] for item in store.search("checklist")] == ["a" * 32]
+        store.close()
+
+def test_fts_query_quotes_words():
+    """User text never reaches FTS5 as raw query syntax"""
+    assert fts_query("new hire OR") == '"new" "hire" "OR"*'
+    assert fts_query('say "hi"') == '"say" """hi"""*'
+    assert fts_query("") == ""
+
+def test_fields_with_the_same_text_hold_one_reference():
+    """A record repeating a text across fields releases it once, so shared blobs survive its deletion"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        doubled = dict(_record(1, "HR", "Same request", "same prompt"), user_input="Same request", generated_prompt="same prompt")
+        first = store.append(doubled)
+        second = store.append(dict(doubled, saved_at=_record(2, "HR", "", "")["saved_at"]))
+
+        store.delete(first)
+        assert store.collect_garbage() == 0
+        assert store.get(second)["generated_prompt"] == "same prompt"
+        assert store.get(second)["user_input"] == "Same request"
+        store.delete(second)
+        assert store.collect_garbage() == 2
+        store.close()
+
+def _staged_record(i):
+    """A record whose stages each rewrite the one before, as the generators do"""
+    analysis = f"Analysis {i}: " + " ".join(f"point {n} about onboarding new engineers" for n in range(40))
+    structure = analysis + "\n**Structure:** role, context, task, deliverables"
+    enhanced = structure + "\n**Enhanced:** add success metrics and a 30-60-90 day plan"
+    return dict(
+        _record(i, "HR", f"Onboarding plan {i}", enhanced + "\n**Final**"),
+        analysis=analysis, structure=structure, enhanced=enhanced, generated_prompt=enhanced + "\n**Generated**"
+    )
+
+def test_stage_blobs_are_compressed_against_the_previous_stage():
+    """Each new stage blob back-references the stage before it, and holds it until collected"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        record_id = store.append(_staged_record(1))
+        assert {key: value for key, value in store.get(record_id).items() if key in _staged_record(1)} == _staged_record(1)
+
+        conn = sqlite3.connect(os.path.join(tmp, "history.db"))
+        rows = {digest: (size, stored, base) for digest, size, stored, base in conn.execute(
+            "SELECT hash, size, LENGTH(data), base FROM history_blobs"
+        )}
+        conn.close()
+        assert sum(base is not None for _, _, base in rows.values()) == len(rows) - 1
+        for field in ["structure", "enhanced", "generated_prompt", "final_prompt"]:
+            size, stored, _ = rows[blob_hash(_staged_record(1)[field])]
+            assert size > 1500 and stored < 100, field
+
+        store.delete(record_id)
+        assert store.collect_garbage() == len(rows)
+        assert store.stats()["blobs"] == 0
+        store.close()
+
+def test_roll_up_frees_the_stages_kept_texts_were_based_on():
+    """Trimmed records keep readable texts, and the dropped stages become collectable"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        record_id = store.append(_staged_record(1))
+        assert store.roll_up(before=datetime(2030, 1, 1).timestamp()) == 1
+        assert store.collect_garbage() == 3  # analysis, structure and enhanced
+        assert store.get(record_id)["final_prompt"].endswith("**Final**")
+        assert store.get(record_id)["generated_prompt"].endswith("**Generated**")
+        store.close()
+
+def test_blobs_without_a_base_column_are_migrated():
+    """A schema 4 database gains the base column and keeps reading its blobs"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        store = SQLiteHistoryStore(path, compression="none")
+        record_id = store.append(_record(1, "HR", "Onboarding plan", "Welcome aboard"))
+        store.close()
+        conn = sqlite3.connect(path)
+        conn.execute("ALTER TABLE history_blobs DROP COLUMN base")
+        conn.execute("PRAGMA user_version = 4")
+        conn.commit()
+        conn.close()
+
+        store = SQLiteHistoryStore(path)
+        assert store.get(record_id)["final_prompt"] == "Welcome aboard"
+        staged_id = store.append(dict(_staged_record(2), original_request="Onboarding plan"))
+        assert store.get(staged_id)["analysis"] == _staged_record(2)["analysis"]
+        store.close()
+
+if __name__ == "__main__":
+    test_recent_by_department_with_keyset_pages()
+    test_keyset_pages_keep_records_saved_at_the_same_time()
+    test_keyword_search_ranks_and_filters()
+    test_upsert_and_delete_keep_search_in_sync()
+    test_import_history_log()
+    test_records_are_compressed_and_reported()
+    test_identical_texts_are_stored_once()
+    test_same_request_lookup()
+    test_deletes_release_blobs_for_garbage_collection()
+    test_fields_with_the_same_text_hold_one_reference()
+    test_stage_blobs_are_compressed_against_the_previous_stage()
+    test_roll_up_frees_the_stages_kept_texts_were_based_on()
+    test_blobs_without_a_base_column_are_migrated()
+    test_first_schema_is_migrated()
+    test_fts_query_quotes_words()
+    print("✅ History store tests passed")
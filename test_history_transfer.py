@@ -0,0 +1,126 @@
+"""
+Test bulk history transfer: schema validation, pooled import, resume and export round-trip
+"""
+
+import json
+import os
+import tempfile
+from utils.history_log import HistoryLog, legacy_record_id
+from utils.history_store import SQLiteHistoryStore
+from utils.history_transfer import HistoryImporter, export_history, validate_record
+
+def _write_archive(directory, count, invalid=0):
+    """Legacy-style pretty-printed files, plus some that fail validation"""
+    for i in range(count):
+        record = {
+            "user_input": f"Write a newsletter about topic {i}",
+            "generated_prompt": f"You are an editor. Write issue {i}.",
+            "department": "Content",
+            "status": "completed",
+            "saved_at": f"2025-07-{1 + i % 28:02d}T09:00:00"
+        }
+        with open(os.path.join(directory, f"prompt_history_{i:05d}.json"), "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+    for i in range(invalid):
+        with open(os.path.join(directory, f"broken_{i}.json"), "w", encoding="utf-8") as f:
+            f.write("{\"user_input\": " if i % 2 == 0 else json.dumps({"user_input": "no prompt"}))
+
+def test_validate_record():
+    """Records need a request and a prompt, with the known fields correctly typed"""
+    assert validate_record({"original_request": "a", "final_prompt": "b"}) == []
+    assert validate_record({"user_input": "a", "generated_prompt": "b", "saved_at": "2025-07-01T09:00:00"}) == []
+    assert validate_record([]) == ["record is not a JSON object"]
+    errors = validate_record({"original_request": " ", "final_prompt": "b", "total_questions": "3", "saved_at": "yesterday", "id": "r1"})
+    assert errors == [
+        "missing original_request/user_input",
+        "total_questions has type str",
+        "id is not a 32-character hex uuid",
+        "saved_at is not an ISO timestamp"
+    ]
+
+def test_import_with_pool_and_progress():
+    """Files are parsed on worker processes and written in batches, reporting progress"""
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = os.path.join(tmp, "archive")
+        os.makedirs(archive)
+        _write_archive(archive, 50, invalid=2)
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        reports = []
+        importer = HistoryImporter(store, workers=2, batch_size=20, on_progress=reports.append)
+        stats = importer.run(archive)
+
+        assert (stats["total"], stats["imported"], stats["invalid"]) == (52, 50, 2)
+        assert [report["imported"] for report in reports] == [20, 40, 50]
+        assert sorted(os.path.basename(path) for path, _ in importer.errors) == ["broken_0.json", "broken_1.json"]
+        record = store.get(legacy_record_id("prompt_history_00007.json"))
+        assert record["legacy_file"] == "prompt_history_00007.json" and record["saved_at"] == "2025-07-08T09:00:00"
+        assert store.count() == 50
+        store.close()
+
+def test_resume_skips_completed_files():
+    """A second run with the same progress file only imports what the first did not reach"""
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = os.path.join(tmp, "archive")
+        os.makedirs(archive)
+        _write_archive(archive, 30)
+        progress = os.path.join(tmp, "archive.import-progress")
+        with open(progress, "w", encoding="utf-8") as f:
+            f.writelines(f"prompt_history_{i:05d}.json\n" for i in range(20))
+
+        log = HistoryLog(os.path.join(tmp, "log"))
+        stats = HistoryImporter(log, workers=1, progress_path=progress).run(archive)
+        assert (stats["resumed"], stats["total"], stats["imported"]) == (20, 10, 10)
+        assert HistoryImporter(log, workers=1, progress_path=progress).run(archive)["total"] == 0
+        log.close()
+
+def test_jsonl_resumes_by_line_with_stable_ids():
+    """JSONL progress is kept by line, and records without an id get the same id on every run"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "export.jsonl")
+        with open(source, "w", encoding="utf-8") as f:
+            for i in range(5):
+                f.write(json.dumps({"user_input": f"request {i}", "generated_prompt": f"prompt {i}"}) + "\n")
+        progress = os.path.join(tmp, "export.jsonl.import-progress")
+
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        first = HistoryImporter(store, workers=1, batch_size=2, progress_path=progress).run(source)
+        assert first["imported"] == 5
+        with open(progress, "r", encoding="utf-8") as f:
+            assert f.read().split() == ["export.jsonl:2", "export.jsonl:4", "export.jsonl:5"]
+        assert {record["id"] for record in store.iter_records()} == {legacy_record_id(f"export.jsonl:{i}") for i in range(1, 6)}
+
+        with open(progress, "w", encoding="utf-8") as f:
+            f.write("export.jsonl:3\n")
+        again = HistoryImporter(store, workers=1, progress_path=progress).run(source)
+        assert (again["resumed"], again["imported"]) == (3, 2)
+        assert store.count() == 5
+        store.close()
+
+def test_export_round_trip():
+    """A JSONL export re-imports into the other backend unchanged"""
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = os.path.join(tmp, "archive")
+        os.makedirs(archive)
+        _write_archive(archive, 12)
+        log = HistoryLog(os.path.join(tmp, "log"))
+        HistoryImporter(log, workers=1).run(archive)
+
+        export = os.path.join(tmp, "export", "history.jsonl")
+        assert export_history(log, export) == 12
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        assert HistoryImporter(store, workers=1).run(export)["imported"] == 12
+        originals = {record["id"]: record for record in log.iter_records()}
+        assert {record["id"]: record for record in store.iter_records()} == originals
+
+        assert export_history(store, os.path.join(tmp, "files"), fmt="json") == 12
+        assert sorted(os.listdir(os.path.join(tmp, "files"))) == sorted(os.listdir(archive))
+        log.close()
+        store.close()
+
+if __name__ == "__main__":
+    test_validate_record()
+    test_import_with_pool_and_progress()
+    test_resume_skips_completed_files()
+    test_jsonl_resumes_by_line_with_stable_ids()
+    test_export_round_trip()
+    print("✅ History transfer tests passed")
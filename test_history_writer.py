@@ -0,0 +1,105 @@
+"""
+Test the write-behind history writer: batching, backpressure, retries and flush on close
+"""
+
+import os
+import tempfile
+import threading
+from utils.history_store import SQLiteHistoryStore
+from utils.history_writer import HistoryQueueFull, HistoryWriter
+
+class _GatedStore:
+    """Store whose writes wait for a gate and can fail a set number of times"""
+
+    def __init__(self, failures=0):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.failures = failures
+        self.batches = []
+        self.flushed = False
+
+    def append_many(self, records):
+        self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.batches.append([record["id"] for record in records])
+        return self.batches[-1]
+
+    def flush(self):
+        self.flushed = True
+
+def test_records_are_written_in_batches():
+    """Submits return ids at once; the background thread writes them in a few transactions"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        writer = HistoryWriter(store, batch_size=50, linger=0.05)
+        ids = [writer.submit({"original_request": f"request {i}", "final_prompt": "p"}) for i in range(120)]
+
+        assert writer.flush(timeout=10)
+        assert store.count() == 120
+        assert store.get(ids[7])["original_request"] == "request 7"
+        stats = writer.stats()
+        assert stats["written"] == 120 and stats["queued"] == 0
+        assert 3 <= stats["batches"] < 120
+        writer.close()
+        store.close()
+
+def test_full_queue_is_refused_not_waited_on():
+    """When the store is stuck the queue fills and submit raises instead of blocking"""
+    store = _GatedStore()
+    store.gate.clear()
+    writer = HistoryWriter(store, max_queue=2, batch_size=1, linger=0)
+    writer.submit({"n": 0})
+    assert writer.flush(timeout=0.1) is False
+    writer.submit({"n": 1})
+    writer.submit({"n": 2})
+    try:
+        writer.submit({"n": 3})
+        raise AssertionError("expected HistoryQueueFull")
+    except HistoryQueueFull:
+        pass
+
+    stats = writer.stats()
+    assert stats["rejected"] == 1 and stats["queued"] == 3 and stats["max_queue_depth"] == 3
+    store.gate.set()
+    assert writer.flush(timeout=10)
+    assert writer.stats()["written"] == 3
+    writer.close()
+
+def test_failed_batches_are_retried_then_reported():
+    """Transient errors are retried; a batch that keeps failing is counted, not lost silently"""
+    store = _GatedStore(failures=2)
+    writer = HistoryWriter(store, retries=2, retry_backoff=0.01)
+    writer.submit({"n": 1})
+    assert writer.flush(timeout=10)
+    assert writer.stats()["written"] == 1 and writer.stats()["retries"] == 2
+
+    store.failures = 10
+    writer.submit({"n": 2})
+    assert writer.flush(timeout=10)
+    stats = writer.stats()
+    assert stats["failed"] == 1 and stats["last_error"] == "disk full"
+    writer.close()
+
+def test_close_drains_the_queue():
+    """Shutdown writes everything still queued and flushes the store"""
+    store = _GatedStore()
+    writer = HistoryWriter(store, batch_size=10, linger=1.0)
+    ids = [writer.submit({"n": i}) for i in range(25)]
+    writer.close()
+
+    assert [record_id for batch in store.batches for record_id in batch] == ids
+    assert store.flushed
+    try:
+        writer.submit({"n": 99})
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_records_are_written_in_batches()
+    test_full_queue_is_refused_not_waited_on()
+    test_failed_batches_are_retried_then_reported()
+    test_close_drains_the_queue()
+    print("✅ History writer tests passed")
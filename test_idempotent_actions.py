@@ -0,0 +1,78 @@
+"""
+Test idempotent workflow actions that stop duplicate Gemini calls on double submits
+"""
+
+import threading
+import time
+import pytest
+from utils.idempotency import IdempotentActions, action_key
+
+def test_action_key_is_stable_and_input_sensitive():
+    """Keys depend on session, state, action and input, not on dict ordering"""
+    first = action_key("s1", "awaiting_answers", "continue", {"answers": {"q1": "a", "q2": "b"}})
+    same = action_key("s1", "awaiting_answers", "continue", {"answers": {"q2": "b", "q1": "a"}})
+    assert first == same
+    assert first != action_key("s2", "awaiting_answers", "continue", {"answers": {"q1": "a", "q2": "b"}})
+    assert first != action_key("s1", "complete", "continue", {"answers": {"q1": "a", "q2": "b"}})
+    assert first != action_key("s1", "awaiting_answers", "continue", {"answers": {"q1": "a"}})
+
+def test_concurrent_duplicates_join_in_flight_run():
+    """A double click while the first run is in flight shares its result"""
+    actions = IdempotentActions()
+    calls = []
+    started = threading.Event()
+
+    def slow_action():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {"workflow_state": "complete"}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(actions.run("key", slow_action)))
+    first.start()
+    started.wait(1)
+    results.append(actions.run("key", slow_action))
+    first.join()
+
+    assert len(calls) == 1
+    assert results == [{"workflow_state": "complete"}] * 2
+    assert actions.stats()["joined"] == 1
+
+def test_finished_results_replay_until_ttl():
+    """Reruns shortly after completion get the stored result; later ones run again"""
+    actions = IdempotentActions(ttl=0.05)
+    calls = []
+
+    def action():
+        calls.append(1)
+        return len(calls)
+
+    assert actions.run("key", action) == 1
+    assert actions.run("key", action) == 1
+    time.sleep(0.06)
+    assert actions.run("key", action) == 2
+    assert actions.stats()["replayed"] == 1
+
+def test_failures_are_not_cached():
+    """A failed action is retried on the next submit"""
+    actions = IdempotentActions()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("timeout")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        actions.run("key", flaky)
+    assert actions.run("key", flaky) == "ok"
+    assert actions.stats()["failed"] == 1
+
+if __name__ == "__main__":
+    test_action_key_is_stable_and_input_sensitive()
+    test_concurrent_duplicates_join_in_flight_run()
+    test_finished_results_replay_until_ttl()
+    test_failures_are_not_cached()
+    print("✅ Idempotent action tests passed")
@@ -0,0 +1,52 @@
+"""
+Test the load harness: injected mock errors, prompt-dependent responses and per-step reports
+"""
+
+from benchmarks.load_test import (
+    DIRECT_REQUEST, FIRST_ANSWERS, LOAD_RESPONSES, MENTOR_QUESTION, SECOND_ANSWERS, run_load_test
+)
+from benchmarks.mock_gemini import MockGeminiServer
+
+def test_mock_injects_errors():
+    """error_rate 1 fails every call with error_status; 0 fails none"""
+    with MockGeminiServer(error_rate=1.0, error_status=429) as server:
+        agents = server.agents()
+        assert agents._call_gemini_api("Hello", "AI Mentor") == "Error: API returned status 429"
+        assert server.stats()["errors"] == 1
+    with MockGeminiServer() as server:
+        assert server.agents()._call_gemini_api("Hello", "AI Mentor") != ""
+        assert server.stats()["errors"] == 0
+    try:
+        MockGeminiServer(error_rate=1.5)
+        assert False, "invalid error rate accepted"
+    except ValueError:
+        pass
+
+def test_load_responses_complete_both_paths():
+    """Prompt-dependent responses walk the prompt path to a final prompt and route mentor questions to chat"""
+    with MockGeminiServer(responses=LOAD_RESPONSES) as server:
+        agents = server.agents()
+        assert agents.process_interactive_workflow(MENTOR_QUESTION)["workflow_state"] == "chat_mode"
+        assert agents.process_interactive_workflow(DIRECT_REQUEST)["workflow_state"] == "awaiting_answers"
+        assert agents.continue_workflow(DIRECT_REQUEST, "Content", FIRST_ANSWERS)["workflow_state"] == "awaiting_answers"
+        assert agents.continue_workflow(DIRECT_REQUEST, "Content", SECOND_ANSWERS)["workflow_state"] == "complete"
+
+def test_load_steps_report_throughput_threads_and_memory():
+    """Each concurrency step reports throughput, percentiles, threads, memory and LLM errors"""
+    results = run_load_test([1, 3], duration=0.5, latency="fixed:5", error_rate=0.2, mentor_share=0.5, seed=4)
+    assert [step["users"] for step in results["steps"]] == [1, 3]
+    for step in results["steps"]:
+        assert step["actions"] > 0 and step["sessions"] > 0 and step["actions_per_second"] > 0
+        assert step["latency"]["p50_ms"] <= step["latency"]["p95_ms"] <= step["latency"]["p99_ms"]
+        assert step["threads_peak"] >= step["users"] + 1
+        assert step["rss_mb_peak"] is None or step["rss_mb_peak"] > 0
+        assert step["llm_calls"] >= step["actions"]
+        assert sum(by_action["runs"] for by_action in step["latency_by_action"].values()) == step["actions"]
+    assert sum(step["llm_errors"] for step in results["steps"]) > 0
+    assert results["meta"]["error_rate"] == 0.2
+
+if __name__ == "__main__":
+    test_mock_injects_errors()
+    test_load_responses_complete_both_paths()
+    test_load_steps_report_throughput_threads_and_memory()
+    print("✅ Load test harness tests passed")
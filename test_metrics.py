@@ -0,0 +1,96 @@
+"""
+Test service metrics: Prometheus text rendering, callback gauges, agent instrumentation and the HTTP endpoint
+"""
+
+import requests
+from benchmarks.mock_gemini import MockGeminiServer
+from utils.metrics import (
+    GEMINI_CALLS, GEMINI_LATENCY, PARSE_FALLBACKS, MetricsRegistry, MetricsServer, RecentSessions
+)
+
+def test_counter_and_histogram_text_format():
+    """Counters and histograms render as Prometheus text with cumulative buckets"""
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ["method", "outcome"])
+    latency = registry.histogram("latency_seconds", "Latency", ["method"], buckets=[0.1, 1])
+    calls.inc(method="detect", outcome="ok")
+    calls.inc(2, method='say "hi"\n', outcome="ok")
+    for value in [0.05, 0.5, 3]:
+        latency.observe(value, method="detect")
+
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text and "# TYPE latency_seconds histogram" in text
+    assert 'calls_total{method="detect",outcome="ok"} 1\n' in text
+    assert 'calls_total{method="say \\"hi\\"\\n",outcome="ok"} 2\n' in text
+    assert 'latency_seconds_bucket{method="detect",le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{method="detect",le="1"} 2\n' in text
+    assert 'latency_seconds_bucket{method="detect",le="+Inf"} 3\n' in text
+    assert 'latency_seconds_sum{method="detect"} 3.55\n' in text
+    assert 'latency_seconds_count{method="detect"} 3\n' in text
+    try:
+        calls.inc(method="detect")
+        assert False, "missing label accepted"
+    except ValueError:
+        pass
+
+def test_callback_gauges_and_active_sessions():
+    """Gauges are read at scrape time; sessions stop counting after the window"""
+    now = [0.0]
+    sessions = RecentSessions(window=60, clock=lambda: now[0])
+    registry = MetricsRegistry()
+    registry.callback("active_sessions", "Active sessions", sessions.count)
+    registry.callback("queue_depth", "Queue depth", lambda: {"workflow": 2, "chat": 0}, ["kind"])
+    registry.callback("broken", "Fails to read", lambda: 1 / 0)
+
+    sessions.touch("a")
+    now[0] = 30
+    sessions.touch("b")
+    assert "active_sessions 2\n" in registry.render()
+    now[0] = 75
+    text = registry.render()
+    assert "active_sessions 1\n" in text
+    assert 'queue_depth{kind="chat"} 0\nqueue_depth{kind="workflow"} 2\n' in text
+    assert "broken" not in text
+
+def test_agents_count_calls_and_parse_fallbacks():
+    """Gemini calls are counted by calling method and outcome; unparseable replies count as fallbacks"""
+    with MockGeminiServer(responses={"Department Detection Specialist": "Content, probably"}) as server:
+        agents = server.agents()
+        ok = GEMINI_CALLS.value(method="detect_department", outcome="ok")
+        fallbacks = PARSE_FALLBACKS.value(method="detect_department", reason="no_json")
+        timed = GEMINI_LATENCY.count(method="detect_department")
+        assert agents.detect_department("Plan our launch blog posts")["confidence"] == "low"
+        assert GEMINI_CALLS.value(method="detect_department", outcome="ok") == ok + 1
+        assert PARSE_FALLBACKS.value(method="detect_department", reason="no_json") == fallbacks + 1
+        assert GEMINI_LATENCY.count(method="detect_department") == timed + 1
+
+        server.responses["Input Intent Analyzer"] = "{not json}"
+        invalid = PARSE_FALLBACKS.value(method="analyze_input_intent", reason="invalid_json")
+        assert agents.analyze_input_intent("Plan our launch")["intent_type"] == "direct_request"
+        assert PARSE_FALLBACKS.value(method="analyze_input_intent", reason="invalid_json") == invalid + 1
+
+        agents.base_url = server.url.replace(":generateContent", ":missing")
+        errors = GEMINI_CALLS.value(method="generate_final_prompt", outcome="http_error")
+        assert agents.generate_final_prompt("Plan", "Content", {"q1": "a"}).startswith("Error: API returned status 404")
+        assert GEMINI_CALLS.value(method="generate_final_prompt", outcome="http_error") == errors + 1
+
+def test_metrics_endpoint():
+    """The side server answers /metrics in the Prometheus content type"""
+    registry = MetricsRegistry()
+    registry.counter("hits_total", "Hits").inc()
+    server = MetricsServer(registry, "127.0.0.1", 0).start()
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.port}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert "hits_total 1\n" in response.text
+        assert requests.get(f"http://127.0.0.1:{server.port}/", timeout=5).status_code == 404
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    test_counter_and_histogram_text_format()
+    test_callback_gauges_and_active_sessions()
+    test_agents_count_calls_and_parse_fallbacks()
+    test_metrics_endpoint()
+    print("✅ Metrics tests passed")
@@ -0,0 +1,45 @@
+"""
+Test the microbenchmark suite: cases cover every helper, timings are per call, and comparisons ignore noise
+"""
+
+import json
+import pytest
+from agents.gemini_agents import extract_json_object
+from benchmarks.micro_bench import build_cases, compare, load_sample, run_micro_bench, time_case
+
+def test_cases_cover_the_hot_paths():
+    """Each helper has cases sized from the history sample, and every case runs"""
+    cases = build_cases(load_sample())
+    prefixes = {name.split("/")[0] for name in cases}
+    assert prefixes == {"clean_prompt_text", "extract_json", "conversation_context", "questions_prompt", "final_prompt", "format_prompt_output"}
+    assert max(size for _, size in cases.values()) > 19000
+    for name, (fn, _) in cases.items():
+        assert fn() is not None, name
+
+def test_extract_json_object():
+    """The outermost brace span is parsed; no braces gives None and a broken span raises"""
+    assert extract_json_object('Sure!\n```json\n{"a": {"b": 1}}\n```') == {"a": {"b": 1}}
+    assert extract_json_object("no json here") is None
+    with pytest.raises(json.JSONDecodeError):
+        extract_json_object("{not json}")
+
+def test_timing_and_comparison():
+    """Timings are per call with a round count; only changes beyond the noise are significant"""
+    timing = time_case(lambda: sum(range(100)), repeat=3, min_time=0.01)
+    assert timing["number"] >= 1 and timing["repeat"] == 3
+    assert 0 < timing["min_us"] <= timing["median_us"]
+    results = run_micro_bench(repeat=3, min_time=0.01, only=["extract_json"])
+    assert set(results["cases"]) == {"extract_json/intent", "extract_json/questions", "extract_json/large"}
+
+    old = {"cases": {"a": {"median_us": 100.0, "cv_pct": 1.0}, "b": {"median_us": 100.0, "cv_pct": 10.0}}}
+    new = {"cases": {"a": {"median_us": 80.0, "cv_pct": 1.0}, "b": {"median_us": 85.0, "cv_pct": 1.0}, "c": {"median_us": 5.0}}}
+    rows = {row["case"]: row for row in compare(old, new)}
+    assert rows["a"]["significant"] and rows["a"]["change_pct"] == -20.0
+    assert not rows["b"]["significant"]
+    assert rows["c"]["before_us"] is None
+
+if __name__ == "__main__":
+    test_cases_cover_the_hot_paths()
+    test_extract_json_object()
+    test_timing_and_comparison()
+    print("✅ Microbenchmark tests passed")
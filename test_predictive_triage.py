@@ -0,0 +1,119 @@
+"""
+Test debounced predictive pre-triage of the initial request
+"""
+
+import threading
+import time
+from agents.gemini_agents import GeminiPromptGeneratorAgents
+from benchmarks.mock_gemini import MockGeminiServer
+from benchmarks.workflow_bench import DIRECT_REQUEST
+from utils.pretriage import PredictiveTriage
+
+def test_debounce_runs_only_latest_text():
+    """Only the text left idle for the delay is triaged"""
+    calls = []
+
+    def triage(text, owner):
+        calls.append(text)
+        return {"workflow_state": "awaiting_answers", "original_request": text}
+
+    pre_triage = PredictiveTriage(triage, delay=0.05)
+    pre_triage.schedule("I want to create", owner="s1")
+    pre_triage.schedule("I want to create a campaign", owner="s1")
+    pre_triage.schedule("I want to create a campaign for our launch", owner="s1")
+    time.sleep(0.2)
+
+    assert calls == ["I want to create a campaign for our launch"]
+    result = pre_triage.get("I want to create a campaign   for our launch")
+    assert result["original_request"] == "I want to create a campaign for our launch"
+    assert pre_triage.get("something else entirely") is None
+    assert pre_triage.stats()["hits"] == 1
+    pre_triage.shutdown()
+
+def test_get_joins_in_flight_triage():
+    """Clicking while the triage is still running waits for it instead of starting again"""
+    release = threading.Event()
+    calls = []
+
+    def triage(text, owner):
+        calls.append(text)
+        release.wait(1)
+        return {"workflow_state": "chat_mode"}
+
+    pre_triage = PredictiveTriage(triage, delay=0.01)
+    pre_triage.schedule("How do I write a good prompt?")
+    time.sleep(0.05)
+    assert pre_triage.status("How do I write a good prompt?") == "running"
+
+    # A bounded wait gives up without dropping the run
+    assert pre_triage.get("How do I write a good prompt?", timeout=0.01) is None
+    assert pre_triage.status("How do I write a good prompt?") == "running"
+
+    threading.Timer(0.05, release.set).start()
+    assert pre_triage.get("How do I write a good prompt?")["workflow_state"] == "chat_mode"
+    assert len(calls) == 1
+    pre_triage.shutdown()
+
+def test_cancel_and_failed_triage():
+    """Cancelled timers never run and failed triages are not served"""
+    def triage(text, owner):
+        raise RuntimeError("network down")
+
+    pre_triage = PredictiveTriage(triage, delay=0.05)
+    pre_triage.schedule("first draft", owner="s1")
+    pre_triage.cancel("s1")
+    time.sleep(0.1)
+    assert pre_triage.stats()["started"] == 0
+
+    pre_triage.schedule("second draft request", owner="s1")
+    time.sleep(0.1)
+    assert pre_triage.get("second draft request") is None
+    assert pre_triage.stats()["failures"] == 1
+    pre_triage.shutdown()
+
+def test_start_and_flush_skip_the_idle_timer():
+    """A pause seen in the browser starts triage at once, and Start promotes a pending timer"""
+    calls = []
+
+    def triage(text, owner):
+        calls.append(text)
+        return {"text": text}
+
+    pre_triage = PredictiveTriage(triage, delay=60)
+    pre_triage.start("Plan our product launch campaign", owner="s1")
+    assert pre_triage.get("Plan our product launch campaign", timeout=1) == {"text": "Plan our product launch campaign"}
+
+    pre_triage.schedule("Write onboarding emails for new hires", owner="s1")
+    pre_triage.flush("s1")
+    assert pre_triage.get("Write onboarding emails for new hires", timeout=1) is not None
+    assert calls == ["Plan our product launch campaign", "Write onboarding emails for new hires"]
+    assert pre_triage.stats()["pending"] == 0
+    pre_triage.flush("s1")
+    pre_triage.shutdown()
+
+def test_prefetched_start_makes_only_the_questions_call():
+    """The intent and department calls made ahead of time are not repeated by Start"""
+    with MockGeminiServer() as server:
+        agents = server.agents()
+        prefetched = agents.prefetch_triage(DIRECT_REQUEST)
+        assert prefetched["department_info"]["department"]
+        server.reset()
+        result = agents.process_interactive_workflow(DIRECT_REQUEST, prefetched=prefetched)
+        assert result["workflow_state"] == "awaiting_answers"
+        assert server.stats()["calls"] == 1
+        assert result["department_detected"] == prefetched["department_info"]
+
+def test_local_triage_needs_no_api_call():
+    """Very short or help-only requests are answered locally"""
+    assert GeminiPromptGeneratorAgents.local_triage("help")["workflow_state"] == "help_needed"
+    assert GeminiPromptGeneratorAgents.local_triage("a blog")["workflow_state"] == "need_more_info"
+    assert GeminiPromptGeneratorAgents.local_triage("I want to create a social media campaign") is None
+
+if __name__ == "__main__":
+    test_debounce_runs_only_latest_text()
+    test_get_joins_in_flight_triage()
+    test_cancel_and_failed_triage()
+    test_start_and_flush_skip_the_idle_timer()
+    test_prefetched_start_makes_only_the_questions_call()
+    test_local_triage_needs_no_api_call()
+    print("✅ Predictive triage tests passed")
@@ -0,0 +1,101 @@
+"""
+Test on-demand profiling: per-session switches, network/Python time split and saved reports
+"""
+
+import os
+import pstats
+import tempfile
+import tracemalloc
+from benchmarks.mock_gemini import MockGeminiServer
+from benchmarks.workflow_bench import DIRECT_REQUEST
+from utils.profiling import ProfiledRun, ProfileStore
+
+def test_sessions_switch_on_by_prefix():
+    """A session is profiled when its id starts with an enabled prefix"""
+    store = ProfileStore(tempfile.mkdtemp())
+    store.enable(" 3f2a9c1d ")
+    assert store.is_enabled("3f2a9c1d0000aaaa")
+    assert not store.is_enabled("ffff0000")
+    store.disable("3f2a9c1d")
+    assert not store.is_enabled("3f2a9c1d0000aaaa") and store.enabled_sessions() == []
+
+def test_run_splits_network_wait_from_python_work():
+    """Gemini wait is reported apart from Python time, with top functions and allocations"""
+    assert not tracemalloc.is_tracing()
+    with MockGeminiServer(latency="fixed:40") as server:
+        agents = server.agents()
+        with ProfiledRun("3f2a9c1d0000aaaa", "start") as run:
+            result = agents.process_interactive_workflow(DIRECT_REQUEST)
+    assert not tracemalloc.is_tracing()
+    assert result["workflow_state"] == "awaiting_answers"
+
+    report = run.report
+    assert report["gemini_calls"] == 3 and report["outcome"] == "ok"
+    assert report["network_ms"] >= 120
+    assert abs(report["wall_ms"] - report["network_ms"] - report["python_ms"]) < 0.2
+    assert report["python_ms"] < report["network_ms"]
+    assert any(row["function"] == "process_interactive_workflow" for row in report["top_functions"])
+    assert report["top_allocations"] and report["peak_traced_kb"] > 0
+    assert "process_interactive_workflow" in run.pstats_text()
+
+def test_tracing_started_elsewhere_is_left_running():
+    """A run never stops tracemalloc when it was already tracing before the run"""
+    tracemalloc.start()
+    try:
+        with ProfiledRun("3f2a9c1d0000aaaa", "start"):
+            sorted(str(i) for i in range(2000))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    with ProfiledRun("3f2a9c1d0000aaaa", "start"):
+        pass
+    assert not tracemalloc.is_tracing()
+
+def test_overlapping_runs_share_the_peak_without_resetting_it():
+    """A run starting inside another does not cut the outer run's peak; both are flagged"""
+    with ProfiledRun("3f2a9c1d0000aaaa", "start") as outer:
+        block = bytearray(4 << 20)
+        del block
+        with ProfiledRun("ffff00000000bbbb", "start") as inner:
+            pass
+    assert outer.report["peak_traced_kb"] >= 4096
+    assert outer.report["peak_shared"] and inner.report["peak_shared"]
+    assert not tracemalloc.is_tracing()
+    with ProfiledRun("3f2a9c1d0000aaaa", "start") as alone:
+        pass
+    assert alone.report["peak_shared"] is False
+
+def test_store_saves_and_prunes_reports():
+    """Each run is saved as a JSON report plus raw cProfile data; old runs are dropped"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = ProfileStore(directory, max_reports=2)
+        ids = []
+        for action in ["start", "continue", "mentor/complete"]:
+            with store.run("3f2a9c1d0000aaaa", action) as run:
+                sorted(str(i) for i in range(20000))
+            ids.append(run.report_id)
+        try:
+            with store.run("3f2a9c1d0000aaaa", "failing"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+
+        summaries = store.reports()
+        assert len(summaries) == 2 and len(os.listdir(directory)) == 4
+        assert summaries[0]["outcome"] == "RuntimeError" and summaries[1]["id"] == ids[2]
+        assert ids[2].endswith("-3f2a9c1d-mentor_complete")
+        assert "top_functions" not in summaries[0]
+        assert store.read(ids[0]) is None
+        path = os.path.join(directory, "raw.pstats")
+        with open(path, "wb") as f:
+            f.write(store.pstats_bytes(ids[2]))
+        assert pstats.Stats(path).total_calls > 0
+        assert store.read("../secrets") is None and store.pstats_bytes("../secrets") is None
+
+if __name__ == "__main__":
+    test_sessions_switch_on_by_prefix()
+    test_run_splits_network_wait_from_python_work()
+    test_tracing_started_elsewhere_is_left_running()
+    test_overlapping_runs_share_the_peak_without_resetting_it()
+    test_store_saves_and_prunes_reports()
+    print("✅ Profiling tests passed")
@@ -0,0 +1,107 @@
+"""
+Test semantic prompt reuse: hashed n-gram similarity, department scoping and serving or seeding saved prompts
+"""
+
+import os
+import tempfile
+import numpy as np
+from agents.gemini_agents import GeminiPromptGeneratorAgents
+from utils.history_store import SQLiteHistoryStore
+from utils.prompt_reuse import PromptReuseIndex, embed, find_reusable_prompt
+
+LAUNCH = "Marketing campaign for our new product launch"
+
+def _record(record_id, request, department, prompt="Saved prompt", answers=None):
+    return {
+        "id": record_id,
+        "original_request": request,
+        "department": department,
+        "final_prompt": prompt,
+        "user_answers": answers or {}
+    }
+
+def test_embedding_is_deterministic_and_normalized():
+    """Vectors do not depend on the process (no randomized hashing) and have unit length"""
+    vector = embed(LAUNCH)
+    assert np.allclose(vector, embed(LAUNCH.upper() + "!"))
+    assert abs(np.linalg.norm(vector) - 1.0) < 1e-5
+    assert not embed("   ").any()
+
+def test_near_duplicates_rank_above_unrelated_requests():
+    """Rephrased requests score high; a different task scores low"""
+    index = PromptReuseIndex()
+    index.add(_record("launch", LAUNCH, "Digital Marketing", answers={"q1": "young professionals"}))
+    index.add(_record("pipeline", "Data engineering portfolio project for a fresher", "AI Engineering"))
+    index.add(_record("no-prompt", LAUNCH, "Digital Marketing", prompt=""))
+    assert len(index) == 2
+
+    matches = index.search("Marketing campaign for the launch of our new product", {"q1": "young professionals"})
+    assert matches[0]["id"] == "launch" and matches[0]["score"] > 0.8
+    assert matches[1]["score"] < 0.4
+    assert index.search(LAUNCH, threshold=0.99, answers={"q1": "young professionals"})[0]["id"] == "launch"
+
+def test_department_scope_and_replacement_by_id():
+    """Scoped lookups ignore other departments; re-adding an id updates its row"""
+    index = PromptReuseIndex()
+    index.add(_record("a", LAUNCH, "Digital Marketing"))
+    assert index.search(LAUNCH, department="Content") == []
+    assert index.search(LAUNCH, department="Digital Marketing")[0]["id"] == "a"
+
+    index.add(_record("a", "Quarterly sales report", "Sales"))
+    assert len(index) == 1
+    assert index.search(LAUNCH, department="Sales", threshold=0.8) == []
+    for i in range(100):
+        index.add(_record(f"r{i}", f"Request number {i}", "Sales"))
+    assert index.search("Request number 42")[0]["id"] == "r42"
+
+def test_find_reusable_prompt_serves_or_seeds():
+    """Close matches are served as-is, looser ones only seed generation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteHistoryStore(os.path.join(tmp, "history.db"))
+        record_id = store.append(_record(None, LAUNCH, "Digital Marketing", prompt="You are a launch strategist"))
+        index = PromptReuseIndex()
+        index.add_many(store.iter_records())
+
+        served = find_reusable_prompt(index, store, LAUNCH, "Digital Marketing")
+        assert served["id"] == record_id and served["mode"] == "serve"
+        assert served["final_prompt"] == "You are a launch strategist"
+
+        seeded = find_reusable_prompt(index, store, "Marketing campaign for a new app launch", None, seed_threshold=0.5)
+        assert seeded["mode"] == "seed"
+        assert find_reusable_prompt(index, store, "Write unit tests for a parser", None) is None
+        store.close()
+
+class _OfflineAgents(GeminiPromptGeneratorAgents):
+    """Agents whose Gemini-backed steps are replaced by recorded calls"""
+
+    def __init__(self):
+        self.final_prompt_calls = []
+
+    def generate_interactive_questions(self, user_request, department, user_answers=None):
+        return {"is_complete": True}
+
+    def generate_final_prompt(self, user_request, department, all_answers, seed_prompt=None):
+        self.final_prompt_calls.append(seed_prompt)
+        return "fresh prompt"
+
+def test_workflow_uses_reuse_lookup_before_generating():
+    """A served match skips generation; a seed match is passed to the generator"""
+    agents = _OfflineAgents()
+    served = agents.continue_workflow(LAUNCH, "Digital Marketing", {"q1": "a"},
+                                      lambda *args: {"mode": "serve", "final_prompt": "saved", "score": 0.95})
+    assert served["final_prompt"] == "saved" and served["reused"] == {"mode": "serve", "score": 0.95}
+    assert agents.final_prompt_calls == []
+
+    seeded = agents.continue_workflow(LAUNCH, "Digital Marketing", {"q1": "a"},
+                                      lambda *args: {"mode": "seed", "final_prompt": "saved", "score": 0.75})
+    assert seeded["final_prompt"] == "fresh prompt"
+    assert agents.final_prompt_calls == ["saved"]
+    assert agents.continue_workflow(LAUNCH, "Digital Marketing", {"q1": "a"})["reused"] is None
+
+if __name__ == "__main__":
+    test_embedding_is_deterministic_and_normalized()
+    test_near_duplicates_rank_above_unrelated_requests()
+    test_department_scope_and_replacement_by_id()
+    test_find_reusable_prompt_serves_or_seeds()
+    test_workflow_uses_reuse_lookup_before_generating()
+    print("✅ Prompt reuse tests passed")
@@ -0,0 +1,54 @@
+"""
+Test the regression gate: deterministic per-stage measurements, threshold checks and the committed baseline
+"""
+
+import json
+import os
+import tempfile
+from benchmarks.regression_gate import DEFAULT_BASELINE, compare, main, measure
+
+def test_measurements_are_deterministic():
+    """Prompt characters, tokens and calls repeat exactly; every stage is covered"""
+    first, second = measure(repeats=1), measure(repeats=1)
+    assert set(first["stages"]) == {"intent", "department", "questions", "final_prompt"}
+    for stage, values in first["stages"].items():
+        for metric in ("prompt_chars", "prompt_tokens", "output_tokens", "calls"):
+            assert values[metric] == second["stages"][stage][metric], (stage, metric)
+        assert values["prompt_chars"] // 4 - values["calls"] <= values["prompt_tokens"] <= values["prompt_chars"] // 4
+    assert first["inputs"]["mentor_question"].keys() == {"intent"}
+
+def test_thresholds():
+    """Growth past a threshold is a regression; small CPU changes and shrinking prompts are not"""
+    stage = {"prompt_chars": 1000, "prompt_tokens": 250, "output_tokens": 50, "calls": 1, "cpu_ms": 2.0}
+    baseline = {"stages": {"questions": stage, "intent": stage}}
+    current = {"stages": {
+        "questions": dict(stage, prompt_chars=1100, prompt_tokens=275, cpu_ms=6.0),
+        "intent": dict(stage, prompt_chars=900, calls=2),
+        "final_prompt": stage
+    }}
+    findings = {(f["stage"], f["metric"]): f["regression"] for f in compare(baseline, current)}
+    assert findings[("questions", "prompt_chars")] and findings[("questions", "prompt_tokens")]
+    assert not findings[("questions", "cpu_ms")]
+    assert not findings[("intent", "prompt_chars")] and findings[("intent", "calls")]
+    assert findings[("final_prompt", "stage")]
+    relaxed = compare(baseline, current, {"prompt_chars_pct": 20, "prompt_tokens_pct": 20, "calls": 1})
+    assert [f["stage"] for f in relaxed if f["regression"]] == ["final_prompt"]
+
+def test_gate_exit_codes():
+    """The committed baseline passes; a baseline from smaller prompts fails the check"""
+    assert main(["check", "--repeats", "1", "--cpu-floor-ms", "1000"]) == 0
+    with open(DEFAULT_BASELINE, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    baseline["stages"]["questions"]["prompt_chars"] = int(baseline["stages"]["questions"]["prompt_chars"] * 0.8)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "baseline.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f)
+        assert main(["check", "--baseline", path, "--repeats", "1", "--cpu-floor-ms", "1000"]) == 1
+        assert main(["check", "--baseline", os.path.join(directory, "missing.json"), "--repeats", "1"]) == 2
+
+if __name__ == "__main__":
+    test_measurements_are_deterministic()
+    test_thresholds()
+    test_gate_exit_codes()
+    print("✅ Regression gate tests passed")
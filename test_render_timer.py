@@ -0,0 +1,37 @@
+"""
+Test render timing helpers used to measure script and fragment reruns
+"""
+
+import time
+from utils.perf import RenderTimer
+
+def test_section_records_samples():
+    """Each timed section keeps its own samples in the backing store"""
+    store = {}
+    timer = RenderTimer(store)
+
+    with timer.section("question_form"):
+        time.sleep(0.002)
+    timer.record("script", 12.5)
+
+    summary = timer.summary()
+    assert summary["question_form"]["runs"] == 1
+    assert summary["question_form"]["last_ms"] >= 2
+    assert summary["script"]["avg_ms"] == 12.5
+    assert "render_timings" in store
+
+def test_samples_are_bounded():
+    """Old samples are dropped once max_samples is reached"""
+    timer = RenderTimer({}, max_samples=5)
+    for i in range(20):
+        timer.record("chat_panel", float(i))
+
+    stats = timer.summary()["chat_panel"]
+    assert stats["runs"] == 5
+    assert stats["last_ms"] == 19.0
+    assert stats["p95_ms"] == 19.0
+
+if __name__ == "__main__":
+    test_section_records_samples()
+    test_samples_are_bounded()
+    print("✅ Render timer tests passed")
@@ -0,0 +1,88 @@
+"""
+Test disk-backed session persistence used to resume workflows after a reload
+"""
+
+import os
+import sqlite3
+import tempfile
+from utils.session_store import MemorySessionStore, SessionStore, SQLiteSessionStore, open_session_store
+
+SNAPSHOT = {
+    "workflow_state": "awaiting_answers",
+    "department_detected": {"department": "AI Engineering", "confidence": "high"},
+    "current_questions": {"questions": [{"id": "q1", "question": "Timeline?"}]},
+    "user_answers": {"q1": "3 months"},
+    "chat_messages": [{"role": "user", "content": "hi", "timestamp": "now"}]
+}
+
+def test_sqlite_store_survives_restart():
+    """A new store instance (server restart) resumes the saved snapshot"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        store = SQLiteSessionStore(path, flush_interval=60)
+        store.save("token1", SNAPSHOT)
+        # Buffered writes are visible before they reach disk
+        assert store.load("token1")["user_answers"] == {"q1": "3 months"}
+        store.close()
+
+        restarted = SQLiteSessionStore(path, flush_interval=60)
+        assert restarted.load("token1") == SNAPSHOT
+        assert restarted.load("token1", keys=["workflow_state"]) == {"workflow_state": "awaiting_answers"}
+        assert restarted.load("missing") == {}
+        restarted.close()
+
+def test_sqlite_store_batches_and_skips_unchanged_keys():
+    """Repeated saves collapse into one write and unchanged keys are not rewritten"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        store = SQLiteSessionStore(path, flush_interval=60)
+        for index in range(10):
+            store.save("token1", dict(SNAPSHOT, progress=index))
+        store.flush()
+
+        conn = sqlite3.connect(path)
+        stamps = dict(conn.execute("SELECT key, updated_at FROM session_state WHERE token = 'token1'").fetchall())
+        assert len(stamps) == len(SNAPSHOT) + 1
+
+        snapshot = dict(SNAPSHOT, progress=9)
+        snapshot["chat_messages"] = SNAPSHOT["chat_messages"] + [{"role": "assistant", "content": "hello"}]
+        del snapshot["user_answers"]
+        store.save("token1", snapshot)
+        store.flush()
+
+        after = dict(conn.execute("SELECT key, updated_at FROM session_state WHERE token = 'token1'").fetchall())
+        assert "user_answers" not in after
+        assert after["department_detected"] == stamps["department_detected"]
+        assert after["chat_messages"] > stamps["chat_messages"]
+        conn.close()
+        store.close()
+
+def test_store_factory_and_memory_store():
+    """The configured backend is pluggable"""
+    assert open_session_store("none") is None
+    store = open_session_store("memory")
+    assert isinstance(store, MemorySessionStore)
+    store.save("token1", SNAPSHOT)
+    assert store.load("token1", keys=["chat_messages"]) == {"chat_messages": SNAPSHOT["chat_messages"]}
+    store.delete("token1")
+    assert store.load("token1") == {}
+
+def test_stores_must_implement_the_interface():
+    """A store missing load, save or delete cannot be created"""
+    class SaveOnly(SessionStore):
+        def save(self, token, state):
+            pass
+
+    for incomplete in (SessionStore, SaveOnly):
+        try:
+            incomplete()
+        except TypeError:
+            continue
+        raise AssertionError(f"{incomplete.__name__} was instantiated")
+
+if __name__ == "__main__":
+    test_sqlite_store_survives_restart()
+    test_sqlite_store_batches_and_skips_unchanged_keys()
+    test_store_factory_and_memory_store()
+    test_stores_must_implement_the_interface()
+    print("✅ Session store tests passed")
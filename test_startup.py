@@ -0,0 +1,40 @@
+"""
+Test cold start: the app's imports leave heavy dependencies for first use, and the startup benchmark and budgets work
+"""
+
+from benchmarks.startup_bench import check_budgets, parse_importtime, time_imports
+from utils.prompt_reuse import PromptReuseIndex
+
+def test_app_imports_skip_heavy_dependencies():
+    """Importing the app's modules loads no pandas, numpy, crewai or http.server"""
+    for target in ("config", "agents", "app"):
+        timing = time_imports(target, runs=1)
+        assert timing["heavy_loaded"] == [], (target, timing["heavy_loaded"])
+        assert timing["slowest"], target
+
+def test_features_still_load_their_dependencies():
+    """Indexing and searching work with numpy imported on first use; an empty index never needs it"""
+    index = PromptReuseIndex()
+    assert index.search("Write a blog post strategy") == []
+    assert index.add({"id": "a1", "final_prompt": "Blog prompt", "original_request": "Write a blog post strategy", "department": "Marketing"})
+    assert index.search("blog post strategy", department="Marketing")[0]["id"] == "a1"
+
+def test_importtime_parsing_and_budgets():
+    """``-X importtime`` output is parsed by depth; budgets flag only targets over their limit"""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _json\n"
+        "import time:      2000 |       2120 | json\n"
+    )
+    modules = parse_importtime(stderr)
+    assert [(m["module"], m["depth"], m["cumulative_ms"]) for m in modules] == [("_json", 1, 0.12), ("json", 0, 2.12)]
+    results = {"imports": {"app": {"median_ms": 600.0}}, "first_render": {"median_ms": 900.0}}
+    assert check_budgets(results, {"app": 700, "first_render": 1000}) == []
+    over = check_budgets(results, {"app": 500, "admin_page": 900})
+    assert over[0].startswith("app: 600 ms > 500 ms") and over[1] == "admin_page: not measured"
+
+if __name__ == "__main__":
+    test_app_imports_skip_heavy_dependencies()
+    test_features_still_load_their_dependencies()
+    test_importtime_parsing_and_budgets()
+    print("✅ Startup tests passed")
@@ -0,0 +1,84 @@
+"""
+Test token accounting: usageMetadata capture, per-stage meters on workflow results and the persisted ledger
+"""
+
+import os
+import tempfile
+from benchmarks.mock_gemini import MockGeminiServer
+from utils import token_usage
+from utils.metrics import GEMINI_COST, GEMINI_TOKENS
+from utils.token_usage import TokenLedger, metered, record_usage
+
+def test_record_usage_counts_thinking_as_output():
+    """Prompt and output tokens (including thinking) reach the metrics and every open meter"""
+    prompt = GEMINI_TOKENS.value(method="unit_test", kind="prompt")
+    output = GEMINI_TOKENS.value(method="unit_test", kind="output")
+    cost = GEMINI_COST.value(method="unit_test")
+    with metered() as outer:
+        assert record_usage("unit_test", "intent", {"promptTokenCount": 100}) == (100, 0)
+        with metered() as inner:
+            usage = {"promptTokenCount": 1000, "candidatesTokenCount": 200, "thoughtsTokenCount": 50}
+            assert record_usage("unit_test", "questions", usage) == (1000, 250)
+    record_usage("unit_test", "intent", {})
+
+    assert inner.by_stage() == {"questions": {"calls": 1, "prompt": 1000, "output": 250}}
+    assert outer.by_stage()["intent"] == {"calls": 1, "prompt": 100, "output": 0}
+    assert outer.calls == 2
+    assert GEMINI_TOKENS.value(method="unit_test", kind="prompt") == prompt + 1100
+    assert GEMINI_TOKENS.value(method="unit_test", kind="output") == output + 250
+    assert GEMINI_COST.value(method="unit_test") > cost
+
+def test_workflow_results_report_stage_tokens():
+    """Workflow results carry token counts by stage, matching the mock's usageMetadata"""
+    with MockGeminiServer() as server:
+        agents = server.agents()
+        result = agents.process_interactive_workflow("I want to create a blog strategy for our product launch")
+        assert result["workflow_state"] == "awaiting_answers"
+        stages = result["stage_tokens"]
+        assert set(stages) == {"intent", "department", "questions"}
+        assert all(usage["calls"] == 1 and usage["prompt"] > 0 and usage["output"] > 0 for usage in stages.values())
+        assert sum(usage["calls"] for usage in stages.values()) == server.stats()["calls"]
+
+def test_ledger_rollups_and_persistence():
+    """The ledger totals by stage, department, session and day and survives a reload"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ledger", "tokens.json")
+        ledger = TokenLedger(path)
+        ledger.observe({"intent": {"calls": 1, "prompt": 400, "output": 100}, "questions": {"calls": 1, "prompt": 600, "output": 300}},
+                       department="Marketing", session_id="s1", day="2025-01-01")
+        ledger.observe({"final_prompt": {"calls": 1, "prompt": 1000, "output": 2000}}, session_id="s2", day="2025-01-02")
+        ledger.observe({}, department="Ignored")
+
+        usage = TokenLedger(path).snapshot()
+        assert usage["totals"]["calls"] == 3 and usage["totals"]["prompt"] == 2000 and usage["totals"]["output"] == 2400
+        assert usage["departments"]["Marketing"]["prompt"] == 1000 and "Unassigned" in usage["departments"]
+        assert "Ignored" not in usage["departments"]
+        assert usage["sessions"]["s2"]["output"] == 2000
+        assert usage["days"]["2025-01-02"]["calls"] == 1
+        assert usage["stages"]["final_prompt"]["cost"] > usage["stages"]["intent"]["cost"] > 0
+
+        stages = ledger.frame("stages")
+        assert list(stages.columns) == ["calls", "prompt", "output", "cost"]
+        assert stages.index[0] == "final_prompt"
+        assert list(ledger.frame("days").index) == ["2025-01-01", "2025-01-02"]
+
+def test_ledger_keeps_most_recent_sessions():
+    """Only the most recently active sessions are kept"""
+    original = token_usage.MAX_LEDGER_SESSIONS
+    token_usage.MAX_LEDGER_SESSIONS = 3
+    try:
+        ledger = TokenLedger()
+        for session_id in ["a", "b", "c", "a", "d"]:
+            ledger.observe({"intent": {"calls": 1, "prompt": 10, "output": 5}}, session_id=session_id)
+        sessions = ledger.snapshot()["sessions"]
+        assert list(sessions) == ["c", "a", "d"]
+        assert sessions["a"]["calls"] == 2
+    finally:
+        token_usage.MAX_LEDGER_SESSIONS = original
+
+if __name__ == "__main__":
+    test_record_usage_counts_thinking_as_output()
+    test_workflow_results_report_stage_tokens()
+    test_ledger_rollups_and_persistence()
+    test_ledger_keeps_most_recent_sessions()
+    print("✅ Token usage tests passed")
@@ -0,0 +1,126 @@
+"""
+Test workflow tracing: nested spans, request ids, exporters and the instrumented agents
+"""
+
+import io
+import json
+import os
+import tempfile
+from benchmarks.mock_gemini import MockGeminiServer
+from utils.tracing import NOOP_SPAN, ConsoleExporter, JsonlExporter, OtlpExporter, Tracer, set_tracer, traced
+
+class _Collect:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+def test_disabled_tracer_is_noop():
+    """Without an exporter spans are a shared no-op and decorated functions run untouched"""
+    previous = set_tracer(Tracer())
+    try:
+        tracer = Tracer()
+        assert tracer.span("anything", size=1) is NOOP_SPAN
+        with tracer.span("anything") as span:
+            span.set("ignored", True)
+        tracer.record("ui.script", 12.0)
+
+        @traced("double")
+        def double(x):
+            return x * 2
+        assert double(4) == 8 and double.__name__ == "double"
+    finally:
+        set_tracer(previous)
+
+def test_nested_spans_share_request_id():
+    """Children inherit trace and request id; errors are recorded, Streamlit-style control flow is not"""
+    exporter = _Collect()
+    tracer = Tracer(exporter)
+    with tracer.span("app.start", request_id="req-1") as root:
+        with tracer.span("agents.step", stage="intent") as child:
+            child.set("prompt_chars", 120)
+        try:
+            with tracer.span("gemini.call"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+    try:
+        with tracer.span("ui.main"):
+            raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+
+    step, call, app, ui = exporter.spans
+    assert [span.name for span in exporter.spans] == ["agents.step", "gemini.call", "app.start", "ui.main"]
+    assert step.parent_id == root.span_id and step.trace_id == root.trace_id
+    assert {step.request_id, call.request_id, app.request_id} == {"req-1"}
+    assert step.attributes == {"stage": "intent", "prompt_chars": 120}
+    assert call.status == "error" and call.error == "ValueError: boom"
+    assert ui.status == "ok" and ui.parent_id is None and ui.request_id != "req-1"
+    assert app.duration_ms >= step.duration_ms >= 0
+
+def test_agents_emit_stage_and_call_spans():
+    """Every workflow method and Gemini call gets a span with sizes and timings"""
+    with tempfile.TemporaryDirectory() as tmp, MockGeminiServer() as server:
+        path = os.path.join(tmp, "traces.jsonl")
+        tracer = Tracer(JsonlExporter(path))
+        previous = set_tracer(tracer)
+        try:
+            with tracer.span("app.start", request_id="abc123"):
+                server.agents().process_interactive_workflow("I want to create a blog strategy for our product launch")
+        finally:
+            set_tracer(previous)
+            tracer.shutdown()
+
+        with open(path, encoding="utf-8") as f:
+            spans = [json.loads(line) for line in f]
+        names = [span["name"] for span in spans]
+        assert names.count("gemini.call") == 3
+        for stage in ["analyze_input_intent", "generate_smart_response", "detect_department", "generate_interactive_questions"]:
+            assert f"agents.{stage}" in names
+        assert names[-2:] == ["agents.process_interactive_workflow", "app.start"]
+        assert {span["request_id"] for span in spans} == {"abc123"}
+
+        by_id = {span["span_id"]: span for span in spans}
+        call = next(span for span in spans if span["attributes"].get("stage") == "department")
+        assert call["attributes"]["role"] == "Department Detection Specialist"
+        assert by_id[call["parent_id"]]["name"] == "agents.detect_department"
+        attributes = call["attributes"]
+        assert attributes["outcome"] == "ok" and attributes["status_code"] == 200
+        assert attributes["request_bytes"] > attributes["prompt_chars"] > 0
+        assert attributes["response_chars"] > 0 and attributes["network_ms"] >= 0 and "parse_ms" in attributes
+
+def test_console_and_otlp_exporters():
+    """The console shows one line per span; OTLP batches are valid ExportTraceServiceRequest JSON"""
+    stream = io.StringIO()
+    tracer = Tracer(ConsoleExporter(stream))
+    with tracer.span("gemini.call", request_id="r1", stage="AI Mentor"):
+        pass
+    assert stream.getvalue().startswith("[trace r1] gemini.call ") and "stage=AI Mentor" in stream.getvalue()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "otlp.jsonl")
+        tracer = Tracer(OtlpExporter(path=path, service_name="test-service", interval=60))
+        with tracer.span("app.continue", request_id="r2", attempts=2):
+            with tracer.span("gemini.call", ok=True, ratio=0.5):
+                pass
+        tracer.shutdown()
+        with open(path, encoding="utf-8") as f:
+            payload = json.loads(f.readline())
+        resource = payload["resourceSpans"][0]
+        assert resource["resource"]["attributes"][0] == {"key": "service.name", "value": {"stringValue": "test-service"}}
+        child, parent = resource["scopeSpans"][0]["spans"]
+        assert child["parentSpanId"] == parent["spanId"] and "parentSpanId" not in parent
+        assert len(parent["traceId"]) == 32 and len(parent["spanId"]) == 16
+        assert int(parent["endTimeUnixNano"]) >= int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+        attributes = {item["key"]: item["value"] for item in parent["attributes"]}
+        assert attributes == {"attempts": {"intValue": "2"}, "request_id": {"stringValue": "r2"}}
+        assert {"key": "ok", "value": {"boolValue": True}} in child["attributes"]
+
+if __name__ == "__main__":
+    test_disabled_tracer_is_noop()
+    test_nested_spans_share_request_id()
+    test_agents_emit_stage_and_call_spans()
+    test_console_and_otlp_exporters()
+    print("✅ Tracing tests passed")
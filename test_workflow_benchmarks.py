@@ -0,0 +1,61 @@
+"""
+Test the offline benchmark suite: latency specs, the mock Gemini server and per-path results
+"""
+
+import json
+import random
+import requests
+from benchmarks.mock_gemini import MockGeminiServer, parse_latency
+from benchmarks.workflow_bench import percentile, run_benchmarks
+
+def test_latency_specs():
+    """Latency specs are milliseconds and sample to seconds"""
+    rng = random.Random(3)
+    assert parse_latency("0")(rng) == 0.0
+    assert parse_latency("fixed:250")(rng) == 0.25
+    assert all(0.1 <= parse_latency("uniform:100:300")(rng) <= 0.3 for _ in range(50))
+    assert parse_latency("normal:10:100")(rng) >= 0.0
+    for spec in ["slow", "uniform:1", "gamma:1:2", "lognormal:0:1"]:
+        try:
+            parse_latency(spec)
+            assert False, spec
+        except ValueError:
+            pass
+
+def test_mock_server_answers_agents():
+    """The agents talk to the mock like the real endpoint; calls and bytes are counted by role"""
+    with MockGeminiServer() as server:
+        agents = server.agents()
+        result = agents.process_interactive_workflow("I want to create a blog strategy for our product launch")
+        assert result["workflow_state"] == "awaiting_answers"
+        assert result["department_detected"]["department"] == "Content"
+        assert len(result["questions"]["questions"]) == 3
+
+        stats = server.stats()
+        assert stats["calls"] == 3
+        assert set(stats["roles"]) == {"Input Intent Analyzer", "Department Detection Specialist", "Interactive Questioning Specialist"}
+        assert stats["bytes_received"] == sum(role["bytes_received"] for role in stats["roles"].values()) > 0
+
+        reply = requests.post(server.url, json={"contents": [{"parts": [{"text": "You are a Test. Hi"}]}]}, timeout=5).json()
+        assert reply["candidates"][0]["content"]["parts"][0]["text"] == "OK"
+        assert reply["usageMetadata"]["promptTokenCount"] == 4
+        assert requests.post(server.url.replace(":generateContent", ""), json={}, timeout=5).status_code == 404
+
+def test_benchmark_results_per_path():
+    """Every workflow path is timed with percentiles, LLM calls and bytes, and the results are JSON"""
+    results = run_benchmarks(iterations=3, warmup=0, latency="0")
+    scenarios = results["scenarios"]
+    assert list(scenarios) == ["direct_request", "mentor_question", "multi_round_answers", "final_prompt"]
+    assert [scenarios[name]["llm_calls"] for name in scenarios] == [3, 3, 2, 2]
+    for result in scenarios.values():
+        assert result["runs"] == 3
+        assert result["min_ms"] <= result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+        assert result["bytes_sent"] > 1000
+    assert json.loads(json.dumps(results))["meta"]["latency"] == "0"
+    assert percentile([1, 2, 3, 4], 50) == 2.5 and percentile([5], 99) == 5
+
+if __name__ == "__main__":
+    test_latency_specs()
+    test_mock_server_answers_agents()
+    test_benchmark_results_per_path()
+    print("✅ Workflow benchmark tests passed")
@@ -0,0 +1,255 @@
+"""
+Admission control for AI Prompt Generator
+Fair, per-session queueing of Gemini-backed actions across concurrent users
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+# Interactive workflow steps are served three times as often as mentor chat
+DEFAULT_WEIGHTS = {"workflow": 3, "chat": 1}
+
+
+class AdmissionTimeout(RuntimeError):
+    """Raised when a request waits in the queue longer than its timeout"""
+
+
+class _Waiter:
+    """A queued request; doubles as the ticket returned once admitted"""
+
+    __slots__ = ("session_id", "kind", "granted", "enqueued_at")
+
+    def __init__(self, session_id: str, kind: str):
+        self.session_id = session_id
+        self.kind = kind
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    Limits concurrent Gemini work per session and globally.
+
+    Waiting requests are grouped by kind ("workflow", "chat"). Kinds are served
+    by smooth weighted round-robin and, within a kind, sessions take turns so a
+    single user sending many messages cannot starve everyone else.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        per_session_limit: int = 1,
+        weights: Optional[Dict[str, int]] = None,
+        queue_timeout: float = 120.0,
+        poll_interval: float = 0.5
+    ):
+        if max_in_flight < 1 or per_session_limit < 1:
+            raise ValueError("Concurrency limits must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.per_session_limit = per_session_limit
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._session_in_flight: Dict[str, int] = {}
+        # kind -> session_id -> FIFO of waiters, sessions kept in round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {
+            kind: OrderedDict() for kind in self.weights
+        }
+        self._current_weight = {kind: 0 for kind in self.weights}
+        self._admitted_total = 0
+        self._timeouts_total = 0
+
+    def acquire(
+        self,
+        session_id: str,
+        kind: str = "workflow",
+        timeout: Optional[float] = None,
+        on_wait: Optional[Callable[[int], None]] = None
+    ) -> _Waiter:
+        """
+        Block until the request may run and return its ticket.
+
+        ``on_wait`` is called outside the lock with the 1-based queue position
+        whenever it changes, so the UI can show where the user stands.
+        """
+        if kind not in self.weights:
+            raise ValueError(f"Unknown request kind: {kind}")
+
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        waiter = _Waiter(session_id, kind)
+        last_position = None
+
+        with self._cond:
+            self._queues[kind].setdefault(session_id, deque()).append(waiter)
+            self._dispatch_locked()
+
+        while True:
+            with self._cond:
+                if waiter.granted:
+                    return waiter
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove_locked(waiter)
+                    self._timeouts_total += 1
+                    raise AdmissionTimeout(
+                        f"Request waited more than {self.queue_timeout if timeout is None else timeout:.0f}s in the queue"
+                    )
+                position = self._position_locked(waiter) if on_wait else None
+
+            if position is not None and position != last_position:
+                on_wait(position)
+                last_position = position
+
+            with self._cond:
+                if not waiter.granted:
+                    self._cond.wait(min(remaining, self.poll_interval))
+
+    def release(self, ticket: _Waiter) -> None:
+        """Free the slot held by an admitted request"""
+        with self._cond:
+            if not ticket.granted:
+                return
+            ticket.granted = False
+            self._in_flight -= 1
+            remaining = self._session_in_flight.get(ticket.session_id, 1) - 1
+            if remaining > 0:
+                self._session_in_flight[ticket.session_id] = remaining
+            else:
+                self._session_in_flight.pop(ticket.session_id, None)
+            self._dispatch_locked()
+
+    @contextmanager
+    def slot(
+        self,
+        session_id: str,
+        kind: str = "workflow",
+        timeout: Optional[float] = None,
+        on_wait: Optional[Callable[[int], None]] = None
+    ) -> Iterator[_Waiter]:
+        """Hold an admission slot for the duration of the block"""
+        ticket = self.acquire(session_id, kind, timeout=timeout, on_wait=on_wait)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def queue_position(self, session_id: str) -> Optional[int]:
+        """Position of the session's earliest queued request, if any"""
+        with self._cond:
+            order = self._simulate_order_locked()
+            for index, waiter in enumerate(order):
+                if waiter.session_id == session_id:
+                    return index + 1
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of current load for display and metrics"""
+        with self._cond:
+            queued_by_kind = {
+                kind: sum(len(waiters) for waiters in sessions.values())
+                for kind, sessions in self._queues.items()
+            }
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queued": sum(queued_by_kind.values()),
+                "queued_by_kind": queued_by_kind,
+                "active_sessions": len(self._session_in_flight),
+                "admitted_total": self._admitted_total,
+                "timeouts_total": self._timeouts_total
+            }
+
+    def _dispatch_locked(self) -> None:
+        """Grant slots to waiting requests while global capacity remains"""
+        granted_any = False
+        while self._in_flight < self.max_in_flight:
+            waiter = self._next_waiter_locked()
+            if waiter is None:
+                break
+            waiter.granted = True
+            self._in_flight += 1
+            self._session_in_flight[waiter.session_id] = self._session_in_flight.get(waiter.session_id, 0) + 1
+            self._admitted_total += 1
+            granted_any = True
+        if granted_any:
+            self._cond.notify_all()
+
+    def _next_waiter_locked(self) -> Optional[_Waiter]:
+        """Pick the next waiter: weighted round-robin over kinds, round-robin over sessions"""
+        eligible = {}
+        for kind, sessions in self._queues.items():
+            for session_id in sessions:
+                if self._session_in_flight.get(session_id, 0) < self.per_session_limit:
+                    eligible[kind] = session_id
+                    break
+        if not eligible:
+            return None
+
+        kind = self._pick_kind(eligible, self._current_weight)
+        session_id = eligible[kind]
+        sessions = self._queues[kind]
+        waiters = sessions[session_id]
+        waiter = waiters.popleft()
+        # Move the session to the back so other sessions of this kind go next
+        del sessions[session_id]
+        if waiters:
+            sessions[session_id] = waiters
+        return waiter
+
+    def _pick_kind(self, candidates, current_weight: Dict[str, int]) -> str:
+        """Smooth weighted round-robin step over the candidate kinds"""
+        total = 0
+        best = None
+        for kind in candidates:
+            current_weight[kind] += self.weights[kind]
+            total += self.weights[kind]
+            if best is None or current_weight[kind] > current_weight[best]:
+                best = kind
+        current_weight[best] -= total
+        return best
+
+    def _simulate_order_locked(self) -> List[_Waiter]:
+        """Order in which queued requests would be served, ignoring per-session limits"""
+        queues = {
+            kind: OrderedDict((sid, deque(waiters)) for sid, waiters in sessions.items())
+            for kind, sessions in self._queues.items()
+        }
+        current_weight = dict(self._current_weight)
+        order = []
+        while True:
+            candidates = [kind for kind, sessions in queues.items() if sessions]
+            if not candidates:
+                return order
+            kind = self._pick_kind(candidates, current_weight)
+            sessions = queues[kind]
+            session_id, waiters = next(iter(sessions.items()))
+            order.append(waiters.popleft())
+            del sessions[session_id]
+            if waiters:
+                sessions[session_id] = waiters
+
+    def _position_locked(self, waiter: _Waiter) -> int:
+        """1-based position of a waiter in the simulated service order"""
+        for index, queued in enumerate(self._simulate_order_locked()):
+            if queued is waiter:
+                return index + 1
+        return 1
+
+    def _remove_locked(self, waiter: _Waiter) -> None:
+        """Drop a waiter that gave up"""
+        sessions = self._queues[waiter.kind]
+        waiters = sessions.get(waiter.session_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        if not waiters:
+            del sessions[waiter.session_id]
@@ -0,0 +1,181 @@
+"""
+Gemini record/replay cassettes for AI Prompt Generator
+Saves request/response pairs (API key redacted) and serves them back offline at recorded or configured latency
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+REDACTED = "<redacted>"
+
+# Request headers and query parameters that carry credentials
+SECRET_HEADERS = {"x-goog-api-key", "authorization"}
+SECRET_PARAMS = {"key"}
+
+MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+def interaction_key(url: str, body: Any) -> str:
+    """Match key for a request: the endpoint path (host and query ignored) and the canonical JSON body"""
+    canonical = json.dumps({"path": urlsplit(url).path, "body": body}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def redact_url(url: str) -> str:
+    """The URL with credential query parameters replaced"""
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [(name, REDACTED if name.lower() in SECRET_PARAMS else value) for name, value in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(query, safe="<>")))
+
+
+def redact_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """The headers with credentials replaced"""
+    return {name: REDACTED if name.lower() in SECRET_HEADERS else value for name, value in (headers or {}).items()}
+
+
+class Cassette:
+    """
+    Records Gemini calls to, or replays them from, a JSON Lines file.
+
+    ``post`` has the signature of ``requests.post`` so the client can use
+    either. Recording sends the real request and appends the interaction with
+    credentials redacted; replaying returns the recorded response for the
+    same endpoint and body, in recorded order when one request was made
+    several times (the last answer repeats). ``latency`` is ``recorded``,
+    ``none``, a fixed number of milliseconds or ``scale:FACTOR``.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: str = "recorded"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._delay(0.0)  # validate the latency spec up front
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Cassette not found: {path}")
+            self._load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(recorded) for recorded in self._interactions.values())
+
+    def post(self, url: str, headers: Optional[Dict[str, str]] = None, json: Any = None, timeout: Optional[float] = None) -> requests.Response:
+        """Send (recording) or look up (replaying) one POST"""
+        if self.mode == "record":
+            return self._record(url, headers, json, timeout)
+        return self._replay(url, headers, json)
+
+    def _record(self, url, headers, body, timeout) -> requests.Response:
+        started = time.perf_counter()
+        response = requests.post(url, headers=headers, json=body, timeout=timeout)
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        secrets = [value for name, value in (headers or {}).items() if name.lower() in SECRET_HEADERS and value]
+        interaction = {
+            "key": interaction_key(url, body),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "latency_ms": latency_ms,
+            "request": {"method": "POST", "url": redact_url(url), "headers": redact_headers(headers), "body": body},
+            "response": {
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", "application/json"),
+                "body": response.text
+            }
+        }
+        line = json.dumps(interaction, ensure_ascii=False) + "\n"
+        # A key echoed back in an error message must not reach the file either
+        for secret in secrets:
+            line = line.replace(secret, REDACTED)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        return response
+
+    def _replay(self, url, headers, body) -> requests.Response:
+        key = interaction_key(url, body)
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recorded response in {self.path} for request {key}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            interaction = recorded[min(index, len(recorded) - 1)]
+
+        delay = self._delay(interaction.get("latency_ms", 0.0))
+        if delay:
+            time.sleep(delay)
+
+        recorded_response = interaction["response"]
+        response = requests.Response()
+        response.status_code = recorded_response["status"]
+        response._content = recorded_response["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.headers["Content-Type"] = recorded_response.get("content_type", "application/json")
+        response.url = url
+        response.request = requests.Request("POST", url, headers=headers, json=body).prepare()
+        return response
+
+    def _delay(self, recorded_ms: float) -> float:
+        """Seconds to wait before answering a replayed request"""
+        spec = (self.latency or "none").strip().lower()
+        try:
+            if spec == "recorded":
+                return recorded_ms / 1000
+            if spec == "none":
+                return 0.0
+            if spec.startswith("scale:"):
+                return recorded_ms * float(spec[6:]) / 1000
+            return float(spec) / 1000
+        except ValueError:
+            raise ValueError(f"Invalid cassette latency: {self.latency}")
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions.setdefault(interaction["key"], []).append(interaction)
+
+
+_shared_cassette: Optional[Cassette] = None
+_shared_loaded = False
+_shared_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Process-wide cassette from GEMINI_CASSETTE_MODE (None when off)"""
+    global _shared_cassette, _shared_loaded
+    if _shared_loaded:
+        return _shared_cassette
+    from config import Config
+
+    with _shared_lock:
+        if not _shared_loaded:
+            mode = (Config.GEMINI_CASSETTE_MODE or "off").lower()
+            if mode not in MODES:
+                raise ValueError(f"Unknown cassette mode: {mode}")
+            if mode != "off":
+                _shared_cassette = Cassette(Config.GEMINI_CASSETTE_PATH, mode, Config.GEMINI_CASSETTE_LATENCY)
+            _shared_loaded = True
+        return _shared_cassette
@@ -0,0 +1,24 @@
+"""
+Typing-pause detection for AI Prompt Generator
+A hidden component that reports a text area's draft when the user stops typing, before the field loses focus
+"""
+
+import os
+from typing import Optional
+
+import streamlit.components.v1 as components
+
+_draft_idle = components.declare_component(
+    "draft_idle", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "draft_idle_frontend")
+)
+
+
+def draft_idle(label: str, delay: float, key: str) -> Optional[str]:
+    """
+    Text of the text area labelled ``label`` as of the user's last typing
+    pause of ``delay`` seconds; None until the first pause. Streamlit only
+    sends a text area's value on blur or Ctrl+Enter, so this is what lets
+    work start while the user is still in the field.
+    """
+    value = _draft_idle(label=label, delay_ms=int(delay * 1000), key=key, default=None)
+    return value["text"] if value else None
@@ -130,44 +130,33 @@ class PromptGeneratorUtils:
         ]
     
     @staticmethod
-    def save_prompt_history(prompt_data: Dict[str, Any], filename: str = None) -> str:
+    def save_prompt_history(prompt_data: Dict[str, Any], filename: Optional[str] = None) -> str:
         """
-        Save generated prompt to history
+        Queue a generated prompt for the configured history backend and return its record id.
+        The write happens in the background; raises HistoryQueueFull if the writer is backed up.
         """
-        try:
-            if not filename:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"prompt_history_{timestamp}.json"
-            
-            # Create history directory if it doesn't exist
-            history_dir = "history"
-            if not os.path.exists(history_dir):
-                os.makedirs(history_dir)
-            
-            filepath = os.path.join(history_dir, filename)
-            
-            # Add timestamp to prompt data
-            prompt_data["saved_at"] = datetime.now().isoformat()
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(prompt_data, f, indent=2, ensure_ascii=False)
-            
-            return filepath
-            
-        except Exception as e:
-            return f"Error saving prompt history: {str(e)}"
+        from utils.history_writer import get_history_writer
+
+        record = dict(prompt_data)
+        record["saved_at"] = datetime.now().isoformat()
+        if filename:
+            record["name"] = filename
+
+        return get_history_writer().submit(record)
     
     @staticmethod
     def load_prompt_history(filename: str) -> Optional[Dict[str, Any]]:
         """
-        Load prompt from history
+        Load prompt from history by record id, or from a legacy history file
         """
         try:
             filepath = os.path.join("history", filename)
-            if os.path.exists(filepath):
+            if os.path.isfile(filepath):
                 with open(filepath, 'r', encoding='utf-8') as f:
                     return json.load(f)
-            return None
+
+            from utils.history_store import get_history_store
+            return get_history_store().get(filename)
         except Exception as e:
             return None
     
@@ -0,0 +1,48 @@
+"""
+History browsing for AI Prompt Generator
+Constant-time pages over either history backend; full records are decoded only when opened
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from utils.history_log import HistoryLog
+
+
+def history_page(
+    store,
+    number: int = 0,
+    size: int = 20,
+    department: Optional[str] = None,
+    cursor: Optional[Tuple[float, int]] = None
+) -> Dict[str, Any]:
+    """
+    One page of history, newest first, as ``{"rows", "total", "next_cursor"}``.
+
+    The log backend slices its memory-mapped index by page ``number`` (so any
+    page can be opened directly and ``total`` is known), showing only the
+    latest save of each record id; the SQLite backend
+    pages by ``cursor`` (the previous page's ``next_cursor``, a ``(saved_ts,
+    seq)`` pair) over its saved_at index, optionally within a department,
+    with ``total`` None.
+    Rows carry only what the index holds; see ``open_record``.
+    """
+    if isinstance(store, HistoryLog):
+        with store.index_view(latest_only=True) as view:
+            return {"rows": view.page(number, size), "total": len(view), "next_cursor": None}
+
+    rows = store.recent(limit=size, department=department, before=cursor)
+    next_cursor = (rows[-1]["saved_ts"], rows[-1]["seq"]) if len(rows) == size else None
+    return {"rows": rows, "total": None, "next_cursor": next_cursor}
+
+
+def open_record(store, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Decode the full record behind a page row"""
+    if isinstance(store, HistoryLog) and "segment" in row:
+        try:
+            record = store.read_entry(row["segment"], row["offset"], row["length"])
+            if record.get("id") == row["id"]:
+                return record
+        except (FileNotFoundError, ValueError):
+            pass
+        # The segment was compacted since the page was read
+    return store.get(row["id"])
@@ -0,0 +1,138 @@
+"""
+Compression for saved prompt history
+zlib with a preset dictionary of shared prompt boilerplate, each stage text compressed against the one before
+"""
+
+import hashlib
+import json
+import struct
+import zlib
+from typing import Any, Dict, Optional, Union
+
+from templates.prompt_templates import DEPARTMENT_EXPERTISE, DEPARTMENT_TEMPLATES, GENERIC_PROMPT_STRUCTURE
+
+# Encoded records start with MAGIC followed by the dictionary id (uint16)
+MAGIC = b"PGZ1"
+HEADER = struct.Struct("<4sH")
+
+# zlib only looks back 32 KB, so the dictionary is trimmed to its most useful tail
+MAX_DICTIONARY_BYTES = 32 * 1024
+
+# Pipeline stages in the order they are produced; each stage is mostly a rewrite
+# of the one before, so whole records store them adjacently and the SQLite
+# store compresses each stage text with the previous one as its dictionary
+STAGE_ORDER = [
+    "user_input",
+    "original_request",
+    "department",
+    "status",
+    "analysis",
+    "structure",
+    "enhanced",
+    "generated_prompt",
+    "final_prompt"
+]
+
+# Sections the generators repeat in almost every prompt (most frequent last,
+# closest to the data, where zlib finds matches cheapest)
+COMMON_SECTIONS = [
+    "**PORTFOLIO PROJECT ENHANCEMENTS:**\n- Include portfolio presentation guidelines\n"
+    "- Add career development insights\n- Emphasize skills that employers value\n"
+    "- Include project documentation requirements\n- Add interview preparation tips\n"
+    "- Include next steps for career advancement\n",
+    "**FRESHER/ENTRY-LEVEL CONSIDERATIONS:**\n- Focus on learning objectives\n- Include realistic timelines\n"
+    "- Add common beginner mistakes to avoid\n- Include resources for further learning\n",
+    "**TECHNICAL PROJECT REQUIREMENTS:**\n- Include technical stack recommendations\n"
+    "- Add implementation best practices\n- Include testing and deployment guidelines\n"
+    "- Add performance optimization tips\n- Include security considerations\n",
+    "GitHub repository setup and management\nREADME file with project overview\n"
+    "Technical skills demonstration for employers\n",
+    "*   **Clarity and Specificity:** \n*   **Completeness of Information:** \n"
+    "*   **Appropriate Constraints and Guidelines:** \n*   **Professional Tone and Formatting:** \n"
+    "*   **Potential Improvements or Additions:** \n",
+    "**Role:** You are an expert \n**Objective:** \n**Context:** \n**Task:** \n**Deliverables:** \n"
+    "**Constraints:** \n**Requirements:** \n**Expected Output:** \n**Output Format:** \n",
+    "**Quality Criteria:**\n- \n**Additional Guidelines:**\n- \n**Success Metrics:**\n- \n",
+    '{"user_input":"","original_request":"","department":"","status":"completed",'
+    '"analysis":"","structure":"","enhanced":"","generated_prompt":"","final_prompt":"",'
+    '"total_questions":0,"saved_at":"","id":""}'
+]
+
+
+def build_preset_dictionary() -> bytes:
+    """Preset dictionary from the prompt templates and common generated sections"""
+    parts = []
+    for expertise in DEPARTMENT_EXPERTISE.values():
+        parts.append("\n".join(expertise))
+    for templates in DEPARTMENT_TEMPLATES.values():
+        parts.append("\n".join(templates.values()))
+    parts.append(GENERIC_PROMPT_STRUCTURE)
+    parts.extend(COMMON_SECTIONS)
+    return "\n".join(parts).encode("utf-8")[-MAX_DICTIONARY_BYTES:]
+
+
+def dictionary_digest(dictionary: bytes) -> str:
+    """Stable identifier for a dictionary's content"""
+    return hashlib.sha256(dictionary).hexdigest()
+
+
+class HistoryCodec:
+    """
+    Encodes history records as zlib streams primed with a preset dictionary.
+
+    Dictionaries are addressed by a small integer id stored in each record's
+    header, so records written with an older dictionary stay readable after
+    the templates change. Plain JSON (text or bytes) decodes as-is.
+    """
+
+    def __init__(self, dictionaries: Dict[int, bytes], current: int, level: int = 6):
+        self.dictionaries = dict(dictionaries)
+        self.current = current
+        self.level = level
+
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        """Compress a record, stage texts first in pipeline order"""
+        raw = json.dumps(stage_ordered(record), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        compressor = zlib.compressobj(self.level, zdict=self.dictionaries[self.current])
+        return HEADER.pack(MAGIC, self.current) + compressor.compress(raw) + compressor.flush()
+
+    def decode(self, value: Union[str, bytes]) -> Dict[str, Any]:
+        """Decompress a record (or parse an uncompressed one)"""
+        return json.loads(self.decode_raw(value))
+
+    def encode_text(self, text: str, base: Optional[str] = None) -> bytes:
+        """
+        Compress a single text field. With ``base`` (usually the previous
+        stage's text) the stream can back-reference it, and decoding needs it too.
+        """
+        compressor = zlib.compressobj(self.level, zdict=self._text_dictionary(self.current, base))
+        return HEADER.pack(MAGIC, self.current) + compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+    def decode_text(self, value: Union[str, bytes], base: Optional[str] = None) -> str:
+        """Decompress a text field written by ``encode_text`` (plain text passes through)"""
+        if isinstance(value, str) or not value.startswith(MAGIC):
+            return value if isinstance(value, str) else value.decode("utf-8")
+        _, dictionary_id = HEADER.unpack_from(value)
+        decompressor = zlib.decompressobj(zdict=self._text_dictionary(dictionary_id, base))
+        return (decompressor.decompress(value[HEADER.size:]) + decompressor.flush()).decode("utf-8")
+
+    def _text_dictionary(self, dictionary_id: int, base: Optional[str]) -> bytes:
+        """The preset dictionary with ``base`` appended, where zlib finds matches cheapest"""
+        if not base:
+            return self.dictionaries[dictionary_id]
+        return (self.dictionaries[dictionary_id] + base.encode("utf-8"))[-MAX_DICTIONARY_BYTES:]
+
+    def decode_raw(self, value: Union[str, bytes]) -> Union[str, bytes]:
+        """The record's JSON text without parsing it"""
+        if isinstance(value, str) or not value.startswith(MAGIC):
+            return value
+        _, dictionary_id = HEADER.unpack_from(value)
+        decompressor = zlib.decompressobj(zdict=self.dictionaries[dictionary_id])
+        return decompressor.decompress(value[HEADER.size:]) + decompressor.flush()
+
+
+def stage_ordered(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of ``record`` with pipeline stage fields first, in stage order"""
+    ordered = {key: record[key] for key in STAGE_ORDER if key in record}
+    ordered.update((key, value) for key, value in record.items() if key not in ordered)
+    return ordered
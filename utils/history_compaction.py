@@ -0,0 +1,407 @@
+"""
+History retention and compaction for AI Prompt Generator
+Incremental job that rolls up, expires and merges saved prompt history without blocking the app
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Fields a rolled-up record keeps; intermediate stages (analysis, structure, enhanced) are dropped
+ROLLED_UP_FIELDS = [
+    "id",
+    "saved_at",
+    "department",
+    "status",
+    "original_request",
+    "user_input",
+    "final_prompt",
+    "generated_prompt",
+    "total_questions",
+    "rolled_up"
+]
+
+ROLLUPS_FILE = "rollups.json"
+STATE_FILE = "compaction.json"
+
+
+def summarize_record(record: Dict[str, Any]) -> Tuple[str, str, int, int]:
+    """(day, department, questions answered, JSON size) of a record, for the rollups"""
+    saved_at = record.get("saved_at") or ""
+    department = record.get("department") or "Unknown"
+    questions = record.get("total_questions")
+    if questions is None:
+        questions = len(record.get("user_answers") or {})
+    size = len(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return saved_at[:10], department, int(questions or 0), size
+
+
+def trim_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Rolled-up form of a record: request, final prompt and a few counters"""
+    trimmed = {key: record[key] for key in ROLLED_UP_FIELDS if key in record}
+    if "total_questions" not in trimmed and record.get("user_answers"):
+        trimmed["total_questions"] = len(record["user_answers"])
+    trimmed["rolled_up"] = True
+    return trimmed
+
+
+class RetentionPolicy:
+    """
+    What the compaction job keeps.
+
+    ``max_age_days`` and ``max_total_bytes`` delete the oldest records (0
+    disables each); ``rollup_after_days`` trims older records to their final
+    prompt after counting them in per-day rollups (0, the default, disables
+    it). Log segments smaller than ``min_segment_bytes`` are merged, up to
+    ``target_segment_bytes``.
+    """
+
+    def __init__(
+        self,
+        max_age_days: float = 0,
+        rollup_after_days: float = 0,
+        max_total_bytes: int = 0,
+        min_segment_bytes: int = 1024 * 1024,
+        target_segment_bytes: int = 16 * 1024 * 1024
+    ):
+        self.max_age_days = max_age_days
+        self.rollup_after_days = rollup_after_days
+        self.max_total_bytes = max_total_bytes
+        self.min_segment_bytes = min_segment_bytes
+        self.target_segment_bytes = target_segment_bytes
+
+    @classmethod
+    def from_config(cls) -> "RetentionPolicy":
+        """Policy from the HISTORY_* settings"""
+        from config import Config
+
+        return cls(
+            max_age_days=Config.HISTORY_RETENTION_DAYS,
+            rollup_after_days=Config.HISTORY_ROLLUP_AFTER_DAYS,
+            max_total_bytes=Config.HISTORY_MAX_BYTES,
+            min_segment_bytes=Config.HISTORY_MIN_SEGMENT_BYTES,
+            target_segment_bytes=Config.HISTORY_SEGMENT_MAX_BYTES
+        )
+
+    @property
+    def configured(self) -> bool:
+        """Whether any rule deletes or trims records"""
+        return bool(self.max_age_days or self.rollup_after_days or self.max_total_bytes)
+
+    def delete_cutoff(self, now: float) -> Optional[float]:
+        return now - self.max_age_days * 86400 if self.max_age_days else None
+
+    def rollup_cutoff(self, now: float) -> Optional[float]:
+        return now - self.rollup_after_days * 86400 if self.rollup_after_days else None
+
+
+class HistoryCompactor:
+    """
+    Applies a retention policy to a history backend in small steps.
+
+    Each ``step`` does one bounded piece of work (one batch of records in
+    SQLite, or one rewrite of sealed log segments) and returns a description
+    of it, or None when there is nothing left to do. ``run`` loops steps
+    within a time budget and ``start`` runs it periodically in a daemon
+    thread, so the app never waits for a full pass. Listeners hear about
+    runs that deleted or rolled up records, e.g. to rebuild analytics.
+    """
+
+    def __init__(self, target, policy: RetentionPolicy = None, batch_size: int = 200, clock=time.time):
+        from utils.history_log import HistoryLog
+
+        self.target = target
+        self.policy = policy or RetentionPolicy()
+        self.batch_size = batch_size
+        self.clock = clock
+        self._is_log = isinstance(target, HistoryLog)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.last_run: Dict[str, Any] = {}
+
+    # ---------------------------------------------------------------- running
+
+    def step(self) -> Optional[Dict[str, Any]]:
+        """Do one bounded unit of compaction work"""
+        if self._is_log:
+            return self._log_step()
+        return self._store_step()
+
+    def run(self, max_seconds: Optional[float] = None, pause: float = 0.0) -> Dict[str, Any]:
+        """
+        Run steps until done or ``max_seconds`` have passed; ``pause`` sleeps
+        between steps to leave room for foreground work
+        """
+        started = time.monotonic()
+        totals: Dict[str, Any] = {"steps": 0, "complete": False}
+        with self._run_lock:
+            while not self._stop.is_set():
+                if max_seconds is not None and time.monotonic() - started >= max_seconds:
+                    break
+                result = self.step()
+                if result is None:
+                    totals["complete"] = True
+                    break
+                totals["steps"] += 1
+                for key, value in result.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        totals[key] = totals.get(key, 0) + value
+                if pause:
+                    time.sleep(pause)
+        totals["seconds"] = round(time.monotonic() - started, 3)
+        self.last_run = dict(totals, finished_at=datetime.now().isoformat())
+        if totals.get("deleted") or totals.get("rolled_up"):
+            for callback in self._listeners:
+                callback(totals)
+        return totals
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Call ``callback(totals)`` after each run that deleted or rolled up records"""
+        self._listeners.append(callback)
+
+    def start(self, interval: float, max_seconds: float = 5.0, pause: float = 0.05) -> None:
+        """Run a budgeted pass every ``interval`` seconds in a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.run(max_seconds=max_seconds, pause=pause)
+                except Exception as e:
+                    self.last_run = {"error": str(e), "finished_at": datetime.now().isoformat()}
+
+        self._thread = threading.Thread(target=loop, name="history-compaction", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after its current step"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    # ----------------------------------------------------------------- SQLite
+
+    def _store_step(self) -> Optional[Dict[str, Any]]:
+        store = self.target
+        now = self.clock()
+        policy = self.policy
+
+        if policy.max_total_bytes and store.storage_bytes() > policy.max_total_bytes:
+            deleted = store.delete_before(None, self.batch_size)
+            if deleted:
+                store.collect_garbage()
+                return {"action": "trim_size", "deleted": deleted}
+
+        cutoff = policy.delete_cutoff(now)
+        if cutoff is not None:
+            deleted = store.delete_before(cutoff, self.batch_size)
+            if deleted:
+                store.collect_garbage()
+                return {"action": "expire", "deleted": deleted}
+
+        cutoff = policy.rollup_cutoff(now)
+        if cutoff is not None:
+            rolled = store.roll_up(cutoff, self.batch_size)
+            if rolled:
+                store.collect_garbage()
+                return {"action": "roll_up", "rolled_up": rolled}
+
+        removed = store.collect_garbage()
+        if removed:
+            return {"action": "collect_garbage", "blobs_removed": removed}
+        store.checkpoint()
+        return None
+
+    # -------------------------------------------------------------------- log
+
+    def _log_step(self) -> Optional[Dict[str, Any]]:
+        log = self.target
+        now = self.clock()
+        policy = self.policy
+        state = self._load_json(STATE_FILE)
+        sealed = log.segment_numbers()[:-1]
+        if not sealed:
+            return None
+
+        entries = log.entries()
+        oldest: Dict[int, float] = {}
+        for _, saved_at, segment, _, _ in entries:
+            oldest[segment] = min(saved_at, oldest.get(segment, saved_at))
+        paths = dict(zip(log.segment_numbers(), log.segments()))
+        sizes = {number: os.path.getsize(paths[number]) for number in sealed}
+
+        # 1. Size limit: drop the oldest sealed segment
+        if policy.max_total_bytes:
+            total = sum(os.path.getsize(path) for path in paths.values())
+            if total > policy.max_total_bytes:
+                return self._rewrite([sealed[0]], now, drop_all=True, action="trim_size")
+
+        # 2. Age limit and roll-up: the first segment holding records past a cutoff it was not processed for
+        delete_cutoff = policy.delete_cutoff(now)
+        rollup_cutoff = policy.rollup_cutoff(now)
+        for number in sealed:
+            if number not in oldest:
+                continue
+            processed = state.get(os.path.basename(paths[number]), 0)
+            if delete_cutoff is not None and oldest[number] < delete_cutoff:
+                return self._rewrite([number], now, action="expire")
+            if rollup_cutoff is not None and self._has_saves_between(entries, number, processed, rollup_cutoff):
+                return self._rewrite([number], now, action="roll_up")
+
+        # 3. Merge runs of small sealed segments
+        run: List[int] = []
+        run_bytes = 0
+        for number in sealed:
+            small = sizes[number] < policy.min_segment_bytes
+            if small and run_bytes + sizes[number] <= policy.target_segment_bytes:
+                run.append(number)
+                run_bytes += sizes[number]
+                continue
+            if len(run) > 1:
+                break
+            run, run_bytes = ([number], sizes[number]) if small else ([], 0)
+        if len(run) > 1:
+            return self._rewrite(run, now, action="merge")
+        return None
+
+    def _rewrite(self, numbers: List[int], now: float, drop_all: bool = False, action: str = "") -> Dict[str, Any]:
+        """Rewrite log segments, applying retention and roll-up to every record"""
+        delete_cutoff = self.policy.delete_cutoff(now)
+        rollup_cutoff = self.policy.rollup_cutoff(now)
+        rollups: Dict[Tuple[str, str], List[int]] = {}
+        trimmed = [0]
+
+        def count(record):
+            day, department, questions, size = summarize_record(record)
+            totals = rollups.setdefault((day, department), [0, 0, 0])
+            totals[0] += 1
+            totals[1] += questions
+            totals[2] += size
+
+        def transform(record):
+            try:
+                saved = datetime.fromisoformat(record.get("saved_at", "")).timestamp()
+            except (TypeError, ValueError):
+                saved = now
+            if drop_all or (delete_cutoff is not None and saved < delete_cutoff):
+                if not record.get("rolled_up"):
+                    count(record)
+                return None
+            if rollup_cutoff is not None and saved < rollup_cutoff and not record.get("rolled_up"):
+                count(record)
+                trimmed[0] += 1
+                return trim_record(record)
+            return record
+
+        result = self.target.rewrite_segments(numbers, transform)
+        self._merge_rollups(rollups)
+
+        # Remember the cutoff the rewritten segment has been rolled up to
+        paths = dict(zip(self.target.segment_numbers(), self.target.segments()))
+        state = self._load_json(STATE_FILE)
+        live = {os.path.basename(path) for path in paths.values()}
+        state = {name: processed for name, processed in state.items() if name in live}
+        if numbers[0] in paths and rollup_cutoff is not None:
+            state[os.path.basename(paths[numbers[0]])] = rollup_cutoff
+        self._save_json(STATE_FILE, state)
+
+        return {
+            "action": action,
+            "segments": len(numbers),
+            "deleted": result["dropped"],
+            "rolled_up": trimmed[0],
+            "bytes_freed": result["bytes_before"] - result["bytes_after"]
+        }
+
+    @staticmethod
+    def _has_saves_between(entries: List[tuple], number: int, start: float, end: float) -> bool:
+        """Whether a segment holds records saved in [start, end), i.e. not yet rolled up for ``end``"""
+        return any(segment == number and start <= saved_at < end for _, saved_at, segment, _, _ in entries)
+
+    def rollups(self) -> List[Dict[str, Any]]:
+        """Per-day, per-department aggregates of rolled-up and deleted records"""
+        if not self._is_log:
+            return self.target.rollups()
+        data = self._load_json(ROLLUPS_FILE)
+        return [
+            dict(day=day, department=department, **counts)
+            for day in sorted(data)
+            for department, counts in sorted(data[day].items())
+        ]
+
+    def _merge_rollups(self, rollups: Dict[Tuple[str, str], List[int]]) -> None:
+        if not rollups:
+            return
+        data = self._load_json(ROLLUPS_FILE)
+        for (day, department), (records, questions, size) in rollups.items():
+            counts = data.setdefault(day, {}).setdefault(department, {"records": 0, "questions": 0, "bytes": 0})
+            counts["records"] += records
+            counts["questions"] += questions
+            counts["bytes"] += size
+        self._save_json(ROLLUPS_FILE, data)
+
+    def _load_json(self, name: str) -> Dict[str, Any]:
+        path = os.path.join(self.target.directory, name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_json(self, name: str, data: Dict[str, Any]) -> None:
+        path = os.path.join(self.target.directory, name)
+        temp = path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: run a compaction pass or print the rollups"""
+    from config import Config
+    from utils.history_analytics import get_history_analytics
+    from utils.history_store import open_history_store
+
+    parser = argparse.ArgumentParser(description="Prompt history retention and compaction")
+    parser.add_argument("--backend", default=Config.HISTORY_BACKEND, help="sqlite or log")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    runner = subcommands.add_parser("run", help="apply the retention policy")
+    runner.add_argument("--max-seconds", type=float, help="stop after this long (resume on the next run)")
+    runner.add_argument("--retention-days", type=float, default=Config.HISTORY_RETENTION_DAYS)
+    runner.add_argument("--rollup-after-days", type=float, default=Config.HISTORY_ROLLUP_AFTER_DAYS)
+    runner.add_argument("--max-bytes", type=int, default=Config.HISTORY_MAX_BYTES)
+    subcommands.add_parser("rollups", help="print the per-day aggregates")
+    args = parser.parse_args(argv)
+
+    target = open_history_store(args.backend)
+    if args.command == "run":
+        policy = RetentionPolicy(
+            max_age_days=args.retention_days,
+            rollup_after_days=args.rollup_after_days,
+            max_total_bytes=args.max_bytes,
+            min_segment_bytes=Config.HISTORY_MIN_SEGMENT_BYTES,
+            target_segment_bytes=Config.HISTORY_SEGMENT_MAX_BYTES
+        )
+        compactor = HistoryCompactor(target, policy, batch_size=Config.HISTORY_COMPACTION_BATCH)
+        compactor.add_listener(lambda _: get_history_analytics().rebuild(target.iter_records()))
+        totals = compactor.run(max_seconds=args.max_seconds)
+        status = "✅ History compacted" if totals["complete"] else "⏸️ Time budget used, run again to continue"
+        print(status)
+        print(json.dumps(totals, indent=2))
+    else:
+        print(json.dumps(HistoryCompactor(target).rollups(), indent=2))
+    target.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
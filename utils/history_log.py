@@ -0,0 +1,683 @@
+"""
+Append-only history log for AI Prompt Generator
+Segmented JSONL storage with group-commit fsync and a fixed-width index for random access
+"""
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Index entry: record id (16 bytes), saved_at epoch seconds, segment number, byte offset, byte length
+INDEX_ENTRY = struct.Struct("<16sdIQI")
+INDEX_FILE = "index.bin"
+# Compacted segments keep their number and get a "-c<generation>" suffix
+SEGMENT_PATTERN = re.compile(r"^segment-(\d{6})-(\d{8})(?:-c(\d+))?\.jsonl$")
+
+# Stable ids for imported legacy files, so a migration can be re-run safely
+LEGACY_NAMESPACE = uuid.UUID("5b0f7a52-7f1e-4c57-9a34-3f1c9d2f0a61")
+
+
+class HistoryLog:
+    """
+    Append-only prompt history split into JSONL segments.
+
+    Appends are written immediately but fsync'd in groups: once
+    ``group_commit_size`` records are pending, after ``commit_interval``
+    seconds (background thread), or when a caller asks for a durable append.
+    Segments rotate when they exceed ``segment_max_bytes`` or, with
+    ``rotate_daily``, when the date changes. ``index.bin`` holds one
+    fixed-width entry per record so lookups never scan the segments.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        rotate_daily: bool = True,
+        group_commit_size: int = 32,
+        commit_interval: float = 0.5
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.rotate_daily = rotate_daily
+        self.group_commit_size = group_commit_size
+        self.commit_interval = commit_interval
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._committed = threading.Condition(self._lock)
+        self._written_seq = 0
+        self._committed_seq = 0
+        self._last_commit = time.monotonic()
+        self._closed = False
+        # Bumped whenever compaction rewrites the index
+        self.generation = 0
+
+        # Lazily built lookup structures, invalidated by appends
+        self._id_positions: Optional[Dict[bytes, int]] = None
+        self._live_positions: Optional[List[int]] = None
+        self._time_order: Optional[Tuple[List[float], List[int]]] = None
+
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self._recover()
+        self._index_file = open(self._index_path, "ab")
+        self._open_active_segment()
+
+        self._committer = threading.Thread(target=self._commit_loop, name="history-log-committer", daemon=True)
+        self._committer.start()
+
+    # ------------------------------------------------------------------ writes
+
+    def append(self, record: Dict[str, Any], durable: bool = False) -> str:
+        """
+        Append a record and return its id. With ``durable`` the call returns
+        only after the record has been fsync'd (sharing the fsync with others).
+        """
+        return self.append_many([record], durable=durable)[0]
+
+    def append_many(self, records: List[Dict[str, Any]], durable: bool = False) -> List[str]:
+        """Append several records under one lock acquisition"""
+        prepared = [self._prepare(record) for record in records]
+        ids = []
+        with self._lock:
+            if self._closed:
+                raise ValueError("History log is closed")
+            for record_id, saved_at, line in prepared:
+                self._rotate_if_needed_locked(len(line), saved_at)
+                offset = self._segment_size
+                self._segment_file.write(line)
+                self._segment_size += len(line)
+                self._index_file.write(INDEX_ENTRY.pack(
+                    bytes.fromhex(record_id), saved_at, self._segment_no, offset, len(line)
+                ))
+                self._written_seq += 1
+                ids.append(record_id)
+            self._id_positions = None
+            self._live_positions = None
+            self._time_order = None
+            target = self._written_seq
+
+            if self._written_seq - self._committed_seq >= self.group_commit_size:
+                self._commit_locked()
+            elif durable:
+                # Wait for the group commit; commit ourselves if nobody does in time
+                deadline = time.monotonic() + self.commit_interval
+                while self._committed_seq < target:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._commit_locked()
+                        break
+                    self._committed.wait(remaining)
+        return ids
+
+    def flush(self) -> None:
+        """Force an fsync of everything appended so far"""
+        with self._lock:
+            if not self._closed:
+                self._commit_locked()
+
+    def close(self) -> None:
+        """Commit pending records and close the files"""
+        with self._lock:
+            if self._closed:
+                return
+            self._commit_locked()
+            self._closed = True
+            self._segment_file.close()
+            self._index_file.close()
+            self._committed.notify_all()
+
+    # ------------------------------------------------------------------- reads
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush_buffers_locked()
+        return os.path.getsize(self._index_path) // INDEX_ENTRY.size
+
+    def entries(self) -> List[Tuple[str, float, int, int, int]]:
+        """All index entries as (id, saved_at, segment, offset, length), in append order"""
+        with self._lock:
+            self._flush_buffers_locked()
+            with open(self._index_path, "rb") as f:
+                data = f.read()
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        return [
+            (raw_id.hex(), saved_at, segment, offset, length)
+            for raw_id, saved_at, segment, offset, length in INDEX_ENTRY.iter_unpack(data[:usable])
+        ]
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Random access by record id"""
+        try:
+            raw_id = bytes.fromhex(record_id)
+        except ValueError:
+            return None
+        # Positions only change under the lock (appends, compaction)
+        with self._lock:
+            position = self._ensure_id_positions().get(raw_id)
+            if position is None:
+                return None
+            return self.read_at(position)
+
+    def read_at(self, position: int) -> Dict[str, Any]:
+        """Decode the record stored at index ``position``"""
+        with self._lock:
+            self._flush_buffers_locked()
+            with open(self._index_path, "rb") as f:
+                f.seek(position * INDEX_ENTRY.size)
+                _, _, segment, offset, length = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+            return self.read_entry(segment, offset, length)
+
+    def read_entry(self, segment: int, offset: int, length: int) -> Dict[str, Any]:
+        """Decode the record at a segment offset taken from the index"""
+        with self._lock:
+            with open(self._segment_path(segment), "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+
+    def find_by_time(self, start: Optional[float] = None, end: Optional[float] = None) -> List[int]:
+        """Index positions of records saved in [start, end] (epoch seconds), oldest first"""
+        timestamps, positions = self._ensure_time_order()
+        low = 0 if start is None else bisect_left(timestamps, start)
+        high = len(timestamps) if end is None else bisect_right(timestamps, end)
+        return positions[low:high]
+
+    def iter_records(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Records saved in [start, end], oldest first"""
+        for position in self.find_by_time(start, end):
+            yield self.read_at(position)
+
+    def recent(self, limit: int = 20, department: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest records first, optionally for one department"""
+        results = []
+        with self._lock:
+            for _, _, segment, offset, length in reversed(self.entries()):
+                record = self.read_entry(segment, offset, length)
+                if department is None or record.get("department") == department:
+                    results.append(record)
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def index_view(self, latest_only: bool = False) -> "IndexView":
+        """
+        Memory-mapped view of the index as of now, for paging without reading
+        it whole; close it when done (compaction replaces the index file).
+        With ``latest_only`` the view skips entries superseded by a later save
+        of the same id.
+        """
+        with self._lock:
+            self._flush_buffers_locked()
+            return IndexView(self._index_path, self._ensure_live_positions() if latest_only else None)
+
+    def segments(self) -> List[str]:
+        """Segment file paths, oldest first"""
+        with self._lock:
+            return [self._segment_paths[number] for number in sorted(self._segment_paths)]
+
+    def segment_numbers(self) -> List[int]:
+        """Segment numbers, oldest first; the last one is being appended to"""
+        with self._lock:
+            return sorted(self._segment_paths)
+
+    # -------------------------------------------------------------- compaction
+
+    def rewrite_segments(
+        self,
+        numbers: List[int],
+        transform: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    ) -> Dict[str, int]:
+        """
+        Rewrite sealed segments into one new segment, passing every record
+        through ``transform`` (return None to drop it). The data is copied
+        without holding the lock; only the index swap blocks appends.
+        """
+        numbers = sorted(numbers)
+        with self._lock:
+            if not numbers or numbers[-1] >= self._segment_no:
+                raise ValueError("Only sealed segments can be rewritten")
+            targets = set(numbers)
+            entries = [entry for entry in self.entries() if entry[2] in targets]
+            sources = {number: self._segment_paths[number] for number in numbers}
+
+        # Sealed segments are immutable, so they can be read while appends continue
+        match = SEGMENT_PATTERN.match(os.path.basename(sources[numbers[0]]))
+        generation = int(match.group(3) or 0) + 1
+        last_day = SEGMENT_PATTERN.match(os.path.basename(sources[numbers[-1]])).group(2)
+        new_number = numbers[0]
+        new_path = os.path.join(self.directory, f"segment-{new_number:06d}-{last_day}-c{generation}.jsonl")
+        moved: Dict[Tuple[int, int], Tuple[float, int, int]] = {}
+        result = {"read": 0, "kept": 0, "dropped": 0, "bytes_before": 0, "bytes_after": 0}
+        with open(new_path, "wb") as out:
+            for _, saved_at, segment, offset, length in sorted(entries, key=lambda entry: (entry[2], entry[3])):
+                with open(sources[segment], "rb") as f:
+                    f.seek(offset)
+                    line = f.read(length)
+                result["read"] += 1
+                result["bytes_before"] += length
+                record = transform(json.loads(line))
+                if record is None:
+                    result["dropped"] += 1
+                    continue
+                line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                moved[(segment, offset)] = (saved_at, out.tell(), len(line))
+                out.write(line)
+                result["kept"] += 1
+                result["bytes_after"] += len(line)
+            out.flush()
+            os.fsync(out.fileno())
+
+        with self._lock:
+            self._flush_buffers_locked()
+            with open(self._index_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            temp_index = self._index_path + ".tmp"
+            with open(temp_index, "wb") as f:
+                for raw_id, saved_at, segment, offset, length in INDEX_ENTRY.iter_unpack(data[:usable]):
+                    if segment in targets:
+                        if (segment, offset) not in moved:
+                            continue
+                        saved_at, offset, length = moved[(segment, offset)]
+                        segment = new_number
+                    f.write(INDEX_ENTRY.pack(raw_id, saved_at, segment, offset, length))
+                f.flush()
+                os.fsync(f.fileno())
+            self._index_file.close()
+            os.replace(temp_index, self._index_path)
+            self._index_file = open(self._index_path, "ab")
+
+            for number, path in sources.items():
+                del self._segment_paths[number]
+            if moved:
+                self._segment_paths[new_number] = new_path
+            self._id_positions = None
+            self._live_positions = None
+            self._time_order = None
+            self.generation += 1
+
+        for path in sources.values():
+            os.remove(path)
+        if not moved:
+            os.remove(new_path)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Record count and on-disk size"""
+        segments = self.segments()
+        return {
+            "records": len(self),
+            "segments": len(segments),
+            "segment_bytes": sum(os.path.getsize(path) for path in segments),
+            "index_bytes": os.path.getsize(self._index_path)
+        }
+
+    # ---------------------------------------------------------------- internals
+
+    def _prepare(self, record: Dict[str, Any]) -> Tuple[str, float, bytes]:
+        record = dict(record)
+        record_id = record.get("id") or uuid.uuid4().hex
+        record["id"] = record_id
+        saved_at = record.setdefault("saved_at", datetime.now().isoformat())
+        try:
+            timestamp = datetime.fromisoformat(saved_at).timestamp()
+        except (TypeError, ValueError):
+            timestamp = time.time()
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        return record_id, timestamp, line
+
+    def _segment_path(self, number: int) -> str:
+        try:
+            return self._segment_paths[number]
+        except KeyError:
+            raise FileNotFoundError(f"History segment {number} not found")
+
+    def _new_segment_path(self, number: int, day: str) -> str:
+        path = os.path.join(self.directory, f"segment-{number:06d}-{day}.jsonl")
+        self._segment_paths[number] = path
+        return path
+
+    def _list_segments(self) -> List[Tuple[int, int, str]]:
+        found = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), int(match.group(3) or 0), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _open_active_segment(self) -> None:
+        if self._segment_paths:
+            self._segment_no = max(self._segment_paths)
+            path = self._segment_paths[self._segment_no]
+            self._segment_day = SEGMENT_PATTERN.match(os.path.basename(path)).group(2)
+        else:
+            self._segment_no = 1
+            self._segment_day = datetime.now().strftime("%Y%m%d")
+            path = self._new_segment_path(self._segment_no, self._segment_day)
+        self._segment_file = open(path, "ab")
+        self._segment_size = self._segment_file.tell()
+
+    def _rotate_if_needed_locked(self, incoming: int, timestamp: float) -> None:
+        day = datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
+        too_big = self._segment_size > 0 and self._segment_size + incoming > self.segment_max_bytes
+        new_day = self.rotate_daily and self._segment_size > 0 and day > self._segment_day
+        if not (too_big or new_day):
+            return
+        self._commit_locked()
+        self._segment_file.close()
+        self._segment_no += 1
+        self._segment_day = max(day, self._segment_day)
+        self._segment_file = open(self._new_segment_path(self._segment_no, self._segment_day), "ab")
+        self._segment_size = 0
+
+    def _flush_buffers_locked(self) -> None:
+        if not self._closed:
+            self._segment_file.flush()
+            self._index_file.flush()
+
+    def _commit_locked(self) -> None:
+        if self._committed_seq == self._written_seq:
+            self._last_commit = time.monotonic()
+            return
+        # Segment data first, so the index never points past durable data
+        self._segment_file.flush()
+        os.fsync(self._segment_file.fileno())
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+        self._committed_seq = self._written_seq
+        self._last_commit = time.monotonic()
+        self._committed.notify_all()
+
+    def _commit_loop(self) -> None:
+        while True:
+            time.sleep(self.commit_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                if time.monotonic() - self._last_commit >= self.commit_interval:
+                    self._commit_locked()
+
+    def _ensure_id_positions(self) -> Dict[bytes, int]:
+        positions = self._id_positions
+        if positions is None:
+            positions = {
+                bytes.fromhex(record_id): position
+                for position, (record_id, _, _, _, _) in enumerate(self.entries())
+            }
+            self._id_positions = positions
+        return positions
+
+    def _ensure_live_positions(self) -> List[int]:
+        positions = self._live_positions
+        if positions is None:
+            positions = sorted(self._ensure_id_positions().values())
+            self._live_positions = positions
+        return positions
+
+    def _ensure_time_order(self) -> Tuple[List[float], List[int]]:
+        order = self._time_order
+        if order is None:
+            # Migrated records can be older than live ones, so sort rather than assume
+            ranked = sorted((saved_at, position) for position, (_, saved_at, _, _, _) in enumerate(self.entries()))
+            order = ([saved_at for saved_at, _ in ranked], [position for _, position in ranked])
+            self._time_order = order
+        return order
+
+    def _recover(self) -> None:
+        """
+        Repair the tail after a crash: drop a torn index entry, index entries
+        pointing past segment data, and a torn final line; re-index complete
+        lines that made it to the segment but not to the index.
+        """
+        if not os.path.exists(self._index_path):
+            open(self._index_path, "wb").close()
+        if os.path.exists(self._index_path + ".tmp"):
+            os.remove(self._index_path + ".tmp")
+        with open(self._index_path, "r+b") as index:
+            data = index.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            entries = list(INDEX_ENTRY.iter_unpack(data[:usable]))
+            segments = self._resolve_segments(entries)
+            self._segment_paths = dict(segments)
+
+            valid = len(entries)
+            while valid > 0:
+                _, _, segment, offset, length = entries[valid - 1]
+                path = segments.get(segment)
+                if path is not None and os.path.getsize(path) >= offset + length:
+                    break
+                valid -= 1
+            index.truncate(valid * INDEX_ENTRY.size)
+
+            if not segments:
+                return
+            last_segment, last_path = max(segments.items())
+            indexed_end = 0
+            for _, _, segment, offset, length in entries[:valid]:
+                if segment == last_segment:
+                    indexed_end = max(indexed_end, offset + length)
+
+            with open(last_path, "r+b") as segment_file:
+                segment_file.seek(indexed_end)
+                tail = segment_file.read()
+                offset = indexed_end
+                index.seek(valid * INDEX_ENTRY.size)
+                for line in tail.splitlines(keepends=True):
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                        record_id = bytes.fromhex(record["id"])
+                        timestamp = datetime.fromisoformat(record["saved_at"]).timestamp()
+                    except (ValueError, KeyError, TypeError):
+                        break
+                    index.write(INDEX_ENTRY.pack(record_id, timestamp, last_segment, offset, len(line)))
+                    offset += len(line)
+                segment_file.truncate(offset)
+
+    def _resolve_segments(self, entries: List[tuple]) -> Dict[int, str]:
+        """
+        Pick one file per segment number. Two generations of the same number
+        only exist if compaction was interrupted; keep the one the index
+        points into (checked against its last entry) and delete the other.
+        """
+        by_number: Dict[int, List[Tuple[int, str]]] = {}
+        for number, generation, path in self._list_segments():
+            by_number.setdefault(number, []).append((generation, path))
+
+        last_entry = {}
+        for raw_id, _, segment, offset, length in entries:
+            last_entry[segment] = (raw_id, offset, length)
+
+        resolved = {}
+        for number, candidates in by_number.items():
+            candidates.sort(reverse=True)
+            chosen = candidates[0][1]
+            if len(candidates) > 1 and number in last_entry:
+                raw_id, offset, length = last_entry[number]
+                for _, path in candidates:
+                    if _line_matches(path, offset, length, raw_id):
+                        chosen = path
+                        break
+            for _, path in candidates:
+                if path != chosen:
+                    os.remove(path)
+            resolved[number] = chosen
+        return resolved
+
+
+class IndexView:
+    """
+    Read-only, memory-mapped view of an ``index.bin``.
+
+    Entries are fixed-width, so the record count is the file size divided by
+    the entry size and any page is a slice of the mapping: opening the view
+    and reading a page take the same time however long the history is.
+    Records appended after the view was opened are not visible. Given
+    ``positions`` (ascending index positions, e.g. the latest entry of each
+    id), the view pages and counts only those.
+    """
+
+    def __init__(self, path: str, positions: Optional[List[int]] = None):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._count = size // INDEX_ENTRY.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._count else None
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return self._count if self._positions is None else len(self._positions)
+
+    def __enter__(self) -> "IndexView":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def entry(self, position: int) -> Tuple[str, float, int, int, int]:
+        """(id, saved_at, segment, offset, length) of the entry at ``position`` (append order)"""
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        raw_id, saved_at, segment, offset, length = INDEX_ENTRY.unpack_from(self._map, position * INDEX_ENTRY.size)
+        return raw_id.hex(), saved_at, segment, offset, length
+
+    def page(self, number: int, size: int = 20, newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Entries of page ``number`` (0-based) as dicts with their index position"""
+        total = len(self)
+        if newest_first:
+            end = total - number * size
+            slots = range(end - 1, max(end - size, 0) - 1, -1)
+        else:
+            slots = range(number * size, min((number + 1) * size, total))
+        page = []
+        for slot in slots:
+            if not 0 <= slot < total:
+                continue
+            position = slot if self._positions is None else self._positions[slot]
+            record_id, saved_at, segment, offset, length = self.entry(position)
+            page.append({
+                "position": position,
+                "id": record_id,
+                "saved_at": datetime.fromtimestamp(saved_at).isoformat(),
+                "segment": segment,
+                "offset": offset,
+                "length": length
+            })
+        return page
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def _line_matches(path: str, offset: int, length: int, raw_id: bytes) -> bool:
+    """Whether ``path`` holds the record ``raw_id`` at ``offset``"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length)).get("id") == raw_id.hex()
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+_shared_logs: Dict[str, HistoryLog] = {}
+_shared_lock = threading.Lock()
+
+
+def get_history_log(directory: str = None) -> HistoryLog:
+    """Process-wide log for ``directory`` (defaults to Config.HISTORY_LOG_DIR)"""
+    from config import Config
+
+    directory = directory or Config.HISTORY_LOG_DIR
+    with _shared_lock:
+        log = _shared_logs.get(directory)
+        if log is None:
+            log = HistoryLog(
+                directory,
+                segment_max_bytes=Config.HISTORY_SEGMENT_MAX_BYTES,
+                rotate_daily=Config.HISTORY_ROTATE_DAILY,
+                group_commit_size=Config.HISTORY_GROUP_COMMIT_SIZE,
+                commit_interval=Config.HISTORY_COMMIT_INTERVAL
+            )
+            _shared_logs[directory] = log
+        return log
+
+
+def legacy_record_id(filename: str) -> str:
+    """Deterministic record id for a legacy per-file history entry"""
+    return uuid.uuid5(LEGACY_NAMESPACE, os.path.basename(filename)).hex
+
+
+def migrate_legacy_history(source_dir: str, log: HistoryLog) -> Dict[str, int]:
+    """
+    Import the old one-JSON-file-per-prompt history into the log.
+    Files already imported (same file name) are skipped, so re-running is safe.
+    """
+    existing = {record_id for record_id, _, _, _, _ in log.entries()}
+    result = {"imported": 0, "skipped": 0, "failed": 0}
+    paths = sorted(glob.glob(os.path.join(source_dir, "*.json")), key=os.path.getmtime)
+    batch = []
+    for path in paths:
+        record_id = legacy_record_id(path)
+        if record_id in existing:
+            result["skipped"] += 1
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            result["failed"] += 1
+            continue
+        if not isinstance(record, dict):
+            result["failed"] += 1
+            continue
+        record["id"] = record_id
+        record.setdefault("saved_at", datetime.fromtimestamp(os.path.getmtime(path)).isoformat())
+        record["legacy_file"] = os.path.basename(path)
+        batch.append(record)
+        if len(batch) >= 500:
+            log.append_many(batch)
+            result["imported"] += len(batch)
+            batch = []
+    if batch:
+        log.append_many(batch)
+        result["imported"] += len(batch)
+    log.flush()
+    return result
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: migrate legacy history or show log statistics"""
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Prompt history log tools")
+    parser.add_argument("--log-dir", default=Config.HISTORY_LOG_DIR, help="history log directory")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate = subcommands.add_parser("migrate", help="import legacy per-file JSON history")
+    migrate.add_argument("--source", default=Config.HISTORY_DIR, help="directory with legacy *.json files")
+    subcommands.add_parser("stats", help="show record count and size")
+    args = parser.parse_args(argv)
+
+    log = get_history_log(args.log_dir)
+    if args.command == "migrate":
+        result = migrate_legacy_history(args.source, log)
+        print(f"✅ Imported {result['imported']} records ({result['skipped']} already present, {result['failed']} unreadable)")
+    print(json.dumps(log.stats(), indent=2))
+    log.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
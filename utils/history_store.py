@@ -0,0 +1,877 @@
+"""
+Queryable prompt history for AI Prompt Generator
+SQLite backend with department/time indexes, FTS5 keyword search and deduplicated, compressed texts
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from utils.history_codec import HistoryCodec, build_preset_dictionary, dictionary_digest
+from utils.history_compaction import summarize_record, trim_record
+
+# Key under which a stored record lists the blobs it references
+BLOB_REFS_KEY = "_blobs"
+
+# Characters of the request and final prompt kept uncompressed for list results
+PREVIEW_CHARS = 200
+
+# Bumped when the table layout changes; older databases are migrated on open
+SCHEMA_VERSION = 5
+# Databases older than this are rebuilt record by record; newer ones are altered in place
+REBUILD_BELOW_VERSION = 3
+
+# Record fields stored once per distinct text in history_blobs and referenced by hash,
+# in pipeline order: each new blob is compressed against the record's previous one
+BLOB_FIELDS = [
+    "user_input",
+    "original_request",
+    "analysis",
+    "structure",
+    "enhanced",
+    "generated_prompt",
+    "final_prompt"
+]
+
+
+class SQLiteHistoryStore:
+    """
+    Prompt history in SQLite (WAL mode), content-addressed.
+
+    Stage texts (request, analysis, structure, enhanced and final prompt)
+    live once per distinct text in ``history_blobs``, keyed by SHA-256 and
+    compressed (see ``utils.history_codec``); a record keeps its metadata
+    plus the hashes it references. A new blob is compressed against the
+    previous stage's blob of the same record (its ``base``), which it holds
+    a reference on. Blobs are reference counted: saving a text that already
+    exists only bumps its count, deleting a record drops the counts, and
+    ``collect_garbage`` removes blobs nobody references.
+
+    The table also keeps the columns needed to list and filter records,
+    short title/preview strings, and a hash of the normalized request for
+    O(1) "seen this request before" lookups. ``original_request`` and
+    ``final_prompt`` are indexed by a contentless FTS5 table.
+    """
+
+    def __init__(self, path: str, compression: str = "zlib"):
+        self.path = path
+        self.compression = compression
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        legacy = version < REBUILD_BELOW_VERSION and self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'prompt_history'"
+        ).fetchone()
+        if legacy:
+            self._conn.executescript(
+                """
+                DROP TRIGGER IF EXISTS prompt_history_ai;
+                DROP TRIGGER IF EXISTS prompt_history_ad;
+                DROP TRIGGER IF EXISTS prompt_history_au;
+                DROP TABLE IF EXISTS prompt_history_fts;
+                DROP INDEX IF EXISTS idx_prompt_history_department;
+                DROP INDEX IF EXISTS idx_prompt_history_saved_at;
+                ALTER TABLE prompt_history RENAME TO prompt_history_old;
+                """
+            )
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS prompt_history (
+                seq INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                saved_at REAL NOT NULL,
+                department TEXT,
+                status TEXT,
+                request_hash TEXT,
+                title TEXT NOT NULL DEFAULT '',
+                preview TEXT NOT NULL DEFAULT '',
+                record BLOB NOT NULL,
+                rolled_up INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_prompt_history_department ON prompt_history(department, saved_at);
+            CREATE INDEX IF NOT EXISTS idx_prompt_history_saved_at ON prompt_history(saved_at);
+            CREATE INDEX IF NOT EXISTS idx_prompt_history_request ON prompt_history(request_hash, saved_at);
+
+            CREATE TABLE IF NOT EXISTS history_blobs (
+                hash TEXT PRIMARY KEY,
+                refs INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                base TEXT
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_history_blobs_unreferenced ON history_blobs(refs) WHERE refs <= 0;
+
+            CREATE VIRTUAL TABLE IF NOT EXISTS prompt_history_fts USING fts5(
+                original_request, final_prompt, content='', tokenize='porter unicode61'
+            );
+
+            CREATE TABLE IF NOT EXISTS history_dictionaries (
+                id INTEGER PRIMARY KEY,
+                digest TEXT NOT NULL UNIQUE,
+                data BLOB NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS history_rollups (
+                day TEXT NOT NULL,
+                department TEXT NOT NULL,
+                records INTEGER NOT NULL,
+                questions INTEGER NOT NULL,
+                bytes INTEGER NOT NULL,
+                PRIMARY KEY (day, department)
+            ) WITHOUT ROWID;
+            """
+        )
+        if version == 3:
+            self._conn.execute("ALTER TABLE prompt_history ADD COLUMN rolled_up INTEGER NOT NULL DEFAULT 0")
+        if REBUILD_BELOW_VERSION <= version < 5:
+            # Blobs written before delta compression have no base
+            self._conn.execute("ALTER TABLE history_blobs ADD COLUMN base TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_prompt_history_pending_rollup ON prompt_history(saved_at) WHERE rolled_up = 0"
+        )
+        self._codec = self._load_codec()
+        if legacy:
+            self._migrate_old()
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # ------------------------------------------------------------------ writes
+
+    def append(self, record: Dict[str, Any], durable: bool = False) -> str:
+        """Insert (or replace, by id) a record and return its id"""
+        return self.append_many([record])[0]
+
+    def append_many(self, records: Iterable[Dict[str, Any]], durable: bool = False) -> List[str]:
+        """Insert records in a single transaction"""
+        prepared = [self._prepare(record) for record in records]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._write_locked(prepared)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [record_id for record_id, _, _, _ in prepared]
+
+    def delete(self, record_id: str) -> bool:
+        """Remove a record and release its texts; returns whether it existed"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                existing = self._conn.execute(
+                    "SELECT seq, record FROM prompt_history WHERE id = ?", (record_id,)
+                ).fetchone()
+                if existing is not None:
+                    seq, old_record = existing
+                    self._drop_record_refs(seq, old_record)
+                    self._conn.execute("DELETE FROM prompt_history WHERE seq = ?", (seq,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return existing is not None
+
+    def collect_garbage(self, batch_size: int = 500) -> int:
+        """
+        Delete up to ``batch_size`` blobs no record references any more;
+        returns how many were removed (call again until it returns 0)
+        """
+        removed = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                while removed < batch_size:
+                    rows = self._conn.execute(
+                        "SELECT hash, base FROM history_blobs WHERE refs <= 0 LIMIT ?", (batch_size - removed,)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    self._conn.executemany("DELETE FROM history_blobs WHERE hash = ?", [(digest,) for digest, _ in rows])
+                    # Releasing a base can leave it unreferenced too
+                    self._conn.executemany(
+                        "UPDATE history_blobs SET refs = refs - 1 WHERE hash = ?", [(base,) for _, base in rows if base]
+                    )
+                    removed += len(rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def roll_up(self, before: float, batch_size: int = 200) -> int:
+        """
+        Fold up to ``batch_size`` records saved before ``before`` into the
+        per-day rollups and trim them to their final prompt; returns how many
+        were processed (0 once nothing is left)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM prompt_history WHERE rolled_up = 0 AND saved_at < ? ORDER BY saved_at LIMIT ?",
+                (before, batch_size)
+            ).fetchall()
+            if not rows:
+                return 0
+            records = [self._expand(row[0]) for row in rows]
+            prepared = [self._prepare(trim_record(record)) for record in records]
+            self._conn.execute("BEGIN")
+            try:
+                self._add_rollups_locked(records)
+                self._write_locked(prepared)
+                # Kept texts stop depending on the dropped stages, so those can be collected
+                for _, _, _, blobs in prepared:
+                    self._detach_locked(set(blobs))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return len(rows)
+
+    def delete_before(self, before: Optional[float], batch_size: int = 200) -> int:
+        """
+        Delete up to ``batch_size`` of the oldest records (all records saved
+        before ``before``, or simply the oldest when it is None), counting
+        them in the rollups first; returns how many were deleted
+        """
+        query = "SELECT seq, record, rolled_up FROM prompt_history"
+        params: List[Any] = []
+        if before is not None:
+            query += " WHERE saved_at < ?"
+            params.append(before)
+        query += " ORDER BY saved_at LIMIT ?"
+        params.append(batch_size)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            if not rows:
+                return 0
+            self._conn.execute("BEGIN")
+            try:
+                self._add_rollups_locked([self._expand(record) for _, record, rolled_up in rows if not rolled_up])
+                for seq, record, _ in rows:
+                    self._drop_record_refs(seq, record)
+                self._conn.executemany("DELETE FROM prompt_history WHERE seq = ?", [(seq,) for seq, _, _ in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return len(rows)
+
+    def storage_bytes(self) -> int:
+        """Bytes held by records and text blobs (what retention by size limits)"""
+        with self._lock:
+            return self._conn.execute(
+                """
+                SELECT (SELECT COALESCE(SUM(LENGTH(record)), 0) FROM prompt_history)
+                     + (SELECT COALESCE(SUM(LENGTH(data)), 0) FROM history_blobs WHERE refs > 0)
+                """
+            ).fetchone()[0]
+
+    def rollups(self, start_day: Optional[str] = None, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-day, per-department aggregates of rolled-up and deleted records"""
+        query = "SELECT day, department, records, questions, bytes FROM history_rollups"
+        conditions, params = [], []
+        if start_day is not None:
+            conditions.append("day >= ?")
+            params.append(start_day)
+        if end_day is not None:
+            conditions.append("day <= ?")
+            params.append(end_day)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY day, department"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {"day": day, "department": department, "records": records, "questions": questions, "bytes": size}
+            for day, department, records, questions, size in rows
+        ]
+
+    def checkpoint(self) -> None:
+        """Fold the WAL back into the database file so freed pages can be reused"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def flush(self) -> None:
+        """Writes are committed immediately; kept for interface parity with the log"""
+
+    def close(self) -> None:
+        """Close the connection"""
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------- reads
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Full record by id"""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM prompt_history WHERE id = ?", (record_id,)).fetchone()
+            return self._expand(row[0]) if row else None
+
+    def iter_records(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Every full record in insertion order, read in batches so appends are not blocked"""
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, record FROM prompt_history WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size)
+                ).fetchall()
+                records = [self._expand(record) for _, record in rows]
+            if not rows:
+                return
+            last_seq = rows[-1][0]
+            yield from records
+
+    def find_by_request(self, request: str, department: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Latest record for the same request (case and whitespace ignored),
+        as a summary, or None if it was never seen. One index probe.
+        """
+        query = f"SELECT {_SUMMARY_COLUMNS} FROM prompt_history h WHERE h.request_hash = ?"
+        params: List[Any] = [request_key(request)]
+        if department is not None:
+            query += " AND h.department = ?"
+            params.append(department)
+        query += " ORDER BY h.saved_at DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return _summary(row) if row else None
+
+    def recent(
+        self,
+        limit: int = 20,
+        department: Optional[str] = None,
+        before: Optional[Tuple[float, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest summaries first. Pass the last item's ``(saved_ts, seq)`` as
+        ``before`` to fetch the next page without an OFFSET scan; ``seq``
+        breaks ties, so records saved in the same instant are not skipped.
+        """
+        query = f"SELECT {_SUMMARY_COLUMNS} FROM prompt_history h"
+        conditions, params = [], []
+        if department is not None:
+            conditions.append("h.department = ?")
+            params.append(department)
+        if before is not None:
+            conditions.append("(h.saved_at, h.seq) < (?, ?)")
+            params.extend(before)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY h.saved_at DESC, h.seq DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [_summary(row) for row in rows]
+
+    def search(
+        self,
+        keywords: str,
+        department: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        order: str = "relevance"
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyword search over original requests and final prompts, best match
+        first (or newest first with ``order="recent"``, which stops after
+        ``limit`` matches instead of ranking all of them). The last word is
+        matched as a prefix so results follow typing.
+        """
+        match = fts_query(keywords)
+        if not match:
+            return []
+        query = (
+            f"SELECT {_SUMMARY_COLUMNS}, h.record "
+            "FROM prompt_history_fts JOIN prompt_history h ON h.seq = prompt_history_fts.rowid "
+            "WHERE prompt_history_fts MATCH ?"
+        )
+        params: List[Any] = [match]
+        if department is not None:
+            query += " AND h.department = ?"
+            params.append(department)
+        if order == "recent":
+            query += " ORDER BY prompt_history_fts.rowid DESC LIMIT ? OFFSET ?"
+        else:
+            query += " ORDER BY bm25(prompt_history_fts) LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        results = []
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            for row in rows:
+                summary = _summary(row[:-1])
+                original_request, final_prompt = _texts(self._expand(row[-1]))
+                summary["snippet"] = make_snippet(original_request + "\n" + final_prompt, keywords)
+                results.append(summary)
+        return results
+
+    def count(self, department: Optional[str] = None) -> int:
+        """Number of records, optionally for one department"""
+        with self._lock:
+            if department is None:
+                return self._conn.execute("SELECT COUNT(*) FROM prompt_history").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM prompt_history WHERE department = ?", (department,)
+            ).fetchone()[0]
+
+    def departments(self) -> List[str]:
+        """Departments that have saved prompts"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT department FROM prompt_history WHERE department IS NOT NULL ORDER BY department"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Record count, deduplication and database size"""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        wal = self.path + "-wal"
+        with self._lock:
+            record_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(record)), 0) FROM prompt_history"
+            ).fetchone()[0]
+            blobs, unique_bytes, referenced_bytes, blob_bytes, garbage = self._conn.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(size * MAX(refs, 0)), 0),
+                       COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(refs <= 0), 0)
+                FROM history_blobs
+                """
+            ).fetchone()
+        return {
+            "records": self.count(),
+            "record_bytes": record_bytes,
+            "blobs": blobs,
+            "unreferenced_blobs": garbage,
+            "text_bytes_referenced": referenced_bytes,
+            "text_bytes_unique": unique_bytes,
+            "blob_bytes": blob_bytes,
+            "dedup_ratio": round(referenced_bytes / unique_bytes, 2) if unique_bytes else 0.0,
+            "db_bytes": size,
+            "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0,
+            "compression": self.compression
+        }
+
+    def compression_report(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compare the stored size (records plus the texts they reference) with
+        the uncompressed JSON, and time how long reading a full record costs
+        """
+        query = "SELECT record FROM prompt_history ORDER BY seq DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = [row[0] for row in self._conn.execute(query)]
+
+        stored_bytes = raw_bytes = 0
+        blob_sizes: Dict[str, int] = {}
+        read_us = []
+        for value in rows:
+            started = time.perf_counter()
+            with self._lock:
+                record = self._expand(value)
+            read_us.append((time.perf_counter() - started) * 1e6)
+            raw_bytes += len(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            stored_bytes += len(value)
+            blob_sizes.update(self._blob_sizes(self._codec.decode(value).get(BLOB_REFS_KEY, {}).values()))
+        stored_bytes += sum(blob_sizes.values())
+
+        return {
+            "records": len(rows),
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else 0.0,
+            "read_us_p50": round(_percentile(read_us, 50), 1),
+            "read_us_p95": round(_percentile(read_us, 95), 1)
+        }
+
+    # ---------------------------------------------------------------- internals
+
+    def _prepare(self, record: Dict[str, Any]) -> tuple:
+        record = dict(record)
+        record["id"] = record.get("id") or uuid.uuid4().hex
+        saved_at = record.setdefault("saved_at", datetime.now().isoformat())
+        try:
+            timestamp = datetime.fromisoformat(saved_at).timestamp()
+        except (TypeError, ValueError):
+            timestamp = time.time()
+        original_request, final_prompt = _texts(record)
+
+        # Swap stage texts for references to shared blobs, each with the previous distinct text as its base
+        blobs: Dict[str, tuple] = {}
+        refs: Dict[str, str] = {}
+        base: Optional[tuple] = None
+        for field in BLOB_FIELDS:
+            text = record.get(field)
+            if isinstance(text, str) and text:
+                digest = blob_hash(text)
+                if digest not in blobs:
+                    blobs[digest] = (text,) + (base or (None, None))
+                    base = (digest, text)
+                refs[field] = digest
+                del record[field]
+        record[BLOB_REFS_KEY] = refs
+
+        if self.compression == "none":
+            stored = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        else:
+            stored = self._codec.encode(record)
+        row = (
+            timestamp,
+            record.get("department"),
+            record.get("status"),
+            request_key(original_request) if original_request else None,
+            original_request[:PREVIEW_CHARS],
+            final_prompt[:PREVIEW_CHARS],
+            stored,
+            1 if record.get("rolled_up") else 0
+        )
+        return record["id"], row, (original_request, final_prompt), blobs
+
+    def _write_locked(self, prepared: List[tuple]) -> None:
+        """Insert or replace prepared records inside the caller's transaction"""
+        for record_id, row, texts, blobs in prepared:
+            for digest, (text, base, base_text) in blobs.items():
+                self._add_ref(digest, text, base, base_text)
+            existing = self._conn.execute(
+                "SELECT seq, record FROM prompt_history WHERE id = ?", (record_id,)
+            ).fetchone()
+            if existing is None:
+                cursor = self._conn.execute(
+                    """
+                    INSERT INTO prompt_history
+                        (id, saved_at, department, status, request_hash, title, preview, record, rolled_up)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (record_id,) + row
+                )
+                seq = cursor.lastrowid
+            else:
+                seq, old_record = existing
+                self._drop_record_refs(seq, old_record)
+                self._conn.execute(
+                    """
+                    UPDATE prompt_history SET saved_at = ?, department = ?, status = ?,
+                        request_hash = ?, title = ?, preview = ?, record = ?, rolled_up = ?
+                    WHERE seq = ?
+                    """,
+                    row + (seq,)
+                )
+            self._conn.execute(
+                "INSERT INTO prompt_history_fts(rowid, original_request, final_prompt) VALUES (?, ?, ?)",
+                (seq,) + texts
+            )
+
+    def _add_rollups_locked(self, records: List[Dict[str, Any]]) -> None:
+        totals: Dict[tuple, List[int]] = {}
+        for record in records:
+            day, department, questions, size = summarize_record(record)
+            counts = totals.setdefault((day, department), [0, 0, 0])
+            counts[0] += 1
+            counts[1] += questions
+            counts[2] += size
+        self._conn.executemany(
+            """
+            INSERT INTO history_rollups (day, department, records, questions, bytes) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(day, department) DO UPDATE SET records = records + excluded.records,
+                questions = questions + excluded.questions, bytes = bytes + excluded.bytes
+            """,
+            [key + tuple(counts) for key, counts in totals.items()]
+        )
+
+    def _add_ref(self, digest: str, text: str, base: Optional[str] = None, base_text: Optional[str] = None) -> None:
+        """
+        Reference a text blob, writing it only the first time it is seen;
+        a new blob is compressed against ``base`` (already written) and holds a reference on it
+        """
+        cursor = self._conn.execute("UPDATE history_blobs SET refs = refs + 1 WHERE hash = ?", (digest,))
+        if cursor.rowcount:
+            return
+        if self.compression == "none":
+            data, base = text, None
+        else:
+            data = self._codec.encode_text(text, base_text)
+        self._conn.execute(
+            "INSERT INTO history_blobs (hash, refs, size, data, base) VALUES (?, 1, ?, ?, ?)",
+            (digest, len(text.encode("utf-8")), data, base)
+        )
+        if base is not None:
+            self._conn.execute("UPDATE history_blobs SET refs = refs + 1 WHERE hash = ?", (base,))
+
+    def _detach_locked(self, digests: Set[str]) -> None:
+        """
+        Re-encode the blobs among ``digests`` whose base is not among them
+        without a base, and release that base (inside the caller's transaction)
+        """
+        if not digests:
+            return
+        rows = self._conn.execute(
+            f"SELECT hash, base FROM history_blobs WHERE base IS NOT NULL AND hash IN ({','.join('?' for _ in digests)})",
+            list(digests)
+        ).fetchall()
+        rows = [(digest, base) for digest, base in rows if base not in digests]
+        texts = self._blob_texts([digest for digest, _ in rows])
+        for digest, base in rows:
+            self._conn.execute(
+                "UPDATE history_blobs SET data = ?, base = NULL WHERE hash = ?",
+                (self._codec.encode_text(texts[digest]), digest)
+            )
+            self._conn.execute("UPDATE history_blobs SET refs = refs - 1 WHERE hash = ?", (base,))
+
+    def _blob_texts(self, digests: Iterable[str]) -> Dict[str, str]:
+        """Decoded texts of blobs, loading the bases they were compressed against"""
+        rows: Dict[str, tuple] = {}
+        pending = set(digests)
+        while pending:
+            placeholders = ",".join("?" for _ in pending)
+            fetched = self._conn.execute(
+                f"SELECT hash, data, base FROM history_blobs WHERE hash IN ({placeholders})", list(pending)
+            ).fetchall()
+            rows.update((digest, (data, base)) for digest, data, base in fetched)
+            pending = {base for _, base in rows.values() if base and base not in rows}
+
+        texts: Dict[str, str] = {}
+
+        def text(digest: str) -> str:
+            if digest not in texts:
+                data, base = rows[digest]
+                texts[digest] = self._codec.decode_text(data, text(base) if base else None)
+            return texts[digest]
+
+        return {digest: text(digest) for digest in rows}
+
+    def _drop_record_refs(self, seq: int, stored: Any) -> None:
+        """Remove a record's terms from the FTS index and release its blobs"""
+        record = self._expand(stored)
+        self._conn.execute(
+            "INSERT INTO prompt_history_fts(prompt_history_fts, rowid, original_request, final_prompt) "
+            "VALUES ('delete', ?, ?, ?)",
+            (seq,) + _texts(record)
+        )
+        refs = self._codec.decode(stored).get(BLOB_REFS_KEY, {})
+        # One reference per distinct text, as _prepare counted them
+        self._conn.executemany(
+            "UPDATE history_blobs SET refs = refs - 1 WHERE hash = ?",
+            [(digest,) for digest in set(refs.values())]
+        )
+
+    def _expand(self, stored: Any) -> Dict[str, Any]:
+        """Decode a stored record and inline the texts it references"""
+        record = self._codec.decode(stored)
+        refs = record.pop(BLOB_REFS_KEY, None)
+        if refs:
+            texts = self._blob_texts(set(refs.values()))
+            for field, digest in refs.items():
+                record[field] = texts[digest]
+        return record
+
+    def _blob_sizes(self, digests: Iterable[str]) -> Dict[str, int]:
+        digests = list(digests)
+        if not digests:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash, LENGTH(data) FROM history_blobs WHERE hash IN ({','.join('?' for _ in digests)})",
+                digests
+            ).fetchall()
+        return dict(rows)
+
+    def _load_codec(self) -> HistoryCodec:
+        """Register the current preset dictionary and load every dictionary ever used"""
+        dictionary = build_preset_dictionary()
+        self._conn.execute(
+            "INSERT OR IGNORE INTO history_dictionaries (digest, data) VALUES (?, ?)",
+            (dictionary_digest(dictionary), dictionary)
+        )
+        rows = self._conn.execute("SELECT id, digest, data FROM history_dictionaries").fetchall()
+        current = next(row[0] for row in rows if row[1] == dictionary_digest(dictionary))
+        return HistoryCodec({row[0]: row[2] for row in rows}, current)
+
+    def _migrate_old(self, batch_size: int = 1000) -> None:
+        """Move records from an earlier schema (full records inline, plain or compressed) to this one"""
+        last_seq = 0
+        while True:
+            rows = self._conn.execute(
+                "SELECT seq, record FROM prompt_history_old WHERE seq > ? ORDER BY seq LIMIT ?",
+                (last_seq, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            last_seq = rows[-1][0]
+            self.append_many([self._codec.decode(record) for _, record in rows])
+        self._conn.execute("DROP TABLE prompt_history_old")
+
+
+_SUMMARY_COLUMNS = "h.id, h.saved_at, h.department, h.status, h.title, h.preview, h.seq"
+
+
+def fts_query(keywords: str) -> str:
+    """Turn free text into a safe FTS5 query: every word quoted, the last one as a prefix"""
+    words = [word.replace('"', '""') for word in keywords.split()]
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def make_snippet(text: str, keywords: str, context: int = 60) -> str:
+    """Short excerpt around the first keyword match, matches in bold"""
+    words = [re.escape(word) for word in keywords.split()]
+    if not words:
+        return text[:context * 2]
+    pattern = re.compile("|".join(words), re.IGNORECASE)
+    found = pattern.search(text)
+    start = max(found.start() - context, 0) if found else 0
+    end = min((found.end() if found else 0) + context, len(text))
+    excerpt = " ".join(text[start:end].split())
+    excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", excerpt)
+    return ("…" if start > 0 else "") + excerpt + ("…" if end < len(text) else "")
+
+
+def _texts(record: Dict[str, Any]) -> tuple:
+    """(original request, final prompt) under current or legacy field names"""
+    return (
+        record.get("original_request") or record.get("user_input") or "",
+        record.get("final_prompt") or record.get("generated_prompt") or ""
+    )
+
+
+def blob_hash(text: str) -> str:
+    """Content address of a stage text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def request_key(request: str) -> str:
+    """Lookup key for a request: case and whitespace differences do not matter"""
+    return hashlib.sha256(" ".join(request.lower().split()).encode("utf-8")).hexdigest()
+
+
+def _summary(row: tuple) -> Dict[str, Any]:
+    record_id, saved_ts, department, status, title, preview, seq = row
+    return {
+        "id": record_id,
+        "saved_at": datetime.fromtimestamp(saved_ts).isoformat(),
+        "saved_ts": saved_ts,
+        "seq": seq,
+        "department": department,
+        "status": status,
+        "original_request": title,
+        "preview": preview
+    }
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def open_history_store(kind: str, path: str = None):
+    """
+    Create the configured history backend: "sqlite" (default, searchable)
+    or "log" (append-only JSONL segments)
+    """
+    from config import Config
+    from utils.history_log import get_history_log
+
+    kind = (kind or "sqlite").lower()
+    if kind == "sqlite":
+        return SQLiteHistoryStore(path or Config.HISTORY_DB_PATH, compression=Config.HISTORY_COMPRESSION)
+    if kind == "log":
+        return get_history_log(path)
+    raise ValueError(f"Unknown history backend: {kind}")
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_history_store():
+    """Process-wide history backend selected by Config.HISTORY_BACKEND"""
+    global _shared_store
+    from config import Config
+
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = open_history_store(Config.HISTORY_BACKEND)
+        return _shared_store
+
+
+def import_history_log(log, store: SQLiteHistoryStore, batch_size: int = 1000) -> int:
+    """Copy every record of a history log into the store (re-running updates in place)"""
+    imported = 0
+    batch = []
+    for _, _, segment, offset, length in log.entries():
+        batch.append(log.read_entry(segment, offset, length))
+        if len(batch) >= batch_size:
+            imported += len(store.append_many(batch))
+            batch = []
+    if batch:
+        imported += len(store.append_many(batch))
+    return imported
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: import the JSONL log, search, report compression, collect garbage, or show statistics"""
+    from config import Config
+    from utils.history_analytics import get_history_analytics
+    from utils.history_log import get_history_log
+
+    parser = argparse.ArgumentParser(description="Prompt history store tools")
+    parser.add_argument("--db", default=Config.HISTORY_DB_PATH, help="history database path")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    importer = subcommands.add_parser("import-log", help="import records from the JSONL history log")
+    importer.add_argument("--log-dir", default=Config.HISTORY_LOG_DIR, help="history log directory")
+    search = subcommands.add_parser("search", help="keyword search")
+    search.add_argument("keywords")
+    search.add_argument("--department")
+    search.add_argument("--limit", type=int, default=10)
+    report = subcommands.add_parser("report", help="compression ratio and read cost")
+    report.add_argument("--limit", type=int, help="only the newest N records")
+    subcommands.add_parser("gc", help="delete text blobs no record references")
+    subcommands.add_parser("stats", help="show record count and size")
+    args = parser.parse_args(argv)
+
+    store = SQLiteHistoryStore(args.db, compression=Config.HISTORY_COMPRESSION)
+    if args.command == "import-log":
+        log = get_history_log(args.log_dir)
+        print(f"✅ Imported {import_history_log(log, store)} records")
+        log.close()
+        print(f"✅ Rebuilt analytics from {get_history_analytics().rebuild(store.iter_records())} records")
+    elif args.command == "search":
+        for result in store.search(args.keywords, department=args.department, limit=args.limit):
+            print(f"{result['saved_at']}  {result['department'] or '-'}  {result['id']}\n    {result['snippet']}")
+    elif args.command == "report":
+        print(json.dumps(store.compression_report(limit=args.limit), indent=2))
+    elif args.command == "gc":
+        removed = total = store.collect_garbage()
+        while removed:
+            removed = store.collect_garbage()
+            total += removed
+        print(f"✅ Removed {total} unreferenced blobs")
+    print(json.dumps(store.stats(), indent=2))
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,311 @@
+"""
+Bulk history import/export for AI Prompt Generator
+Parses archives of JSON files on a process pool and streams validated records into a history backend in batches
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.history_log import legacy_record_id
+
+# Fields every importable record has at least one of
+REQUEST_FIELDS = ("original_request", "user_input")
+PROMPT_FIELDS = ("final_prompt", "generated_prompt")
+
+# Expected types of the fields the app reads; other fields are carried over untouched
+FIELD_TYPES = {
+    "id": str,
+    "saved_at": str,
+    "department": (str, type(None)),
+    "status": str,
+    "original_request": str,
+    "user_input": str,
+    "final_prompt": str,
+    "generated_prompt": str,
+    "analysis": str,
+    "structure": str,
+    "enhanced": str,
+    "total_questions": int,
+    "user_answers": dict,
+    "stage_ms": dict
+}
+
+# Record ids are uuid hex, which the log backend packs into its binary index
+RECORD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Progress file kept next to the source, listing files (and JSONL "<file>:<line>" marks) already imported
+PROGRESS_SUFFIX = ".import-progress"
+
+
+def validate_record(record: Any) -> List[str]:
+    """Schema problems with a history record (empty when it is valid)"""
+    if not isinstance(record, dict):
+        return ["record is not a JSON object"]
+    errors = []
+    if not any(isinstance(record.get(field), str) and record[field].strip() for field in REQUEST_FIELDS):
+        errors.append("missing original_request/user_input")
+    if not any(isinstance(record.get(field), str) and record[field].strip() for field in PROMPT_FIELDS):
+        errors.append("missing final_prompt/generated_prompt")
+    for field, expected in FIELD_TYPES.items():
+        if field in record and not isinstance(record[field], expected):
+            errors.append(f"{field} has type {type(record[field]).__name__}")
+    if isinstance(record.get("id"), str) and not RECORD_ID.match(record["id"]):
+        errors.append("id is not a 32-character hex uuid")
+    if isinstance(record.get("total_questions"), bool):
+        errors.append("total_questions has type bool")
+    if isinstance(record.get("saved_at"), str):
+        try:
+            datetime.fromisoformat(record["saved_at"])
+        except ValueError:
+            errors.append("saved_at is not an ISO timestamp")
+    return errors
+
+
+def parse_history_file(path: str) -> Tuple[str, Optional[Dict[str, Any]], List[str]]:
+    """
+    Read and validate one pretty-printed history file (runs in a worker
+    process); returns (path, record or None, errors)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError) as e:
+        return path, None, [f"unreadable: {e}"]
+    errors = validate_record(record)
+    if errors:
+        return path, None, errors
+    record.setdefault("id", legacy_record_id(path))
+    record.setdefault("saved_at", datetime.fromtimestamp(os.path.getmtime(path)).isoformat())
+    record.setdefault("legacy_file", os.path.basename(path))
+    return path, record, []
+
+
+def _parse_jsonl(path: str, after_line: int = 0) -> Iterator[Tuple[str, Optional[Dict[str, Any]], List[str]]]:
+    """
+    Records of an exported JSONL file, one per line, starting after line
+    ``after_line``; a record without an id gets one derived from its file and line
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if number <= after_line or not line.strip():
+                continue
+            source = f"{path}:{number}"
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield source, None, [f"unreadable: {e}"]
+                continue
+            errors = validate_record(record)
+            if errors:
+                yield source, None, errors
+                continue
+            record.setdefault("id", legacy_record_id(source))
+            yield source, record, []
+
+
+def find_sources(source: str) -> List[str]:
+    """JSON files of a directory (oldest first), or a single .json/.jsonl file"""
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.json")), key=lambda path: (os.path.getmtime(path), path))
+    return [source]
+
+
+class HistoryImporter:
+    """
+    Streams an archive into a history backend.
+
+    JSON files are parsed and validated on a process pool (``workers``) and
+    written with ``append_many`` every ``batch_size`` records. After each
+    batch the sources it contained are appended to a progress file (JSON
+    file names, and for a JSONL export the last line reached), so an
+    interrupted run resumes where it stopped. Ids are stable (derived from
+    the file name, or the JSONL file and line), so a batch written again
+    after a crash replaces, or in the log supersedes, its first copy.
+    """
+
+    def __init__(
+        self,
+        store,
+        workers: Optional[int] = None,
+        batch_size: int = 500,
+        progress_path: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.progress_path = progress_path
+        self.on_progress = on_progress
+        self.errors: List[Tuple[str, List[str]]] = []
+
+    def run(self, source: str) -> Dict[str, Any]:
+        """Import every file under ``source``; returns counts and the rate"""
+        started = time.perf_counter()
+        done, done_lines = self._completed()
+        sources = [path for path in find_sources(source) if os.path.basename(path) not in done]
+        stats = {
+            "total": len(sources), "processed": 0, "imported": 0, "invalid": 0,
+            "resumed": len(done) + sum(done_lines.values())
+        }
+
+        batch: List[Dict[str, Any]] = []
+        batch_sources: List[str] = []
+        for path, record, errors in self._parsed(sources, done_lines):
+            stats["processed"] += 1
+            if record is None:
+                stats["invalid"] += 1
+                self.errors.append((path, errors))
+            else:
+                batch.append(record)
+            batch_sources.append(path)
+            if len(batch) >= self.batch_size:
+                self._commit(batch, batch_sources, stats, started)
+                batch, batch_sources = [], []
+        self._commit(batch, batch_sources, stats, started)
+        self.store.flush()
+
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        stats["records_per_second"] = round(stats["processed"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        return stats
+
+    def _parsed(self, sources: List[str], done_lines: Dict[str, int]) -> Iterator[Tuple[str, Optional[Dict[str, Any]], List[str]]]:
+        files = [path for path in sources if not path.endswith(".jsonl")]
+        if len(files) > 1 and self.workers > 1:
+            chunksize = max(1, min(256, len(files) // (self.workers * 4)))
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                yield from pool.map(parse_history_file, files, chunksize=chunksize)
+        else:
+            yield from map(parse_history_file, files)
+        for path in sources:
+            if path.endswith(".jsonl"):
+                yield from _parse_jsonl(path, done_lines.get(os.path.basename(path), 0))
+
+    def _commit(self, batch: List[Dict[str, Any]], sources: List[str], stats: Dict[str, Any], started: float) -> None:
+        if batch:
+            self.store.append_many(batch)
+            stats["imported"] += len(batch)
+        if sources and self.progress_path:
+            # JSONL lines are read in order, so the last one of each file covers the rest
+            entries: Dict[str, str] = {}
+            for path in sources:
+                name = os.path.basename(path)
+                file_name, _, line = name.rpartition(":")
+                entries[file_name if line.isdigit() else name] = name
+            with open(self.progress_path, "a", encoding="utf-8") as f:
+                f.writelines(name + "\n" for name in entries.values())
+        if self.on_progress and sources:
+            elapsed = time.perf_counter() - started
+            self.on_progress(dict(stats, seconds=round(elapsed, 3)))
+
+    def _completed(self) -> Tuple[set, Dict[str, int]]:
+        """File names already imported, and the last line imported from each JSONL file"""
+        files: set = set()
+        lines: Dict[str, int] = {}
+        if not self.progress_path or not os.path.exists(self.progress_path):
+            return files, lines
+        with open(self.progress_path, "r", encoding="utf-8") as f:
+            for entry in (text.rstrip("\n") for text in f if text.strip()):
+                file_name, _, line = entry.rpartition(":")
+                if file_name and line.isdigit():
+                    lines[file_name] = max(lines.get(file_name, 0), int(line))
+                else:
+                    files.add(entry)
+        return files, lines
+
+
+def export_history(store, destination: str, fmt: str = "jsonl", batch_size: int = 1000) -> int:
+    """
+    Write every record of ``store`` to ``destination``: one JSONL file
+    ("jsonl", fastest to re-import) or a directory of pretty-printed
+    per-record files ("json", the legacy layout); returns the record count
+    """
+    count = 0
+    if fmt == "jsonl":
+        directory = os.path.dirname(destination)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        temp = destination + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            lines = []
+            for record in store.iter_records():
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                count += 1
+                if len(lines) >= batch_size:
+                    f.writelines(lines)
+                    lines = []
+            f.writelines(lines)
+        os.replace(temp, destination)
+        return count
+
+    if fmt == "json":
+        if not os.path.exists(destination):
+            os.makedirs(destination)
+        for record in store.iter_records():
+            name = record.get("legacy_file") or f"prompt_history_{record['id']}.json"
+            with open(os.path.join(destination, name), "w", encoding="utf-8") as f:
+                json.dump(record, f, indent=2, ensure_ascii=False)
+            count += 1
+        return count
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _print_progress(stats: Dict[str, Any]) -> None:
+    rate = stats["processed"] / stats["seconds"] if stats["seconds"] else 0.0
+    sys.stdout.write(
+        f"\r📦 {stats['processed']}/{stats['total']} files · {stats['imported']} imported · "
+        f"{stats['invalid']} invalid · {rate:,.0f}/s"
+    )
+    sys.stdout.flush()
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line: bulk import an archive or export the history"""
+    from config import Config
+    from utils.history_analytics import get_history_analytics
+    from utils.history_store import open_history_store
+
+    parser = argparse.ArgumentParser(description="Bulk prompt history import/export")
+    parser.add_argument("--backend", default=Config.HISTORY_BACKEND, help="sqlite or log")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    importer = subcommands.add_parser("import", help="import a directory of JSON files or a .jsonl export")
+    importer.add_argument("source")
+    importer.add_argument("--workers", type=int, help="parser processes (default: CPU count)")
+    importer.add_argument("--batch-size", type=int, default=500)
+    importer.add_argument("--restart", action="store_true", help="ignore the progress of an earlier run")
+    exporter = subcommands.add_parser("export", help="export every record")
+    exporter.add_argument("destination")
+    exporter.add_argument("--format", choices=["jsonl", "json"], default="jsonl")
+    args = parser.parse_args(argv)
+
+    store = open_history_store(args.backend)
+    if args.command == "import":
+        progress_path = os.path.abspath(args.source).rstrip(os.sep) + PROGRESS_SUFFIX
+        if args.restart and os.path.exists(progress_path):
+            os.remove(progress_path)
+        run = HistoryImporter(store, args.workers, args.batch_size, progress_path, on_progress=_print_progress)
+        stats = run.run(args.source)
+        print()
+        print(f"✅ Imported {stats['imported']} records in {stats['seconds']}s ({stats['records_per_second']}/s)")
+        if stats["resumed"]:
+            print(f"⏩ Skipped {stats['resumed']} files or JSONL lines imported by an earlier run")
+        for path, errors in run.errors[:20]:
+            print(f"⚠️ {os.path.basename(path)}: {'; '.join(errors)}")
+        if stats["imported"]:
+            print(f"✅ Rebuilt analytics from {get_history_analytics().rebuild(store.iter_records())} records")
+    else:
+        count = export_history(store, args.destination, args.format)
+        print(f"✅ Exported {count} records to {args.destination}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
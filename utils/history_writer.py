@@ -0,0 +1,201 @@
+"""
+Write-behind prompt history for AI Prompt Generator
+Bounded queue drained by a background thread that saves records in batches, off the UI thread
+"""
+
+import atexit
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Queue item that tells the writer thread to finish
+_STOP = object()
+
+
+class HistoryQueueFull(RuntimeError):
+    """Raised when the write-behind queue cannot take another record in time"""
+
+
+class HistoryWriter:
+    """
+    Saves history records in the background.
+
+    ``submit`` assigns the record id and timestamp, puts the record on a
+    bounded queue and returns immediately. A daemon thread takes whatever has
+    queued up (waiting up to ``linger`` seconds to fill a batch of
+    ``batch_size``) and writes it with one ``append_many`` call, retrying
+    failed batches with backoff. A full queue is the backpressure signal:
+    ``submit`` waits at most its ``timeout`` and then raises
+    ``HistoryQueueFull`` instead of blocking the caller on disk.
+    """
+
+    def __init__(
+        self,
+        store,
+        max_queue: int = 1000,
+        batch_size: int = 64,
+        linger: float = 0.05,
+        retries: int = 3,
+        retry_backoff: float = 0.5
+    ):
+        self.store = store
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.linger = linger
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._submitted = 0
+        self._finished = 0
+        self._metrics = {
+            "written": 0,
+            "failed": 0,
+            "rejected": 0,
+            "batches": 0,
+            "retries": 0,
+            "max_queue_depth": 0,
+            "max_lag_ms": 0.0,
+            "last_batch_ms": 0.0,
+            "last_error": None
+        }
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict[str, Any], timeout: float = 0.0) -> str:
+        """
+        Queue a record for saving and return its id. Waits up to ``timeout``
+        seconds for room in the queue, then raises ``HistoryQueueFull``.
+        """
+        if self._closed:
+            raise ValueError("History writer is closed")
+        record = dict(record)
+        record.setdefault("id", uuid.uuid4().hex)
+        record.setdefault("saved_at", datetime.now().isoformat())
+        try:
+            self._queue.put((time.monotonic(), record), block=timeout > 0, timeout=timeout or None)
+        except queue.Full:
+            with self._cond:
+                self._metrics["rejected"] += 1
+            raise HistoryQueueFull(f"History write queue is full ({self.max_queue} records waiting)")
+        with self._cond:
+            self._submitted += 1
+            depth = self._submitted - self._finished
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], depth)
+        return record["id"]
+
+    def add_listener(self, callback: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Call ``callback(records)`` on the writer thread after each successfully written batch"""
+        self._listeners.append(callback)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far is written (or failed); False on timeout"""
+        with self._cond:
+            target = self._submitted
+            return self._cond.wait_for(lambda: self._finished >= target, timeout=timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Write what is queued, stop the thread and flush the store"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+        self.store.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and write counters, for backpressure monitoring"""
+        with self._cond:
+            stats = dict(self._metrics)
+            stats["queued"] = self._submitted - self._finished
+            stats["submitted"] = self._submitted
+        stats["max_queue"] = self.max_queue
+        return stats
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[float, Dict[str, Any]]]) -> None:
+        records = [record for _, record in batch]
+        started = time.monotonic()
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                self.store.append_many(records)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    with self._cond:
+                        self._metrics["retries"] += 1
+                    time.sleep(self.retry_backoff * (2 ** attempt))
+        finished = time.monotonic()
+        if error is None:
+            for callback in self._listeners:
+                try:
+                    callback(records)
+                except Exception as e:
+                    with self._cond:
+                        self._metrics["last_error"] = f"listener: {e}"
+
+        with self._cond:
+            metrics = self._metrics
+            if error is None:
+                metrics["written"] += len(records)
+            else:
+                metrics["failed"] += len(records)
+                metrics["last_error"] = str(error)
+            metrics["batches"] += 1
+            metrics["last_batch_ms"] = round((finished - started) * 1000, 2)
+            metrics["max_lag_ms"] = max(metrics["max_lag_ms"], round((finished - batch[0][0]) * 1000, 2))
+            self._finished += len(records)
+            self._cond.notify_all()
+
+
+_shared_writer: Optional[HistoryWriter] = None
+_shared_lock = threading.Lock()
+
+
+def get_history_writer() -> HistoryWriter:
+    """Process-wide writer for the configured history store, flushed at interpreter exit"""
+    global _shared_writer
+    from config import Config
+    from utils.history_analytics import get_history_analytics
+    from utils.history_store import get_history_store
+
+    with _shared_lock:
+        if _shared_writer is None:
+            _shared_writer = HistoryWriter(
+                get_history_store(),
+                max_queue=Config.HISTORY_WRITE_QUEUE,
+                batch_size=Config.HISTORY_WRITE_BATCH,
+                linger=Config.HISTORY_WRITE_LINGER
+            )
+            _shared_writer.add_listener(get_history_analytics().observe)
+            atexit.register(_shared_writer.close)
+        return _shared_writer
@@ -0,0 +1,108 @@
+"""
+Idempotent workflow actions for AI Prompt Generator
+Collapses duplicate submits of the same action into a single Gemini-backed run
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+# Marks a run whose leader was interrupted (e.g. a Streamlit rerun) so a joiner retries
+_INTERRUPTED = object()
+
+
+def action_key(session_id: str, state: str, action: str, payload: Any) -> str:
+    """
+    Idempotency key for an action: same session, workflow state, action and
+    input always give the same key
+    """
+    canonical = json.dumps(
+        {"session": session_id, "state": state, "action": action, "payload": payload},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotentActions:
+    """
+    Runs each keyed action at most once.
+
+    The first caller for a key runs the action itself, in the calling thread;
+    callers that arrive while it is running block on its Future and share its
+    result, and callers that arrive within ``ttl`` seconds after it finished
+    get the stored result.
+    Failures are not stored, so a retry runs the action again.
+    """
+
+    def __init__(self, ttl: float = 120.0, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats = {"executed": 0, "joined": 0, "replayed": 0, "failed": 0}
+
+    def run(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run ``fn`` for ``key`` unless an identical action is running or recently finished"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["finished"] is not None and time.monotonic() - entry["finished"] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                entry = {"future": Future(), "finished": None}
+                self._entries[key] = entry
+                self._evict_locked()
+                leader = True
+                self._stats["executed"] += 1
+            else:
+                leader = False
+                self._stats["joined" if entry["finished"] is None else "replayed"] += 1
+
+        if not leader:
+            result = entry["future"].result(timeout=timeout)
+            if result is _INTERRUPTED:
+                return self.run(key, fn, timeout=timeout)
+            return result
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                self._stats["failed"] += 1
+            if isinstance(e, Exception):
+                entry["future"].set_exception(e)
+            else:
+                entry["future"].set_result(_INTERRUPTED)
+            raise
+
+        with self._lock:
+            entry["finished"] = time.monotonic()
+        entry["future"].set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for display and metrics"""
+        with self._lock:
+            in_flight = sum(1 for entry in self._entries.values() if entry["finished"] is None)
+            return dict(self._stats, in_flight=in_flight, cached=len(self._entries) - in_flight)
+
+    def _evict_locked(self) -> None:
+        """Drop the oldest finished entries beyond ``max_entries``"""
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        for key in list(self._entries):
+            if excess <= 0:
+                break
+            if self._entries[key]["finished"] is not None:
+                del self._entries[key]
+                excess -= 1
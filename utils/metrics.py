@@ -0,0 +1,302 @@
+"""
+Service metrics for AI Prompt Generator
+Counters, histograms and gauges rendered in the Prometheus text format from a small side HTTP server
+"""
+
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; Gemini calls take from a few hundred ms to tens of seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Common name, help text and label handling"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count per label combination
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """Add ``amount`` (default 1) to the labelled count"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, with their sum and count
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one observation (seconds, for latency histograms)"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[-1]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = self.header()
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                bucket = _labels(self.labelnames, key, 'le="%s"' % _number(bound))
+                lines.append(f"{self.name}_bucket{bucket} {_number(cumulative)}")
+            bucket = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket} {_number(values[-1])}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(values[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_number(values[-1])}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Gauge or counter read from a function at scrape time. ``fn`` returns a
+    number, or a dict mapping label values (a tuple, or a string for a
+    single label) to numbers.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Any], labelnames: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        try:
+            result = self.fn()
+        except Exception:
+            return []
+        if not isinstance(result, dict):
+            result = {(): result}
+        lines = self.header()
+        for key, value in sorted(result.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named metrics rendered together in the Prometheus text exposition format
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; registering a name again replaces it (so app reruns re-bind callbacks)"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], Any], labelnames: Sequence[str] = (), kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, fn, labelnames, kind))
+
+    def render(self) -> str:
+        """Every metric as Prometheus text"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RecentSessions:
+    """
+    Sessions seen within the last ``window`` seconds, for the active sessions gauge
+    """
+
+    def __init__(self, window: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, session_id: str) -> None:
+        """Mark a session as active now"""
+        with self._lock:
+            self._seen[session_id] = self.clock()
+
+    def count(self) -> int:
+        """Active sessions, forgetting the ones that went quiet"""
+        cutoff = self.clock() - self.window
+        with self._lock:
+            for session_id in [key for key, seen in self._seen.items() if seen < cutoff]:
+                del self._seen[session_id]
+            return len(self._seen)
+
+
+REGISTRY = MetricsRegistry()
+
+GEMINI_CALLS = REGISTRY.counter(
+    "prompt_gemini_calls_total", "Gemini API calls by calling method and outcome", ["method", "outcome"]
+)
+GEMINI_LATENCY = REGISTRY.histogram(
+    "prompt_gemini_call_duration_seconds", "Gemini API call latency by calling method", ["method"]
+)
+GEMINI_TOKENS = REGISTRY.counter(
+    "prompt_gemini_tokens_total", "Gemini tokens from usageMetadata by calling method and kind (prompt or output)", ["method", "kind"]
+)
+GEMINI_COST = REGISTRY.counter(
+    "prompt_gemini_cost_usd_total", "Estimated Gemini spend in US dollars by calling method", ["method"]
+)
+WORKFLOW_LATENCY = REGISTRY.histogram(
+    "prompt_workflow_action_duration_seconds", "Workflow action latency including queueing", ["action"]
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "prompt_cache_lookups_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]
+)
+PARSE_FALLBACKS = REGISTRY.counter(
+    "prompt_parse_fallbacks_total", "Model responses that could not be parsed and fell back to defaults", ["method", "reason"]
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count one cache lookup"""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_parse_fallback(method: str, reason: str) -> None:
+    """Count one fallback: ``no_json`` (no braces found) or ``invalid_json``"""
+    PARSE_FALLBACKS.inc(method=method, reason=reason)
+
+
+class MetricsServer:
+    """
+    Serves ``GET /metrics`` from a registry on a daemon thread
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "0.0.0.0", port: int = 9108):
+        from http.server import ThreadingHTTPServer
+
+        self.registry = registry
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
@@ -0,0 +1,62 @@
+"""
+Performance helpers for AI Prompt Generator
+Lightweight timers for measuring Streamlit script and fragment run times
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, List, MutableMapping, Iterator
+
+
+class RenderTimer:
+    """
+    Records wall-clock durations of named UI sections (full script runs and fragments)
+
+    Samples are kept in a plain mapping (normally ``st.session_state``) so they
+    survive reruns and can be compared before and after a change.
+    """
+
+    def __init__(self, store: MutableMapping, key: str = "render_timings", max_samples: int = 50):
+        self.store = store
+        self.key = key
+        self.max_samples = max_samples
+        if self.key not in self.store:
+            self.store[self.key] = {}
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Time the enclosed block and record it under ``name``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        """Add a sample, keeping only the most recent ``max_samples`` per section"""
+        samples: List[float] = self.store[self.key].setdefault(name, [])
+        samples.append(round(elapsed_ms, 3))
+        if len(samples) > self.max_samples:
+            del samples[: len(samples) - self.max_samples]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get per-section statistics: run count, last, average and p95 in milliseconds
+        """
+        result = {}
+        for name, samples in self.store[self.key].items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+            result[name] = {
+                "runs": len(samples),
+                "last_ms": samples[-1],
+                "avg_ms": round(sum(samples) / len(samples), 3),
+                "p95_ms": ordered[p95_index]
+            }
+        return result
+
+    def reset(self) -> None:
+        """Drop all recorded samples"""
+        self.store[self.key] = {}
@@ -0,0 +1,170 @@
+"""
+Predictive pre-triage for AI Prompt Generator
+Debounced, speculative triage of the initial request while the user is still typing
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+
+class PredictiveTriage:
+    """
+    Runs the initial triage in the background once the request text has been
+    idle for ``delay`` seconds, and keeps the result keyed by the request text.
+
+    Results are shared by every session in the process, so identical requests
+    typed by different users are triaged once. ``triage_fn`` is called with
+    the text and the owner whose typing started the run.
+    """
+
+    def __init__(
+        self,
+        triage_fn: Callable[[str, str], Dict[str, Any]],
+        delay: float = 0.8,
+        ttl: float = 900.0,
+        max_entries: int = 256,
+        max_workers: int = 2
+    ):
+        self.triage_fn = triage_fn
+        self.delay = delay
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pretriage")
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._timers: Dict[str, threading.Timer] = {}
+        self._stats = {"scheduled": 0, "started": 0, "hits": 0, "misses": 0, "failures": 0}
+
+    @staticmethod
+    def key_for(text: str) -> str:
+        """Cache key for a request; whitespace differences do not matter"""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def schedule(self, text: str, owner: str = "default") -> None:
+        """
+        (Re)start the idle timer for ``owner``; the previous pending text is dropped
+        """
+        with self._lock:
+            self._cancel_locked(owner)
+            if not text.strip():
+                return
+            key = self.key_for(text)
+            if self._fresh_entry_locked(key) is not None:
+                return
+            timer = threading.Timer(self.delay, self._start, args=(text, key, owner))
+            timer.daemon = True
+            self._timers[owner] = timer
+            self._stats["scheduled"] += 1
+        timer.start()
+
+    def start(self, text: str, owner: str = "default") -> None:
+        """
+        Triage ``text`` now, without the idle timer (the browser already saw the
+        typing pause); replaces any pending text for ``owner``
+        """
+        with self._lock:
+            self._cancel_locked(owner)
+        if text.strip():
+            self._start(text, self.key_for(text), owner)
+
+    def flush(self, owner: str = "default") -> None:
+        """Start ``owner``'s pending triage now instead of when its timer fires"""
+        with self._lock:
+            timer = self._timers.get(owner)
+            if timer is not None:
+                timer.cancel()
+        if timer is not None:
+            self._start(*timer.args)
+
+    def cancel(self, owner: str = "default") -> None:
+        """Drop a pending (not yet started) triage for ``owner``"""
+        with self._lock:
+            self._cancel_locked(owner)
+
+    def status(self, text: str) -> Optional[str]:
+        """'ready', 'running' or None if nothing is cached for this text"""
+        with self._lock:
+            entry = self._fresh_entry_locked(self.key_for(text))
+        if entry is None:
+            return None
+        return "ready" if entry["future"].done() else "running"
+
+    def get(self, text: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the triage result for ``text``, joining a run that is still in flight
+        for up to ``timeout`` seconds. Returns None when nothing was prefetched,
+        the prefetch failed or it did not finish in time (it stays cached).
+        """
+        key = self.key_for(text)
+        with self._lock:
+            entry = self._fresh_entry_locked(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+        try:
+            result = entry["future"].result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        except Exception:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                self._stats["failures"] += 1
+            return None
+
+        with self._lock:
+            self._stats["hits"] += 1
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for display and metrics"""
+        with self._lock:
+            return dict(self._stats, cached=len(self._entries), pending=len(self._timers))
+
+    def shutdown(self) -> None:
+        """Cancel pending timers and stop the worker pool"""
+        with self._lock:
+            for owner in list(self._timers):
+                self._cancel_locked(owner)
+        self._executor.shutdown(wait=False)
+
+    def _start(self, text: str, key: str, owner: str) -> None:
+        """Timer callback: submit the triage unless it is already cached"""
+        with self._lock:
+            if self._timers.get(owner) is not None and self._timers[owner].args[1] == key:
+                del self._timers[owner]
+            if self._fresh_entry_locked(key) is not None:
+                return
+            future: Future = self._executor.submit(self.triage_fn, text, owner)
+            self._entries[key] = {"future": future, "created": time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._stats["started"] += 1
+
+    def _fresh_entry_locked(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached entry for ``key`` unless it has expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["created"] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _cancel_locked(self, owner: str) -> None:
+        timer = self._timers.pop(owner, None)
+        if timer is not None:
+            timer.cancel()
@@ -0,0 +1,302 @@
+"""
+On-demand workflow profiling for AI Prompt Generator
+Wraps one session's workflow runs in cProfile and tracemalloc and saves a report per run
+"""
+
+import contextvars
+import cProfile
+import io
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+# Profiled runs open in this thread; Gemini network wait is added to each of them
+_open_runs: contextvars.ContextVar = contextvars.ContextVar("open_profiled_runs", default=())
+
+# tracemalloc is process-wide, so overlapping runs share one tracing session
+# and one peak; the runs open right now are kept to tell which peaks overlap
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_runs: Set["ProfiledRun"] = set()
+_tracemalloc_started_here = False
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+TRACEMALLOC_FRAMES = 5
+
+
+def record_network_wait(ms: float) -> None:
+    """Count time spent waiting on the Gemini API in every open profiled run"""
+    for run in _open_runs.get():
+        run.network_ms += ms
+        run.gemini_calls += 1
+
+
+def _start_tracemalloc(run: "ProfiledRun") -> None:
+    """
+    Trace allocations for ``run``. The peak is only reset when no other run is
+    open, since resetting it would cut short the peak of the runs already open;
+    overlapping runs are all marked as sharing their peak.
+    """
+    global _tracemalloc_started_here
+    with _tracemalloc_lock:
+        if not _tracemalloc_runs:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                _tracemalloc_started_here = True
+            tracemalloc.reset_peak()
+        else:
+            run.peak_shared = True
+            for other in _tracemalloc_runs:
+                other.peak_shared = True
+        _tracemalloc_runs.add(run)
+
+
+def _stop_tracemalloc(run: "ProfiledRun") -> int:
+    """
+    Peak traced memory since ``run`` started (or since the earliest run it
+    overlapped); stops tracing after the last run unless someone else (e.g.
+    PYTHONTRACEMALLOC) started it
+    """
+    global _tracemalloc_started_here
+    with _tracemalloc_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _tracemalloc_runs.discard(run)
+        if not _tracemalloc_runs and _tracemalloc_started_here:
+            tracemalloc.stop()
+            _tracemalloc_started_here = False
+        return peak
+
+
+class ProfiledRun:
+    """
+    Context manager profiling the work done in its block on this thread.
+
+    cProfile sees only the current thread; tracemalloc sees every thread, so
+    allocations made by other sessions at the same time are included. The
+    peak is process-wide too: when profiled runs overlap, each reports the
+    peak of the whole overlapping stretch and ``peak_shared`` is set.
+    """
+
+    def __init__(self, session_id: str, action: str):
+        self.session_id = session_id
+        self.action = action
+        self.network_ms = 0.0
+        self.gemini_calls = 0
+        self.peak_shared = False
+        self.report: Optional[Dict[str, Any]] = None
+        self.profile: Optional[cProfile.Profile] = None
+        self._token = None
+
+    def __enter__(self) -> "ProfiledRun":
+        self.started_at = datetime.now()
+        _start_tracemalloc(self)
+        self._before = tracemalloc.take_snapshot()
+        self._token = _open_runs.set(_open_runs.get() + (self,))
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiler already owns this thread
+            self.profile = None
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        wall_ms = (time.perf_counter() - self._wall) * 1000
+        cpu_ms = (time.thread_time() - self._cpu) * 1000
+        if self.profile is not None:
+            self.profile.disable()
+        _open_runs.reset(self._token)
+        after = tracemalloc.take_snapshot()
+        peak = _stop_tracemalloc(self)
+
+        network_ms = min(self.network_ms, wall_ms)
+        self.report = {
+            "session_id": self.session_id,
+            "action": self.action,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "outcome": "ok" if exc_type is None else exc_type.__name__,
+            "wall_ms": round(wall_ms, 1),
+            "network_ms": round(network_ms, 1),
+            "python_ms": round(wall_ms - network_ms, 1),
+            "cpu_ms": round(cpu_ms, 1),
+            "gemini_calls": self.gemini_calls,
+            "peak_traced_kb": round(peak / 1024, 1),
+            "peak_shared": self.peak_shared,
+            "top_functions": _top_functions(self.profile) if self.profile is not None else [],
+            "top_allocations": _top_allocations(after, self._before)
+        }
+        return False
+
+    def pstats_text(self, limit: int = TOP_FUNCTIONS) -> str:
+        """The cProfile table sorted by cumulative time"""
+        if self.profile is None:
+            return "cProfile was not available for this run\n"
+        import pstats
+
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+def _top_functions(profile: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+    """Functions with the most cumulative time"""
+    import pstats
+
+    stats = pstats.Stats(profile).stats
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.items():
+        rows.append({
+            "function": name,
+            "location": f"{filename}:{line}" if line else filename,
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3)
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _top_allocations(after: tracemalloc.Snapshot, before: tracemalloc.Snapshot, limit: int = TOP_ALLOCATIONS) -> List[Dict[str, Any]]:
+    """Source lines whose retained memory grew the most during the run"""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    rows = []
+    for difference in differences[:limit]:
+        frame = difference.traceback[0]
+        rows.append({
+            "location": f"{frame.filename}:{frame.lineno}",
+            "size_kb": round(difference.size_diff / 1024, 1),
+            "blocks": difference.count_diff
+        })
+    return rows
+
+
+class ProfileStore:
+    """
+    Which sessions are being profiled, and the saved report of each profiled run.
+
+    Sessions are switched on by id prefix (the app shows the first 8
+    characters). Each run is saved as ``<id>.json`` plus the raw cProfile data
+    as ``<id>.pstats``; only the newest ``max_reports`` runs are kept.
+    """
+
+    def __init__(self, directory: str, max_reports: int = 50):
+        self.directory = directory
+        self.max_reports = max_reports
+        self._prefixes: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def enable(self, session_prefix: str) -> None:
+        with self._lock:
+            self._prefixes.add(session_prefix.strip())
+
+    def disable(self, session_prefix: str) -> None:
+        with self._lock:
+            self._prefixes.discard(session_prefix.strip())
+
+    def enabled_sessions(self) -> List[str]:
+        with self._lock:
+            return sorted(self._prefixes)
+
+    def is_enabled(self, session_id: str) -> bool:
+        with self._lock:
+            return any(session_id.startswith(prefix) for prefix in self._prefixes if prefix)
+
+    def run(self, session_id: str, action: str) -> "_SavingRun":
+        """Context manager profiling one run and saving its report on exit"""
+        return _SavingRun(self, session_id, action)
+
+    def save(self, run: ProfiledRun) -> str:
+        """Write a finished run's report and cProfile data; returns the report id"""
+        report_id = "{}-{}-{}".format(
+            run.started_at.strftime("%Y%m%d-%H%M%S-%f"), run.session_id[:8], re.sub(r"[^A-Za-z0-9_]+", "_", run.action)
+        )
+        report = dict(run.report, id=report_id, pstats_text=run.pstats_text())
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, report_id + ".json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        if run.profile is not None:
+            run.profile.dump_stats(os.path.join(self.directory, report_id + ".pstats"))
+        self._prune()
+        return report_id
+
+    def reports(self) -> List[Dict[str, Any]]:
+        """Summaries of the saved runs, newest first"""
+        summaries = []
+        for report_id in self._report_ids():
+            report = self.read(report_id)
+            if report is not None:
+                summaries.append({key: value for key, value in report.items() if key not in ("top_functions", "top_allocations", "pstats_text")})
+        return summaries
+
+    def read(self, report_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(report_id, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def pstats_bytes(self, report_id: str) -> Optional[bytes]:
+        """Raw cProfile data for snakeviz or ``pstats``"""
+        try:
+            with open(self._path(report_id, ".pstats"), "rb") as f:
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def _path(self, report_id: str, suffix: str) -> str:
+        if os.path.basename(report_id) != report_id:
+            raise ValueError(f"Invalid report id: {report_id}")
+        return os.path.join(self.directory, report_id + suffix)
+
+    def _report_ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name[:-5] for name in os.listdir(self.directory) if name.endswith(".json")), reverse=True)
+
+    def _prune(self) -> None:
+        for report_id in self._report_ids()[self.max_reports:]:
+            for suffix in (".json", ".pstats"):
+                try:
+                    os.remove(self._path(report_id, suffix))
+                except OSError:
+                    pass
+
+
+class _SavingRun(ProfiledRun):
+    """A profiled run that saves its report to a store when it ends"""
+
+    def __init__(self, store: ProfileStore, session_id: str, action: str):
+        super().__init__(session_id, action)
+        self.store = store
+        self.report_id: Optional[str] = None
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        super().__exit__(exc_type, exc, tb)
+        try:
+            self.report_id = self.store.save(self)
+        except OSError as e:
+            print(f"Error saving profile report: {e}")
+        return False
+
+
+_shared_store: Optional[ProfileStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    """Process-wide store saving reports to Config.PROFILE_REPORT_DIR"""
+    global _shared_store
+    from config import Config
+
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = ProfileStore(Config.PROFILE_REPORT_DIR, Config.PROFILE_MAX_REPORTS)
+        return _shared_store
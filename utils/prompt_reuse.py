@@ -0,0 +1,183 @@
+"""
+Semantic prompt reuse for AI Prompt Generator
+Hashed n-gram similarity index over saved requests and answers, matched before a final prompt is generated
+"""
+
+import re
+import threading
+import zlib
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+# numpy is imported on first use, normally by the background index loader,
+# so the app's first render does not wait for it
+if TYPE_CHECKING:
+    import numpy as np
+
+# Width of the hashed feature space; collisions stay rare for request-sized texts
+DIMENSIONS = 4096
+
+# Character n-gram size (word unigrams are added on top)
+NGRAM = 3
+
+
+def reuse_text(request: str, answers: Optional[Dict[str, Any]] = None) -> str:
+    """Text a request is matched on: the request followed by the answers in question order"""
+    parts = [request or ""]
+    for key in sorted(answers or {}):
+        parts.append(str(answers[key]))
+    return "\n".join(parts)
+
+
+def embed(text: str, dimensions: int = DIMENSIONS, ngram: int = NGRAM) -> "np.ndarray":
+    """
+    L2-normalized vector of signed, hashed character n-grams and words,
+    weighted by 1 + log(count). Deterministic across processes (CRC32).
+    """
+    import numpy as np
+
+    normalized = " ".join(re.findall(r"\w+", (text or "").lower()))
+    vector = np.zeros(dimensions, dtype=np.float32)
+    if not normalized:
+        return vector
+
+    padded = f" {normalized} "
+    features = [padded[i:i + ngram] for i in range(len(padded) - ngram + 1)]
+    features.extend("w:" + word for word in normalized.split())
+    counts: Dict[str, int] = {}
+    for feature in features:
+        counts[feature] = counts.get(feature, 0) + 1
+
+    for feature, count in counts.items():
+        digest = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % dimensions] += sign * (1.0 + np.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class PromptReuseIndex:
+    """
+    In-memory similarity index over saved prompts.
+
+    Each record with a final prompt becomes one row of a float32 matrix, so a
+    lookup is a single matrix-vector product; rows are scoped by department
+    with a parallel code array. Only ids are kept: the prompt itself is read
+    back from the history store when a match is used.
+    """
+
+    def __init__(self, dimensions: int = DIMENSIONS):
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        # Allocated by the first add
+        self._vectors: Optional["np.ndarray"] = None
+        self._departments: Optional["np.ndarray"] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._department_codes: Dict[str, int] = {}
+        self._loader: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Index a saved record (re-adding an id replaces it); returns whether it was indexed"""
+        import numpy as np
+
+        record_id = record.get("id")
+        prompt = record.get("final_prompt") or record.get("generated_prompt")
+        if not record_id or not prompt:
+            return False
+        request = record.get("original_request") or record.get("user_input") or ""
+        vector = embed(reuse_text(request, record.get("user_answers")), self.dimensions)
+        department = record.get("department") or "Unknown"
+
+        with self._lock:
+            code = self._department_codes.setdefault(department, len(self._department_codes) + 1)
+            if self._vectors is None:
+                self._vectors = np.zeros((64, self.dimensions), dtype=np.float32)
+                self._departments = np.zeros(64, dtype=np.int32)
+            row = self._rows.get(record_id)
+            if row is None:
+                row = len(self._ids)
+                if row == len(self._vectors):
+                    self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                    self._departments = np.concatenate([self._departments, np.zeros_like(self._departments)])
+                self._ids.append(record_id)
+                self._rows[record_id] = row
+            self._vectors[row] = vector
+            self._departments[row] = code
+        return True
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Index several records; returns how many had a prompt to index"""
+        return sum(1 for record in records if self.add(record))
+
+    def load_async(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Index existing history in a daemon thread; lookups meanwhile see what is loaded so far"""
+        if self._loader is not None:
+            return
+        self._loader = threading.Thread(target=self.add_many, args=(records,), name="prompt-reuse-index", daemon=True)
+        self._loader.start()
+
+    def search(
+        self,
+        request: str,
+        answers: Optional[Dict[str, Any]] = None,
+        department: Optional[str] = None,
+        limit: int = 3,
+        threshold: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """Most similar saved records as ``{"id", "score"}``, best first, optionally within one department"""
+        if not len(self):
+            return []
+        import numpy as np
+
+        query = embed(reuse_text(request, answers), self.dimensions)
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or not query.any():
+                return []
+            scores = self._vectors[:count] @ query
+            if department is not None:
+                code = self._department_codes.get(department)
+                if code is None:
+                    return []
+                scores = np.where(self._departments[:count] == code, scores, -1.0)
+            limit = min(limit, count)
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"id": self._ids[row], "score": round(float(scores[row]), 4)}
+                for row in top
+                if scores[row] >= threshold
+            ]
+
+
+def find_reusable_prompt(
+    index: PromptReuseIndex,
+    store,
+    request: str,
+    department: Optional[str],
+    answers: Optional[Dict[str, Any]] = None,
+    serve_threshold: float = 0.9,
+    seed_threshold: float = 0.7
+) -> Optional[Dict[str, Any]]:
+    """
+    Best saved prompt for a request, or None below ``seed_threshold``.
+    ``mode`` is "serve" (use as-is) at or above ``serve_threshold``, else "seed".
+    """
+    for match in index.search(request, answers, department=department, limit=3, threshold=seed_threshold):
+        record = store.get(match["id"])
+        prompt = record and (record.get("final_prompt") or record.get("generated_prompt"))
+        if not prompt:
+            continue
+        return {
+            "id": match["id"],
+            "score": match["score"],
+            "mode": "serve" if match["score"] >= serve_threshold else "seed",
+            "final_prompt": prompt,
+            "original_request": record.get("original_request") or record.get("user_input") or "",
+            "saved_at": record.get("saved_at", "")
+        }
+    return None
@@ -0,0 +1,296 @@
+"""
+Session persistence for AI Prompt Generator
+Pluggable stores that keep workflow and chat state under a resumable session token
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional
+
+# Session state keys that survive a reload or a server restart
+WORKFLOW_KEYS = [
+    "workflow_state",
+    "original_request",
+    "department_detected",
+    "current_questions",
+    "user_answers",
+    "progress",
+    "final_prompt",
+    "summary",
+    "reused_prompt",
+    "stage_ms",
+    "stage_tokens"
+]
+CHAT_KEYS = [
+    "chat_messages",
+    "chat_active",
+    "chat_context"
+]
+PERSISTED_KEYS = WORKFLOW_KEYS + CHAT_KEYS
+
+
+class SessionStore(ABC):
+    """
+    Interface for session stores.
+
+    ``save`` replaces the stored snapshot for a token (keys missing from the
+    snapshot are removed); stores may buffer writes until ``flush``.
+    """
+
+    @abstractmethod
+    def load(self, token: str, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Stored values for ``token``, optionally restricted to ``keys``"""
+
+    @abstractmethod
+    def save(self, token: str, state: Dict[str, Any]) -> None:
+        """Replace the snapshot stored for ``token``"""
+
+    @abstractmethod
+    def delete(self, token: str) -> None:
+        """Forget everything stored for ``token``"""
+
+    def flush(self) -> None:
+        """Write any buffered changes"""
+
+    def close(self) -> None:
+        """Flush and release resources"""
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store; useful for tests and single-replica development"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, str]] = {}
+
+    def load(self, token: str, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        with self._lock:
+            stored = dict(self._data.get(token, {}))
+        wanted = set(keys) if keys is not None else None
+        return {
+            key: json.loads(value)
+            for key, value in stored.items()
+            if wanted is None or key in wanted
+        }
+
+    def save(self, token: str, state: Dict[str, Any]) -> None:
+        encoded = {key: _encode(value) for key, value in state.items()}
+        with self._lock:
+            self._data[token] = encoded
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            self._data.pop(token, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store with one row per (token, key).
+
+    Saves are buffered and written by a background thread every
+    ``flush_interval`` seconds (or once ``max_pending`` tokens are dirty) in a
+    single transaction. Only keys whose serialized value changed are written,
+    so a growing chat history does not rewrite the rest of the workflow.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_pending: int = 100):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS session_state (
+                token TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (token, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_session_state_updated ON session_state(updated_at)")
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, str]] = {}
+        # Digests of what is on disk, per token, to skip unchanged keys
+        self._written: Dict[str, Dict[str, str]] = {}
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="session-store-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def load(self, token: str, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        wanted = list(keys) if keys is not None else None
+        with self._lock:
+            pending = self._pending.get(token)
+        if pending is not None:
+            return {
+                key: json.loads(value)
+                for key, value in pending.items()
+                if wanted is None or key in wanted
+            }
+
+        query = "SELECT key, value FROM session_state WHERE token = ?"
+        params = [token]
+        if wanted is not None:
+            if not wanted:
+                return {}
+            query += f" AND key IN ({','.join('?' for _ in wanted)})"
+            params.extend(wanted)
+        with self._db_lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        with self._lock:
+            digests = self._written.setdefault(token, {})
+            for key, value in rows:
+                digests[key] = _digest(value)
+        return {key: json.loads(value) for key, value in rows}
+
+    def save(self, token: str, state: Dict[str, Any]) -> None:
+        encoded = {key: _encode(value) for key, value in state.items()}
+        with self._lock:
+            self._pending[token] = encoded
+            should_wake = len(self._pending) >= self.max_pending
+        if should_wake:
+            self._wake.set()
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            self._pending.pop(token, None)
+            self._written.pop(token, None)
+        with self._db_lock:
+            self._conn.execute("DELETE FROM session_state WHERE token = ?", (token,))
+
+    def purge_older_than(self, max_age_seconds: float) -> int:
+        """Delete sessions not updated within ``max_age_seconds``; returns rows removed"""
+        cutoff = time.time() - max_age_seconds
+        with self._db_lock:
+            cursor = self._conn.execute(
+                """
+                DELETE FROM session_state WHERE token IN (
+                    SELECT token FROM session_state GROUP BY token HAVING MAX(updated_at) < ?
+                )
+                """,
+                (cutoff,)
+            )
+            return cursor.rowcount
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            now = time.time()
+            upserts = []
+            removed = []
+            # Tokens never loaded by this process: drop any other stored keys
+            replaced = []
+            touched = []
+            for token, encoded in pending.items():
+                digests = self._written.get(token)
+                changed = [
+                    (token, key, value, now)
+                    for key, value in encoded.items()
+                    if digests is None or digests.get(key) != _digest(value)
+                ]
+                upserts.extend(changed)
+                if digests is None:
+                    replaced.append((token, list(encoded)))
+                else:
+                    gone = [(token, key) for key in digests if key not in encoded]
+                    removed.extend(gone)
+                    if not changed and not gone:
+                        # Keep the session from being purged while it is in use
+                        touched.append((now, token))
+                self._written[token] = {key: _digest(value) for key, value in encoded.items()}
+
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO session_state (token, key, value, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(token, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                    """,
+                    upserts
+                )
+                self._conn.executemany("DELETE FROM session_state WHERE token = ? AND key = ?", removed)
+                for token, kept in replaced:
+                    placeholders = ",".join("?" for _ in kept)
+                    if kept:
+                        self._conn.execute(
+                            f"DELETE FROM session_state WHERE token = ? AND key NOT IN ({placeholders})",
+                            [token] + kept
+                        )
+                    else:
+                        self._conn.execute("DELETE FROM session_state WHERE token = ?", (token,))
+                self._conn.executemany("UPDATE session_state SET updated_at = ? WHERE token = ?", touched)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                with self._lock:
+                    for token, encoded in pending.items():
+                        self._written.pop(token, None)
+                        self._pending.setdefault(token, encoded)
+                raise
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Keep the pending snapshot and retry on the next tick
+                pass
+
+
+def open_session_store(kind: str, path: str = None, flush_interval: float = 1.0) -> Optional[SessionStore]:
+    """
+    Create the configured store: "sqlite" (default), "memory" or "none"
+    """
+    kind = (kind or "sqlite").lower()
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return SQLiteSessionStore(path or os.path.join("data", "sessions.db"), flush_interval=flush_interval)
+    raise ValueError(f"Unknown session store: {kind}")
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _digest(encoded: str) -> str:
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
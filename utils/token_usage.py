@@ -0,0 +1,210 @@
+"""
+Token and cost accounting for AI Prompt Generator
+Captures Gemini usageMetadata per call and rolls it up per stage, department, session and day
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from utils.metrics import GEMINI_COST, GEMINI_TOKENS
+
+# Meters open in this thread (innermost last); every call is counted by all of them
+_open_meters: contextvars.ContextVar = contextvars.ContextVar("open_meters", default=())
+
+# Per-session totals kept in the ledger (least recently active dropped first)
+MAX_LEDGER_SESSIONS = 1000
+
+
+def estimate_cost(prompt_tokens: int, output_tokens: int) -> float:
+    """US dollars for a call at the configured per-million-token prices"""
+    from config import Config
+
+    return (
+        prompt_tokens * Config.GEMINI_INPUT_PRICE_PER_MTOK + output_tokens * Config.GEMINI_OUTPUT_PRICE_PER_MTOK
+    ) / 1_000_000
+
+
+def _new_usage() -> Dict[str, Any]:
+    return {"calls": 0, "prompt": 0, "output": 0}
+
+
+def _add_usage(totals: Dict[str, Any], usage: Dict[str, Any]) -> None:
+    for key in ("calls", "prompt", "output"):
+        totals[key] = totals.get(key, 0) + usage.get(key, 0)
+
+
+def combine_stage_tokens(*parts: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, int]]:
+    """Sum several ``by_stage()`` results"""
+    combined: Dict[str, Dict[str, int]] = {}
+    for part in parts:
+        for stage, usage in (part or {}).items():
+            _add_usage(combined.setdefault(stage, _new_usage()), usage)
+    return combined
+
+
+class UsageMeter:
+    """
+    Token counts of the Gemini calls made inside a ``metered()`` block, by stage
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, prompt_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            _add_usage(self._stages.setdefault(stage, _new_usage()), {"calls": 1, "prompt": prompt_tokens, "output": output_tokens})
+
+    def by_stage(self) -> Dict[str, Dict[str, int]]:
+        """``{stage: {"calls", "prompt", "output"}}``"""
+        with self._lock:
+            return {stage: dict(usage) for stage, usage in self._stages.items()}
+
+    @property
+    def calls(self) -> int:
+        with self._lock:
+            return sum(usage["calls"] for usage in self._stages.values())
+
+
+@contextmanager
+def metered() -> Iterator[UsageMeter]:
+    """Count the tokens of every Gemini call made in this block (and this thread)"""
+    meter = UsageMeter()
+    token = _open_meters.set(_open_meters.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _open_meters.reset(token)
+
+
+def record_usage(method: str, stage: str, usage_metadata: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Count one call's ``usageMetadata`` in the metrics and any open meters;
+    returns (prompt tokens, output tokens). Thinking tokens are billed as output.
+    """
+    prompt_tokens = int(usage_metadata.get("promptTokenCount") or 0)
+    output_tokens = int(usage_metadata.get("candidatesTokenCount") or 0) + int(usage_metadata.get("thoughtsTokenCount") or 0)
+    GEMINI_TOKENS.inc(prompt_tokens, method=method, kind="prompt")
+    GEMINI_TOKENS.inc(output_tokens, method=method, kind="output")
+    GEMINI_COST.inc(estimate_cost(prompt_tokens, output_tokens), method=method)
+    for meter in _open_meters.get():
+        meter.add(stage, prompt_tokens, output_tokens)
+    return prompt_tokens, output_tokens
+
+
+def with_stage_tokens(fn: Callable) -> Callable:
+    """Decorator adding ``stage_tokens`` to workflow results that report ``stage_ms``"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with metered() as meter:
+            result = fn(*args, **kwargs)
+        if isinstance(result, dict) and "stage_ms" in result:
+            result["stage_tokens"] = meter.by_stage()
+        return result
+    return wrapper
+
+
+class TokenLedger:
+    """
+    Running token and cost totals per stage, department, session and day.
+
+    ``observe`` is called once per workflow action with that action's usage
+    by stage; totals are persisted as JSON after each call, and only the
+    most recently active ``MAX_LEDGER_SESSIONS`` sessions are kept.
+    """
+
+    DIMENSIONS = ("stages", "departments", "sessions", "days")
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def observe(
+        self,
+        stage_tokens: Dict[str, Dict[str, int]],
+        department: Optional[str] = None,
+        session_id: Optional[str] = None,
+        day: Optional[str] = None
+    ) -> None:
+        """Fold one action's usage into the totals"""
+        if not stage_tokens:
+            return
+        now = datetime.now()
+        day = day or now.date().isoformat()
+        combined = _new_usage()
+        for usage in stage_tokens.values():
+            _add_usage(combined, usage)
+        with self._lock:
+            for stage, usage in stage_tokens.items():
+                _add_usage(self._data["stages"].setdefault(stage, _new_usage()), usage)
+            _add_usage(self._data["departments"].setdefault(department or "Unassigned", _new_usage()), combined)
+            _add_usage(self._data["days"].setdefault(day, _new_usage()), combined)
+            if session_id:
+                sessions = self._data["sessions"]
+                totals = sessions.pop(session_id, None) or _new_usage()
+                _add_usage(totals, combined)
+                totals["last_seen"] = now.isoformat(timespec="seconds")
+                sessions[session_id] = totals
+                for stale in list(sessions)[:max(0, len(sessions) - MAX_LEDGER_SESSIONS)]:
+                    del sessions[stale]
+            _add_usage(self._data["totals"], combined)
+            self._data["updated_at"] = now.isoformat()
+            self._save_locked()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals with estimated cost for every dimension"""
+        with self._lock:
+            data = json.loads(json.dumps(self._data))
+        for usage in [data["totals"]] + [item for name in self.DIMENSIONS for item in data[name].values()]:
+            usage["cost"] = round(estimate_cost(usage.get("prompt", 0), usage.get("output", 0)), 6)
+        return data
+
+    def frame(self, dimension: str):
+        """One dimension as a DataFrame (rows by key; calls, prompt, output, cost columns)"""
+        import pandas as pd
+
+        rows = self.snapshot()[dimension]
+        frame = pd.DataFrame.from_dict(rows, orient="index").reindex(columns=["calls", "prompt", "output", "cost"])
+        frame.index.name = dimension[:-1]
+        return frame.sort_values("cost", ascending=False) if dimension != "days" else frame.sort_index()
+
+    def _load(self) -> Dict[str, Any]:
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        data = {name: {} for name in self.DIMENSIONS}
+        data.update(totals=_new_usage(), updated_at=None)
+        return data
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, separators=(",", ":"))
+        os.replace(temp, self.path)
+
+
+_shared_ledger: Optional[TokenLedger] = None
+_shared_lock = threading.Lock()
+
+
+def get_token_ledger() -> TokenLedger:
+    """Process-wide ledger persisted at Config.TOKEN_LEDGER_PATH"""
+    global _shared_ledger
+    from config import Config
+
+    with _shared_lock:
+        if _shared_ledger is None:
+            _shared_ledger = TokenLedger(Config.TOKEN_LEDGER_PATH)
+        return _shared_ledger
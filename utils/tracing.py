@@ -0,0 +1,385 @@
+"""
+Workflow tracing for AI Prompt Generator
+Lightweight nested spans with console, JSONL and OTLP/JSON exporters; a no-op when disabled
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+# Span currently open in this thread (or asyncio task)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed unit of work. ``request_id`` is shared by every span of a user
+    action (inherited from the parent span), so a slow request can be
+    followed from the UI through queueing to each Gemini call.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "request_id",
+        "start_ns", "end_ns", "attributes", "status", "error", "_started"
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], request_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.request_id = request_id or (parent.request_id if parent else self.trace_id[:16])
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._started = time.perf_counter_ns()
+
+    def set(self, key: str, value: Any) -> None:
+        """Attach an attribute (str, int, float or bool)"""
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """Attach several attributes"""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        """Close the span, measuring its duration on the monotonic clock"""
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._started)
+
+    @property
+    def duration_ms(self) -> float:
+        """Wall time in milliseconds (so far, if still open)"""
+        end = self.end_ns if self.end_ns is not None else self.start_ns + (time.perf_counter_ns() - self._started)
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat JSON-friendly form used by the console and JSONL exporters"""
+        return {
+            "name": self.name,
+            "request_id": self.request_id,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is disabled; every call does nothing"""
+
+    __slots__ = ()
+    request_id = None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _SpanScope:
+    """Context manager that opens a span, makes it current and exports it on exit"""
+
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, request_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.span = Span(name, _current_span.get(), request_id, attributes)
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.span.end()
+        # Control-flow exceptions (e.g. Streamlit's rerun) derive from BaseException and are not errors
+        if isinstance(exc, Exception):
+            self.span.status = "error"
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self.token)
+        self.tracer.export(self.span)
+        return False
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to an exporter.
+
+    With no exporter ``span()`` returns a shared no-op object, so disabled
+    tracing costs one attribute check per instrumented call.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def span(self, name: str, request_id: Optional[str] = None, **attributes: Any):
+        """Context manager timing ``name`` as a child of the current span"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return _SpanScope(self, name, request_id, attributes)
+
+    def record(self, name: str, duration_ms: float, **attributes: Any) -> None:
+        """Export a span for work that just finished and was timed elsewhere"""
+        if self.exporter is None:
+            return
+        span = Span(name, _current_span.get(), None, attributes)
+        span.end_ns = time.time_ns()
+        span.start_ns = span.end_ns - int(duration_ms * 1e6)
+        self.export(span)
+
+    def export(self, span: Span) -> None:
+        """Pass a finished span on; exporter failures never reach the workflow"""
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            print(f"Tracing export failed: {e}", file=sys.stderr)
+
+    def shutdown(self) -> None:
+        """Flush and close the exporter"""
+        if self.exporter is not None and hasattr(self.exporter, "close"):
+            self.exporter.close()
+
+
+def current_span():
+    """The innermost open span, or the no-op span outside any"""
+    return _current_span.get() or NOOP_SPAN
+
+
+# ---------------------------------------------------------------- exporters
+
+
+class ConsoleExporter:
+    """
+    Prints one line per finished span
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+        marker = "" if span.status == "ok" else f" ❌ {span.error}"
+        line = f"[trace {span.request_id}] {span.name} {span.duration_ms:.1f}ms {attributes}{marker}\n"
+        with self._lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+
+class JsonlExporter:
+    """
+    Appends each finished span as one JSON line
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """An OTLP/JSON ExportTraceServiceRequest for ``spans``"""
+    encoded = []
+    for span in spans:
+        attributes = dict(span.attributes, request_id=span.request_id)
+        item = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.status == "error" else {"code": 1}
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        encoded.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "prompt-generator.tracing"}, "spans": encoded}]
+        }]
+    }
+
+
+class OtlpExporter:
+    """
+    Batches spans into OTLP/JSON requests, POSTed to an OTLP/HTTP collector
+    (``endpoint``, e.g. http://localhost:4318/v1/traces) or appended as one
+    request per line to ``path``. Batches go out from a background thread
+    every ``interval`` seconds or once ``batch_size`` spans are waiting.
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        path: Optional[str] = None,
+        service_name: str = "prompt-generator",
+        batch_size: int = 256,
+        interval: float = 2.0
+    ):
+        if not endpoint and not path:
+            raise ValueError("OtlpExporter needs an endpoint or a path")
+        self.endpoint = endpoint
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._pending.append(span)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Send everything waiting now"""
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans:
+            return
+        payload = otlp_payload(spans, self.service_name)
+        if self.endpoint:
+            import requests
+            requests.post(self.endpoint, json=payload, timeout=5)
+        else:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, default=str) + "\n")
+
+    def close(self) -> None:
+        """Stop the background thread and send what is left"""
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"OTLP export failed: {e}", file=sys.stderr)
+
+
+def make_exporter(kind: str, path: str = None, endpoint: str = None, service_name: str = "prompt-generator"):
+    """Exporter for a TRACING_EXPORTER value: none, console, jsonl or otlp"""
+    kind = (kind or "none").lower()
+    if kind == "none":
+        return None
+    if kind == "console":
+        return ConsoleExporter()
+    if kind == "jsonl":
+        return JsonlExporter(path)
+    if kind == "otlp":
+        return OtlpExporter(endpoint=endpoint or None, path=None if endpoint else path, service_name=service_name)
+    raise ValueError(f"Unknown tracing exporter: {kind}")
+
+
+_shared_tracer: Optional[Tracer] = None
+_shared_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer configured by TRACING_EXPORTER, flushed at interpreter exit"""
+    global _shared_tracer
+    if _shared_tracer is not None:
+        return _shared_tracer
+    from config import Config
+
+    with _shared_lock:
+        if _shared_tracer is None:
+            tracer = Tracer(make_exporter(
+                Config.TRACING_EXPORTER,
+                path=Config.TRACING_PATH,
+                endpoint=Config.TRACING_OTLP_ENDPOINT,
+                service_name=Config.TRACING_SERVICE_NAME
+            ))
+            if tracer.enabled:
+                atexit.register(tracer.shutdown)
+            _shared_tracer = tracer
+        return _shared_tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """Replace the process-wide tracer (None re-reads the config); returns the previous one"""
+    global _shared_tracer
+    with _shared_lock:
+        previous, _shared_tracer = _shared_tracer, tracer
+    return previous
+
+
+def traced(name: str) -> Callable:
+    """Decorator running the function inside a span called ``name``"""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _shared_tracer or get_tracer()
+            if tracer.exporter is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate